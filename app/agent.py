@@ -1,29 +1,27 @@
 from __future__ import annotations
 import os
-from typing import Dict, Any, List, Optional
+from typing import List
 import datetime as dt
-import pytz
 
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.graph import StateGraph, END
 
-from .schemas import AgentState, MeetingDraft, SlotSuggestion
-from .prompts import EXTRACTION_SYSTEM, DIALOG_SYSTEM, ASK_MISSING_SYSTEM, ASK_SUGGESTIONS_SYSTEM, SUMMARIZE_SYSTEM
-from .utils import parse_natural_datetime, now_in_tz, to_iso, ensure_tz, parse_user_date
-from .calendar_mock import MockCalendar
+from .schemas import AgentState, MeetingDraft, SlotSuggestion, draft_json
+from .prompts import ASK_MISSING_SYSTEM, ASK_SUGGESTIONS_SYSTEM, SUMMARIZE_SYSTEM
+from .utils import ensure_tz
+from .calendar_mock import MockCalendar, SlotTaken
 from langchain_core.output_parsers import JsonOutputParser
 
 from .llm import invoke_llm
+from .llm_gateway import chat_model
+from .extraction import extract_draft
+from .booking import busy_message
 
 json_parser = JsonOutputParser(pydantic_object=MeetingDraft)
 
 
 def build_agent(calendar: MockCalendar, memory: MemorySaver = None, config: dict = {}):
-    llm = ChatOpenAI(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o"),
-        temperature=0.2,
-    )
+    llm = chat_model()
     default_tz = os.getenv("DEFAULT_TIMEZONE", "America/Los_Angeles")
 
  
@@ -42,52 +40,10 @@ def build_agent(calendar: MockCalendar, memory: MemorySaver = None, config: dict
     async def extract_node(state: AgentState) -> dict:
     
         """
-        Take the latest state, invoke LLM to extract necessary fields from the history of messages in the state
+        Take the latest state, extract necessary fields from the latest message, asking the LLM only when rules are not enough
         """
     
-        #msgs = [SystemMessage(content=EXTRACTION_SYSTEM)] + format_messages(state, [])
-    
-        draft_m = HumanMessage(content=f"draft: {state.draft.model_dump_json()}")
-    
-        m = HumanMessage(content=state.messages[-1])
-        
-        msgs = [SystemMessage(content=EXTRACTION_SYSTEM)] + [draft_m, m]
-    
-        res = await invoke_llm(llm, msgs)
-    
-        # Expect JSON
-        try:
-            data = json_parser.parse(res.content)
-            
-        except Exception:
-            data = {}
-    
-        draft = state.draft.model_copy(deep=True)
-    
-        # Merge extracted fields if present
-        host = data["host_full_name"]
-        attendee = data["attendee_full_name"]
-        subject = data["subject"]
-        start_time_text = data["start_time_text"]
-        duration = data["duration_minutes"]
-        tz = data.get("timezone") or draft.timezone or default_tz
-    
-        if host and not draft.host_full_name:
-            draft.host_full_name = host
-        if attendee and not draft.attendee_full_name:
-            draft.attendee_full_name = attendee
-        if subject and not draft.subject:
-            draft.subject = subject
-        if isinstance(duration, int) and duration > 0:
-            draft.duration_minutes = duration
-        draft.timezone = tz
-    
-        # Parse start time if provided
-        if start_time_text:
-            parsed = parse_user_date(start_time_text, None)
-            if parsed:
-                draft.start_time_iso = parsed.isoformat()
-    
+        draft = await extract_draft(llm, json_parser, state.draft, state.messages[-1], default_tz)
         return {"draft": draft }
     
     async def ask_missing_node(state: AgentState) -> dict:
@@ -96,11 +52,11 @@ def build_agent(calendar: MockCalendar, memory: MemorySaver = None, config: dict
         Use LLM to format human a understandable question to get missing fields.
         """
     
-        m = state.draft.model_dump_json()    
+        m = draft_json(state.draft)    
         #msgs = [SystemMessage(content=ASK_MISSING_SYSTEM)] + format_messages(state, [ HumanMessage(content=f"draft: {json.dumps(state.draft)}")])
         msgs = [SystemMessage(content=ASK_MISSING_SYSTEM)] + [ HumanMessage(content=f"draft: {m}")]
         
-        res = await invoke_llm(llm, msgs)
+        res = await invoke_llm(llm, msgs, node="ask_missing")
         #return {"messages": [HumanMessage(content=f"draft: {json.dumps(draft)}"), res], "status": "ask_human" }
         return {"messages": [res.content], "status": "ask_human" }
     
@@ -115,37 +71,28 @@ def build_agent(calendar: MockCalendar, memory: MemorySaver = None, config: dict
     
         dur = draft.duration_minutes or 30
     
-        if state.override or calendar.is_available(draft.attendee_full_name):
+        event = None
+        busy = "attendee"
+        if state.override or calendar.is_available(draft.attendee_full_name, start, dur):
             # Confirm booking directly (you can require explicit "yes" if you want)
-            event = calendar.book(draft.host_full_name, draft.attendee_full_name, draft.subject, start, dur)
+            try:
+                event = calendar.book(draft.host_full_name, draft.attendee_full_name, draft.subject, start, dur)
+            except SlotTaken as e:
+                # Taken meanwhile, or the host is the one who is busy
+                busy = e.who
+
+        if event is not None:
             last_agent_message =  f"Booked: {event['subject']} with {event['attendee_full_name']} " + f"at {event['start_time_iso']} for {event['duration_minutes']} minutes by host {event['host_full_name']}."
-        
+
             #return {"status": "booked", "booked_event": event, "messages": [AIMessage(content=last_agent_message)] }
-    
+
             return {"status": "booked", "booked_event": event, "messages": [last_agent_message] }
-    
+
         # Busy → propose alternatives
-        suggestions = calendar.suggest_alternatives(draft.attendee_full_name, start, dur, count=3)
-    
-        
-        # Build human-friendly suggestions
-        nice = []
-        last_agent_message = None
-        
-        for s in suggestions:
-            dt_obj = s[0].astimezone(tz)
-            nice.append(dt_obj.strftime("%a, %b %d at %-I:%M %p"))
-        if nice:
-            last_agent_message = (
-                f"The attendee {draft.attendee_full_name} is busy then. Ask {draft.host_full_name}' to choose from these alternative time slots: "
-                + "; ".join(nice)
-                + " ?"
-            )
-        else:
-            last_agent_message = (
-                f"The attendee {draft.attendee_full_name} is busy then, and I couldn't find an open slot soon. "
-                "What other times should I try?"
-            )
+        suggestions = calendar.suggest_alternatives(
+            draft.attendee_full_name, start, dur, count=3, timezone=tz.zone, host=draft.host_full_name
+        )
+        last_agent_message = busy_message(draft, suggestions, tz, busy)
     
         d =  {"override" : True, 
               "suggestions": [SlotSuggestion(start_time_iso=s[0].isoformat(), duration_minutes=s[1]) for s in suggestions] }
@@ -171,13 +118,13 @@ def build_agent(calendar: MockCalendar, memory: MemorySaver = None, config: dict
         Use LLM to format human to get alternative time slits
         """
     
-        m = state.draft.model_dump_json()
+        m = draft_json(state.draft)
         s = state.messages[-1]
         #msgs = [SystemMessage(content=ASK_SUGGESTIONS_SYSTEM)] + format_messages(state, [ HumanMessage(content=f"draft: {m}")])
     
         msgs = [SystemMessage(content=ASK_SUGGESTIONS_SYSTEM)] + [HumanMessage(content=f"draft: {m}")] + [s]
         
-        res = await invoke_llm(llm, msgs)
+        res = await invoke_llm(llm, msgs, node="ask_alternative")
         #return {"messages": [HumanMessage(content=f"draft: {m}"), res], "status": "ask_human" }
         return {"messages": [res.content], "status": "ask_human" }
     
@@ -206,7 +153,7 @@ def build_agent(calendar: MockCalendar, memory: MemorySaver = None, config: dict
         #msgs = [SystemMessage(content=SUMMARIZE_SYSTEM)] + format_messages(state, [ HumanMessage(content=f"draft: {m}")])
         m = [state.messages[-1]]
         msgs = [SystemMessage(content=SUMMARIZE_SYSTEM)] + [ HumanMessage(content=f"draft: {m}")]
-        res = await invoke_llm(llm, msgs)
+        res = await invoke_llm(llm, msgs, node="summarize")
         #return {"messages": [HumanMessage(content=f"draft: {m}"), res]}
         return {"messages": [res.content]}
     
@@ -0,0 +1,41 @@
+from __future__ import annotations
+import datetime as dt
+from typing import List, Sequence, Tuple
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from .schemas import MeetingDraft, draft_json
+from .prompts import ASK_SUGGESTIONS_SYSTEM, SUMMARIZE_SYSTEM
+
+# Messages and reply prompts of the availability check, shared by the agents and by
+# speculation, which only pays off when it builds exactly the prompt the node will.
+
+
+def booked_message(event: dict) -> str:
+    return f"Booked: {event['subject']} with {event['attendee_full_name']} " + f"at {event['start_time_iso']} for {event['duration_minutes']} minutes by host {event['host_full_name']}."
+
+
+def busy_message(draft: MeetingDraft, suggestions: Sequence[Tuple[dt.datetime, int]], tz, who: str = "attendee") -> str:
+    # `who` is the side that is busy, "attendee" or "host"
+    name = draft.host_full_name if who == "host" else draft.attendee_full_name
+    # Build human-friendly suggestions
+    nice = [s[0].astimezone(tz).strftime("%a, %b %d at %-I:%M %p") for s in suggestions]
+    if nice:
+        return (
+            f"The {who} {name} is busy then. Ask {draft.host_full_name}' to choose from these alternative time slots: "
+            + "; ".join(nice)
+            + " ?"
+        )
+    return (
+        f"The {who} {name} is busy then, and I couldn't find an open slot soon. "
+        "What other times should I try?"
+    )
+
+
+def alternatives_prompt(draft: MeetingDraft, message: str) -> List:
+    return [SystemMessage(content=ASK_SUGGESTIONS_SYSTEM)] + [HumanMessage(content=f"draft: {draft_json(draft)}")] + [message]
+
+
+def summary_prompt(message: str) -> List:
+    m = [message]
+    return [SystemMessage(content=SUMMARIZE_SYSTEM)] + [HumanMessage(content=f"draft: {m}")]
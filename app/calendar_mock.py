@@ -1,61 +1,258 @@
 from __future__ import annotations
 import datetime as dt
-import hashlib
+import itertools
+import threading
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
-from typing import List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 import pytz
 
+from .slot_finder import SlotFinder, WorkingHours
+from .metrics import CALENDAR_SECONDS, timed
+
 @dataclass
 class BusyBlock:
     start: dt.datetime
     end: dt.datetime
 
+
+def _key(attendee: str) -> str:
+    return " ".join(attendee.lower().split())
+
+
+class BusyIndex:
+    """
+    Free/busy intervals per attendee. Blocks are merged into disjoint half-open
+    [start, end) intervals kept as two sorted arrays of POSIX timestamps, so an
+    overlap query is a single bisect.
+    """
+
+    def __init__(self):
+        self._starts: Dict[str, List[float]] = {}
+        self._ends: Dict[str, List[float]] = {}
+
+    def load(self, attendee: str, blocks: Iterable[BusyBlock]) -> None:
+        """
+        Bulk load: sort once and merge, replacing whatever the attendee had.
+        """
+        spans = sorted((b.start.timestamp(), b.end.timestamp()) for b in blocks)
+        starts: List[float] = []
+        ends: List[float] = []
+        for s, e in spans:
+            if e <= s:
+                continue
+            if ends and s <= ends[-1]:
+                if e > ends[-1]:
+                    ends[-1] = e
+            else:
+                starts.append(s)
+                ends.append(e)
+        key = _key(attendee)
+        self._starts[key] = starts
+        self._ends[key] = ends
+
+    def add(self, attendee: str, block: BusyBlock) -> None:
+        s, e = block.start.timestamp(), block.end.timestamp()
+        if e <= s:
+            return
+        key = _key(attendee)
+        starts = self._starts.setdefault(key, [])
+        ends = self._ends.setdefault(key, [])
+        # Intervals touching [s, e) are merged into it
+        lo = bisect_left(ends, s)
+        hi = bisect_right(starts, e)
+        if lo < hi:
+            s = min(s, starts[lo])
+            e = max(e, ends[hi - 1])
+        starts[lo:hi] = [s]
+        ends[lo:hi] = [e]
+
+    def is_busy(self, attendee: str, start: dt.datetime, end: dt.datetime) -> bool:
+        key = _key(attendee)
+        ends = self._ends.get(key)
+        if not ends:
+            return False
+        # First interval ending after `start`; busy if it begins before `end`
+        i = bisect_right(ends, start.timestamp())
+        return i < len(ends) and self._starts[key][i] < end.timestamp()
+
+    def spans(self, attendee: str, start: float, end: float) -> List[Tuple[float, float]]:
+        """
+        Merged (start, end) timestamps of the intervals overlapping [start, end).
+        """
+        key = _key(attendee)
+        starts, ends = self._starts.get(key), self._ends.get(key)
+        if not ends:
+            return []
+        lo = bisect_right(ends, start)
+        hi = bisect_left(starts, end)
+        return list(zip(starts[lo:hi], ends[lo:hi]))
+
+    def blocks(self, attendee: str) -> List[BusyBlock]:
+        key = _key(attendee)
+        return [
+            BusyBlock(dt.datetime.fromtimestamp(s, pytz.utc), dt.datetime.fromtimestamp(e, pytz.utc))
+            for s, e in zip(self._starts.get(key, []), self._ends.get(key, []))
+        ]
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._starts.values())
+
+class EventStore:
+    """
+    Booked events by id, with per-host and per-attendee indexes.
+    """
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self.events: Dict[str, dict] = {}
+        self.by_host: Dict[str, List[str]] = {}
+        self.by_attendee: Dict[str, List[str]] = {}
+
+    def next_id(self) -> str:
+        return f"evt-{next(self._ids)}"
+
+    def add(self, event: dict) -> dict:
+        self.events[event["id"]] = event
+        self.by_host.setdefault(_key(event["host_full_name"]), []).append(event["id"])
+        self.by_attendee.setdefault(_key(event["attendee_full_name"]), []).append(event["id"])
+        return event
+
+    def get(self, event_id: str) -> Optional[dict]:
+        return self.events.get(event_id)
+
+    def for_host(self, host: str) -> List[dict]:
+        return [self.events[i] for i in self.by_host.get(_key(host), [])]
+
+    def for_attendee(self, attendee: str) -> List[dict]:
+        return [self.events[i] for i in self.by_attendee.get(_key(attendee), [])]
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+
+class SlotTaken(Exception):
+    """
+    book() found the host or the attendee (`who`) already busy at the requested time.
+    """
+
+    def __init__(self, who: str, name: str):
+        super().__init__(f"the {who} {name} is busy then")
+        self.who = who
+        self.name = name
+
+
 class MockCalendar:
     """
     Deterministic free/busy based on attendee name + date.
     Also stores booked events in-memory per process (fine for demo).
     """
 
-    def __init__(self, busy_attendees):
+    def __init__(self, busy_attendees, busy: Optional[BusyIndex] = None, horizon_days: int = 14):
         self.busy_attendees = busy_attendees
+        self.busy = busy if busy is not None else BusyIndex()
+        self.slots = SlotFinder(self.busy)
+        self.horizon_days = horizon_days
+        self.events = EventStore()
+        # One calendar serves every session, check-and-book must not interleave
+        self._book_lock = threading.Lock()
+
+    def is_always_busy(self, attendee: str) -> bool:
+        """
+        Demo rule: attendees whose name contains one of `busy_attendees` are never free.
+        """
+        key = _key(attendee)
+        return any(b.lower() in key for b in self.busy_attendees)
 
-    def is_available(self, attendee: str) -> bool:
-        for b in self.busy_attendees:
-            if b.lower() in attendee.lower():
-                return False
+    @timed(CALENDAR_SECONDS, op="is_available")
+    def is_available(
+        self,
+        attendee: str,
+        start: Optional[dt.datetime] = None,
+        duration_minutes: Optional[int] = None,
+    ) -> bool:
+        if self.is_always_busy(attendee):
+            return False
+        if start is None:
+            return True
+        end = start + dt.timedelta(minutes=duration_minutes or 30)
+        return not self.busy.is_busy(attendee, start, end)
 
-        return True
-            
 
+    @timed(CALENDAR_SECONDS, op="suggest_alternatives")
     def suggest_alternatives(
         self,
         attendee: str,
         start: dt.datetime,
         duration_minutes: int,
-        count: int = 3
+        count: int = 3,
+        timezone: Optional[str] = None,
+        host: Optional[str] = None,
     ) -> List[Tuple[dt.datetime, int]]:
         """
-        Suggest next available slots in 30-min steps, same day then next day.
+        Suggest the next slots after `start`, on the half hour within 9-17 on weekdays
+        in `timezone` (the requester's), that the attendee and the host are free in.
         """
-        suggestions: List[Tuple[dt.datetime + dt.timedelta(days=1), int]] = []
-        cursor = start
-        for _ in range(96):  # scan up to ~2 days in 30m steps
-            cursor = cursor + dt.timedelta(minutes=30)
-            # keep within 9–17 for realism
-            if 9 <= cursor.hour <= 16:
-                suggestions.append((cursor, duration_minutes))
-                if len(suggestions) >= count:
-                    return suggestions
-        return suggestions
+        attendees = [attendee] if host is None else [attendee, host]
+        # The requested start was turned down, only suggest later ones
+        return self.find_common_slots(attendees, start + dt.timedelta(minutes=1), duration_minutes, count, timezone=timezone)
 
+    @timed(CALENDAR_SECONDS, op="find_common_slots")
+    def find_common_slots(
+        self,
+        attendees: List[str],
+        start: dt.datetime,
+        duration_minutes: int,
+        count: int = 3,
+        timezone: Optional[str] = None,
+        **kwargs,
+    ) -> List[Tuple[dt.datetime, int]]:
+        """
+        Earliest slots every attendee is free in, see SlotFinder.find for the options.
+        Working hours default to 9-17 on weekdays in `timezone`, else in the zone of
+        `start` when it has a named one.
+        """
+        kwargs.setdefault("horizon_days", self.horizon_days)
+        if "working_hours" not in kwargs:
+            # A fromisoformat() start only has a fixed offset, which names no zone
+            timezone = timezone or getattr(start.tzinfo, "zone", None)
+            kwargs["working_hours"] = WorkingHours(timezone=timezone) if timezone else WorkingHours()
+        return self.slots.find(attendees, start, duration_minutes, count, **kwargs)
+
+    def conflict(self, host: str, attendee: str, start: dt.datetime, duration_minutes: int) -> Optional[str]:
+        """
+        "attendee" or "host", whichever already has something at that time (the
+        attendee first), None if both are free.
+        """
+        end = start + dt.timedelta(minutes=duration_minutes)
+        if self.busy.is_busy(attendee, start, end):
+            return "attendee"
+        if self.busy.is_busy(host, start, end):
+            return "host"
+        return None
+
+    @timed(CALENDAR_SECONDS, op="book")
     def book(self, host: str, attendee: str, subject: str, start: dt.datetime, duration_minutes: int) -> dict:
-        event = {
-            "id": f"1",
-            "host_full_name": host,
-            "attendee_full_name": attendee,
-            "subject": subject,
-            "start_time_iso": start.isoformat(),
-            "duration_minutes": duration_minutes,
-        }
-        return event
+        """
+        Book the meeting unless the host or the attendee already has something at that
+        time, in which case nothing is stored and SlotTaken says which of them. The demo
+        name rule is not applied here, so a host can still insist on an "always busy" attendee.
+        """
+        block = BusyBlock(start, start + dt.timedelta(minutes=duration_minutes))
+        with self._book_lock:
+            who = self.conflict(host, attendee, start, duration_minutes)
+            if who is not None:
+                raise SlotTaken(who, attendee if who == "attendee" else host)
+            event = {
+                "id": self.events.next_id(),
+                "host_full_name": host,
+                "attendee_full_name": attendee,
+                "subject": subject,
+                "start_time_iso": start.isoformat(),
+                "duration_minutes": duration_minutes,
+            }
+            self.busy.add(attendee, block)
+            if _key(host) != _key(attendee):
+                self.busy.add(host, block)
+            return self.events.add(event)
 
@@ -0,0 +1,576 @@
+from __future__ import annotations
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    WRITES_IDX_MAP,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+
+class SizedMemorySaver(MemorySaver):
+    """
+    MemorySaver that keeps track of the serialized bytes it holds per thread, and
+    which keys belong to which thread so that deleting a thread does not scan
+    every other session's writes and blobs.
+
+    Every step of a turn adds a checkpoint, so a long conversation would hold all of
+    them. Like SqliteSaver, a thread is compacted down to its `keep_last` newest
+    checkpoints (0 keeps all) on every put, dropping the writes and blobs only the
+    removed checkpoints used.
+    """
+
+    def __init__(self, keep_last: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.keep_last = keep_last
+        self.thread_bytes: Dict[str, int] = defaultdict(int)
+        self._thread_blobs: Dict[str, Set[tuple]] = defaultdict(set)
+        self._thread_writes: Dict[str, Set[tuple]] = defaultdict(set)
+        # thread_id -> (checkpoint_ns, checkpoint_id) -> channel versions, saves deserializing to compact
+        self._versions: Dict[str, Dict[tuple, dict]] = defaultdict(dict)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        size = 0
+        for k, v in new_versions.items():
+            key = (thread_id, checkpoint_ns, k, v)
+            self._thread_blobs[thread_id].add(key)
+            size += len(self.blobs[key][1])
+        saved, meta, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+        size += len(saved[1]) + len(meta[1])
+        self.thread_bytes[thread_id] += size
+        if self.keep_last:
+            self._versions[thread_id][(checkpoint_ns, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+            self._compact_thread(thread_id, checkpoint_ns)
+        return next_config
+
+    def _compact_thread(self, thread_id: str, checkpoint_ns: str) -> None:
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.keep_last:
+            return
+        ids = sorted(checkpoints)
+        oldest_kept = ids[-self.keep_last]
+        versions = self._versions[thread_id].get((checkpoint_ns, oldest_kept))
+        if versions is None:
+            versions = self.serde.loads_typed(checkpoints[oldest_kept][0])["channel_versions"]
+        freed = 0
+        for checkpoint_id in ids[:-self.keep_last]:
+            saved, meta, _ = checkpoints.pop(checkpoint_id)
+            freed += len(saved[1]) + len(meta[1])
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            self._versions[thread_id].pop((checkpoint_ns, checkpoint_id), None)
+            writes = self.writes.pop(key, None)
+            if writes:
+                self._thread_writes[thread_id].discard(key)
+                freed += sum(len(entry[2][1]) for entry in writes.values())
+        # Versions only grow, so blobs older than what the oldest kept checkpoint points at are unreachable
+        blobs = self._thread_blobs[thread_id]
+        for key in [k for k in blobs if k[1] == checkpoint_ns and k[2] in versions and k[3] < versions[k[2]]]:
+            blobs.discard(key)
+            value = self.blobs.pop(key, None)
+            if value is not None:
+                freed += len(value[1])
+        self.thread_bytes[thread_id] -= freed
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        outer_key = (thread_id, checkpoint_ns, config["configurable"]["checkpoint_id"])
+        before = len(self.writes.get(outer_key, ()))
+        super().put_writes(config, writes, task_id, task_path)
+        stored = self.writes.get(outer_key)
+        if not stored or len(stored) == before:
+            return
+        self._thread_writes[thread_id].add(outer_key)
+        size = 0
+        for idx, (c, _) in enumerate(writes):
+            entry = stored.get((task_id, WRITES_IDX_MAP.get(c, idx)))
+            if entry is not None:
+                size += len(entry[2][1])
+        self.thread_bytes[thread_id] += size
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.storage.pop(thread_id, None)
+        for key in self._thread_writes.pop(thread_id, ()):
+            self.writes.pop(key, None)
+        for key in self._thread_blobs.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        self.thread_bytes.pop(thread_id, None)
+        self._versions.pop(thread_id, None)
+
+    def resident_bytes(self, thread_id: str) -> int:
+        return self.thread_bytes.get(thread_id, 0)
+
+
+class _ConnectionPool:
+    """
+    Small pool of sqlite connections shared by the threads that serve checkpointer calls.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE INDEX IF NOT EXISTS checkpoints_created_at ON checkpoints (created_at);
+"""
+
+
+class SqliteSaver(BaseCheckpointSaver):
+    """
+    Checkpointer backed by a local sqlite database in WAL mode, so every uvicorn worker
+    on the host sees the same threads and sessions survive restarts.
+
+    Like MemorySaver, channel values are stored once per version in `blobs` and a
+    checkpoint only references them. Puts and writes are buffered and committed in one
+    transaction when `batch_size` rows are pending, when the buffer is read through,
+    and at the end of each chat turn (`flush`). Flushing also compacts the threads it
+    touched down to their `keep_last` newest checkpoints; `compact` additionally drops
+    threads idle for longer than `retention_seconds`.
+    """
+
+    persistent = True
+
+    def __init__(
+        self,
+        path: str,
+        pool_size: int = 4,
+        batch_size: int = 64,
+        keep_last: int = 20,
+        retention_seconds: float = 0,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.pool = _ConnectionPool(path, pool_size)
+        self.batch_size = batch_size
+        self.keep_last = keep_last
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        # Held for a whole flush so a reader cannot query between the swap and the commit
+        self._flush_lock = threading.Lock()
+        self._checkpoints: List[tuple] = []
+        self._blobs: List[tuple] = []
+        self._writes_ignore: List[tuple] = []
+        self._writes_replace: List[tuple] = []
+        self._touched: Set[Tuple[str, str]] = set()
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _pending(self) -> int:
+        return len(self._checkpoints) + len(self._blobs) + len(self._writes_ignore) + len(self._writes_replace)
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._lock:
+            if not self._pending():
+                return
+            checkpoints, self._checkpoints = self._checkpoints, []
+            blobs, self._blobs = self._blobs, []
+            writes_ignore, self._writes_ignore = self._writes_ignore, []
+            writes_replace, self._writes_replace = self._writes_replace, []
+            touched, self._touched = self._touched, set()
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blobs)
+                conn.executemany("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", checkpoints)
+                conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", writes_ignore)
+                conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", writes_replace)
+                if self.keep_last:
+                    for thread_id, checkpoint_ns in touched:
+                        self._compact_thread(conn, thread_id, checkpoint_ns)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def aflush(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    def _compact_thread(self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str) -> None:
+        row = conn.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last - 1),
+        ).fetchone()
+        if row is None:
+            return
+        oldest_kept, type_, saved = row
+        key = (thread_id, checkpoint_ns, oldest_kept)
+        conn.execute("DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?", key)
+        conn.execute("DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?", key)
+        # Versions only grow, so blobs older than what the oldest kept checkpoint points at are unreachable
+        versions = self.serde.loads_typed((type_, saved))["channel_versions"]
+        conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version < ?",
+            [(thread_id, checkpoint_ns, channel, version) for channel, version in versions.items()],
+        )
+
+    def compact(self) -> None:
+        self.flush()
+        with self._flush_lock, self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.retention_seconds:
+                    idle = conn.execute(
+                        "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?",
+                        (time.time() - self.retention_seconds,),
+                    ).fetchall()
+                    for (thread_id,) in idle:
+                        self._delete_thread(conn, thread_id)
+                if self.keep_last:
+                    for thread_id, checkpoint_ns in conn.execute(
+                        "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints"
+                    ).fetchall():
+                        self._compact_thread(conn, thread_id, checkpoint_ns)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def get_next_version(self, current: Optional[int], channel: None) -> int:
+        return 1 if current is None else int(current) + 1
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config, full = self._buffer_checkpoint(config, checkpoint, metadata, new_versions)
+        if full:
+            self.flush()
+        return next_config
+
+    def _buffer_checkpoint(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> Tuple[RunnableConfig, bool]:
+        c = checkpoint.copy()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        values: Dict[str, Any] = c.pop("channel_values")
+        blobs = []
+        for k, v in new_versions.items():
+            type_, blob = self.serde.dumps_typed(values[k]) if k in values else ("empty", b"")
+            blobs.append((thread_id, checkpoint_ns, k, v, type_, blob))
+        type_, saved = self.serde.dumps_typed(c)
+        metadata_type, saved_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        row = (
+            thread_id,
+            checkpoint_ns,
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            type_,
+            saved,
+            metadata_type,
+            saved_metadata,
+            time.time(),
+        )
+        with self._lock:
+            self._blobs.extend(blobs)
+            self._checkpoints.append(row)
+            self._touched.add((thread_id, checkpoint_ns))
+            full = self._pending() >= self.batch_size
+        next_config = {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+        return next_config, full
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if self._buffer_writes(config, writes, task_id, task_path):
+            self.flush()
+
+    def _buffer_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str,
+    ) -> bool:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (c, v) in enumerate(writes):
+            type_, value = self.serde.dumps_typed(v)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(c, idx), c, type_, value, task_path))
+        with self._lock:
+            # Special channels (errors, interrupts, ...) overwrite, regular writes are kept once
+            if all(c in WRITES_IDX_MAP for c, _ in writes):
+                self._writes_replace.extend(rows)
+            else:
+                self._writes_ignore.extend(rows)
+            return self._pending() >= self.batch_size
+
+    def _load_tuple(self, conn: sqlite3.Connection, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, saved, metadata_type, saved_metadata = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, saved))
+        channel_values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, version),
+            ).fetchone()
+            if blob is None or blob[0] == "empty":
+                continue
+            channel_values[channel] = self.serde.loads_typed(blob)
+        writes = conn.execute(
+            "SELECT task_id, channel, type, value, task_path, idx FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[4], w[0], w[5]))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self.serde.loads_typed((metadata_type, saved_metadata)),
+            pending_writes=[(task_id, c, self.serde.loads_typed((t, v))) for task_id, c, t, v, _, _ in writes],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self.flush()
+        list_config = {"configurable": {"checkpoint_ns": "", **config["configurable"]}}
+        return next(self.list(list_config, limit=1), None)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        self.flush()
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_checkpoint_id)
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY checkpoint_id DESC"
+        )
+        # A metadata filter is applied to the loaded rows, so only without one can sqlite stop at `limit`
+        if limit is not None and not filter:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.pool.connection() as conn:
+            tuples = []
+            # Rows are fetched as they are used, not the whole thread up front
+            for row in conn.execute(query, params):
+                if limit is not None and len(tuples) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[6], row[7]))
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                tuples.append(self._load_tuple(conn, row))
+        yield from tuples
+
+    def _delete_thread(self, conn: sqlite3.Connection, thread_id: str) -> None:
+        for table in ("checkpoints", "blobs", "writes"):
+            conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.flush()
+        with self._flush_lock, self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_thread(conn, thread_id)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in tuples:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        # Buffering is cheap, only a full batch goes to disk (off the event loop)
+        next_config, full = self._buffer_checkpoint(config, checkpoint, metadata, new_versions)
+        if full:
+            await self.aflush()
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if self._buffer_writes(config, writes, task_id, task_path):
+            await self.aflush()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.delete_thread, thread_id)
+
+
+def make_checkpointer() -> BaseCheckpointSaver:
+    """
+    Checkpointer shared by all workflows, chosen with CHECKPOINTER=memory|sqlite.
+    """
+    kind = os.getenv("CHECKPOINTER", "memory").lower()
+    if kind == "sqlite":
+        return SqliteSaver(
+            os.getenv("CHECKPOINT_DB", "checkpoints.sqlite"),
+            pool_size=int(os.getenv("CHECKPOINT_POOL_SIZE", "4")),
+            batch_size=int(os.getenv("CHECKPOINT_BATCH_SIZE", "64")),
+            keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "20")),
+            retention_seconds=float(os.getenv("CHECKPOINT_RETENTION_SECONDS", str(7 * 24 * 3600))),
+        )
+    return SizedMemorySaver(keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "20")))
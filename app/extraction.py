@@ -0,0 +1,338 @@
+from __future__ import annotations
+import asyncio
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from .schemas import MeetingDraft, draft_json
+from .prompts import EXTRACTION_SYSTEM, EXTRACTION_BATCH_SYSTEM, FUSED_SYSTEM
+from .utils import TIME_PHRASE_RE, parse_user_date
+from .llm import CACHED_NODES, RESPONSE_CACHE, invoke_llm
+from . import metrics
+
+# Words that end a name or subject captured by the patterns below
+_STOP = r"(?:about|on|at|for|regarding|to|re|with|hosted|tomorrow|today|next|this|in)"
+# Capitalized words that still are not (part of) a name: "with My manager", "with The team"
+_NOT_NAME = r"(?:my|our|your|his|her|their|the|a|an|me|us|him|them|everyone|someone|team|booking|meeting|call)"
+# Up to three capitalized words ("(?-i:...)" keeps the case check under re.IGNORECASE)
+_WORD = rf"(?!(?:{_STOP}|{_NOT_NAME})\b)(?-i:[A-Z])[\w'.-]*"
+_NAME = rf"({_WORD}(?:\s+{_WORD}){{0,2}}?)"
+_END = rf"(?=\s+{_STOP}\b|\s+\d|\s*[,;!?]|\.(?:\s|$)|\s*$)"
+
+WITH_RE = re.compile(rf"\bwith\s+{_NAME}{_END}", re.IGNORECASE)
+HOSTED_BY_RE = re.compile(rf"\bhosted\s+by\s+{_NAME}{_END}", re.IGNORECASE)
+# Not "how about ..." / "what about ...", which propose a time rather than name a subject
+ABOUT_RE = re.compile(
+    r"(?<!\bhow\s)(?<!\bwhat\s)\babout\s+(.+?)(?=\s+(?:on|at|next|this|tomorrow|today|hosted|with)\b|\s+\d{1,2}/\d{1,2}/\d{2,4}|\s*[,;!?]|\.(?:\s|$)|\s*$)",
+    re.IGNORECASE,
+)
+# Not "in 2 hours", which is when the meeting starts
+DURATION_RE = re.compile(r"(?<!\bin\s)\b(\d{1,3}(?:\.\d+)?)\s*-?\s*(minutes?|mins?|hours?|hrs?)\b", re.IGNORECASE)
+# "01/27/2026 6 pm", "1/27/26 at 6:30pm", "2026-01-27T18:00:00-08:00"; a time of day is required
+ABSOLUTE_TIME_RE = re.compile(
+    r"\b\d{1,2}/\d{1,2}/\d{2,4}\s+(?:at\s+)?\d{1,2}(?::\d{2})?\s*(?:am|pm)\b"
+    r"|\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2})?(?:Z|[+-]\d{2}:?\d{2})?",
+    re.IGNORECASE,
+)
+# Clauses that may follow a relative time phrase ("next tuesday 3pm hosted by Sam")
+CLAUSE_RE = re.compile(r"\s+(?:hosted\s+by|with|about|for)\b.*$", re.IGNORECASE)
+# A time of day, without one a phrase like "on Monday" parses to midnight
+TIME_OF_DAY_RE = re.compile(
+    r"\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\d{1,2}:\d{2}|\b(?:noon|midnight)\b"
+    r"|\bin\s+\d{1,3}(?:\.\d+)?\s*(?:minutes?|mins?|hours?|hrs?)\b",
+    re.IGNORECASE,
+)
+# Anything that looks like a date or time ("10:30 works", "at 3", ...); if present it must be
+# parsed for the rules to be trusted. Covers everything TIME_OF_DAY_RE does.
+DATE_HINT_RE = re.compile(
+    rf"\d{{1,2}}/\d{{1,2}}|\d{{4}}-\d{{2}}-\d{{2}}|\bat\s+\d{{1,2}}\b|{TIME_OF_DAY_RE.pattern}",
+    re.IGNORECASE,
+)
+# A subject made of date/time words only ("about tomorrow", "about Friday at 10am") is not one
+_DATE_WORD = (
+    r"(?:today|tomorrow|tonight|next|this|week|weekend|morning|afternoon|evening|noon|midnight|at|on"
+    r"|(?:mon|tues|wednes|thurs|fri|satur|sun)day|jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?"
+    r"|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?|\d[\d:/.]*(?:am|pm)?)"
+)
+DATE_ONLY_RE = re.compile(rf"{_DATE_WORD}(?:[\s,]+{_DATE_WORD})*[\s,]*", re.IGNORECASE)
+
+# Skip the LLM when the rules alone complete the draft, EXTRACT_FAST_PATH=0 always asks the LLM
+FAST_PATH = os.getenv("EXTRACT_FAST_PATH", "1") != "0"
+
+# How extraction turns were served: "rules" (no LLM call) or "llm"
+EXTRACTION_STATS: Counter = Counter()
+
+# EXTRACT_BATCH_WINDOW_MS > 0: LLM extractions of concurrent sessions that arrive within this
+# window, or until EXTRACT_BATCH_SIZE are waiting, are sent upstream as one multi-item prompt
+EXTRACT_BATCH_WINDOW_MS = float(os.getenv("EXTRACT_BATCH_WINDOW_MS", "0"))
+EXTRACT_BATCH_SIZE = int(os.getenv("EXTRACT_BATCH_SIZE", "16"))
+
+
+def _name(value: str) -> str:
+    return " ".join(w.capitalize() if w.islower() else w for w in value.split())
+
+
+def rule_extract(message: str) -> Dict[str, Any]:
+    """
+    Deterministic extraction of the fields that follow fixed patterns. Returns the same
+    keys as the LLM extraction (plus start_time_iso when the time parsed), leaving out
+    what it could not confidently find, and `time_unparsed` when the message mentions a
+    date or time the rules could not resolve.
+    """
+    data: Dict[str, Any] = {}
+    if m := HOSTED_BY_RE.search(message):
+        data["host_full_name"] = _name(m.group(1))
+    if m := WITH_RE.search(message):
+        data["attendee_full_name"] = _name(m.group(1))
+    if (m := ABOUT_RE.search(message)) and not DATE_ONLY_RE.fullmatch(m.group(1)):
+        data["subject"] = " ".join(m.group(1).split())
+    if m := DURATION_RE.search(message):
+        amount = float(m.group(1))
+        minutes = amount * 60 if m.group(2).lower().startswith(("h", "hr")) else amount
+        if minutes > 0 and minutes == int(minutes):
+            data["duration_minutes"] = int(minutes)
+
+    phrase = None
+    rest = message
+    if m := ABSOLUTE_TIME_RE.search(message):
+        phrase = m.group(0)
+    elif m := TIME_PHRASE_RE.search(message):
+        phrase = CLAUSE_RE.sub("", m.group(0)).strip()
+    if phrase:
+        rest = message[:m.start()] + message[m.start() + len(phrase):]
+        # A date without a time of day, or a date/time the phrase left out, is not trusted
+        parsed = parse_user_date(phrase, None) if TIME_OF_DAY_RE.search(phrase) and not DATE_HINT_RE.search(rest) else None
+        if parsed:
+            data["start_time_text"] = phrase
+            data["start_time_iso"] = parsed.isoformat()
+    if "start_time_iso" not in data and (phrase or DATE_HINT_RE.search(rest)):
+        data["time_unparsed"] = True
+    return data
+
+
+def merge_extraction(draft: MeetingDraft, data: Dict[str, Any], default_tz: str) -> MeetingDraft:
+    """
+    Merge extracted fields into the draft. Names and subject only fill empty fields,
+    duration and start time may be changed by a later message.
+
+    Drafts are never changed in place: the draft itself is returned when nothing
+    changed, otherwise a shallow copy with the changed fields (all fields are
+    immutable values, so nothing else needs copying).
+    """
+    changes: Dict[str, Any] = {}
+
+    host = data.get("host_full_name")
+    attendee = data.get("attendee_full_name")
+    subject = data.get("subject")
+    start_time_text = data.get("start_time_text")
+    duration = data.get("duration_minutes")
+    tz = data.get("timezone") or draft.timezone or default_tz
+
+    if host and not draft.host_full_name:
+        changes["host_full_name"] = host
+    if attendee and not draft.attendee_full_name:
+        changes["attendee_full_name"] = attendee
+    if subject and not draft.subject:
+        changes["subject"] = subject
+    if isinstance(duration, int) and duration > 0 and duration != draft.duration_minutes:
+        changes["duration_minutes"] = duration
+    if tz != draft.timezone:
+        changes["timezone"] = tz
+
+    # Parse start time if provided
+    start_time_iso = data.get("start_time_iso")
+    if not start_time_iso and start_time_text:
+        parsed = parse_user_date(start_time_text, None)
+        if parsed:
+            start_time_iso = parsed.isoformat()
+    if start_time_iso and start_time_iso != draft.start_time_iso:
+        changes["start_time_iso"] = start_time_iso
+
+    return draft.model_copy(update=changes) if changes else draft
+
+
+def is_complete(draft: MeetingDraft) -> bool:
+    return bool(draft.host_full_name and draft.attendee_full_name and draft.subject and draft.start_time_iso)
+
+
+def rules_draft(draft: MeetingDraft, rules: Dict[str, Any], default_tz: str) -> MeetingDraft | None:
+    """
+    The draft the rules alone make of a message, when they may answer without the LLM:
+    they found at least one field in this message, left no date/time in it unparsed,
+    and the merged draft is complete. A draft that was complete before is not enough,
+    a follow-up ("10:30 works", "the second one") would otherwise be ignored.
+    """
+    if rules.get("time_unparsed") or not any(k != "time_unparsed" for k in rules):
+        return None
+    merged = merge_extraction(draft, rules, default_tz)
+    return merged if is_complete(merged) else None
+
+
+def predict_draft(draft: MeetingDraft, message: str, default_tz: str) -> MeetingDraft | None:
+    """
+    rules_draft of the message. Extraction takes the fast path to the same draft then
+    (unless it is turned off), which is what speculation bets on.
+    """
+    return rules_draft(draft, rule_extract(message), default_tz)
+
+
+class ExtractionBatcher:
+    """
+    Collects the extraction prompts of concurrent turns and answers them with one
+    EXTRACTION_BATCH_SYSTEM call per batch. Each item is looked up in, and its answer
+    stored under, the key of its own single-item prompt, so the response cache is shared
+    with unbatched calls. A lone item, or a batch whose reply cannot be matched up with
+    its items, is asked with the single-item prompt instead.
+    """
+
+    def __init__(self, window_ms: float = EXTRACT_BATCH_WINDOW_MS, max_size: int = EXTRACT_BATCH_SIZE):
+        self.window = window_ms / 1000
+        self.max_size = max(1, max_size)
+        self._pending: List[Tuple[Any, List, asyncio.Future]] = []
+        self._timer = None
+        self._tasks: set = set()
+        self.stats: Counter = Counter()
+
+    async def extract(self, llm, msgs: List) -> str:
+        """
+        The reply to the single-item extraction prompt `msgs`, possibly asked in a batch.
+        """
+        if "extract" in CACHED_NODES:
+            content = RESPONSE_CACHE.get(RESPONSE_CACHE.key(llm, msgs), "extract")
+            metrics.LLM_CACHE.inc(node="extract", result="miss" if content is None else "hit")
+            if content is not None:
+                return content
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((llm, msgs, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        # One upstream call per model, there is only one unless a benchmark swaps it
+        models: Dict[int, List] = {}
+        for item in batch:
+            models.setdefault(id(item[0]), []).append(item)
+        for items in models.values():
+            task = asyncio.ensure_future(self._send(items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[Any, List, asyncio.Future]]) -> None:
+        # The same prompt from several sessions is asked once
+        items: Dict[str, Tuple[Any, List, List[asyncio.Future]]] = {}
+        for llm, msgs, future in batch:
+            items.setdefault(RESPONSE_CACHE.key(llm, msgs), (llm, msgs, []))[2].append(future)
+        self.stats["batches"] += 1
+        self.stats["items"] += len(batch)
+        try:
+            replies = await self._ask(list(items.values()))
+            for (key, (_, _, futures)), content in zip(items.items(), replies):
+                if "extract" in CACHED_NODES:
+                    RESPONSE_CACHE.put(key, content)
+                for future in futures:
+                    if not future.done():
+                        future.set_result(content)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _ask(self, items: List[Tuple[Any, List, List[asyncio.Future]]]) -> List[str]:
+        from langchain_core.utils.json import parse_json_markdown
+
+        llm = items[0][0]
+        if len(items) > 1:
+            payload = [{"draft": json.loads(msgs[1].content[len("draft: "):]), "message": msgs[2].content} for _, msgs, _ in items]
+            prompt = [SystemMessage(content=EXTRACTION_BATCH_SYSTEM), HumanMessage(content=json.dumps(payload))]
+            res = await invoke_llm(llm, prompt, node="extract_batch")
+            try:
+                data = parse_json_markdown(res.content)
+            except Exception:
+                data = None
+            if isinstance(data, list) and len(data) == len(items) and all(isinstance(d, dict) for d in data):
+                self.stats["batched_items"] += len(items)
+                return [json.dumps(d) for d in data]
+            self.stats["fallbacks"] += 1
+        # Every item already missed the cache in extract()
+        replies = await asyncio.gather(*(invoke_llm(llm, msgs, node="extract", lookup=False) for llm, msgs, _ in items))
+        return [r.content for r in replies]
+
+
+BATCHER = ExtractionBatcher() if EXTRACT_BATCH_WINDOW_MS > 0 else None
+
+
+async def extract_draft(llm, json_parser, draft: MeetingDraft, message: str, default_tz: str) -> MeetingDraft:
+    """
+    Fold the latest user message into the draft. The rule based extractor runs first;
+    the LLM is only asked when the rules leave the draft incomplete or the message has
+    a date/time they could not parse, and the rules then only fill what it left out.
+    """
+    draft, _ = await _extract(llm, json_parser, draft, message, default_tz, fused=False)
+    return draft
+
+
+async def extract_draft_and_reply(llm, json_parser, draft: MeetingDraft, message: str, default_tz: str) -> Tuple[MeetingDraft, Optional[str]]:
+    """
+    extract_draft, with the question for whatever is still missing written in the same
+    LLM call (FUSED_SYSTEM). The reply is None when the LLM was not asked or gave none.
+    """
+    return await _extract(llm, json_parser, draft, message, default_tz, fused=True)
+
+
+async def _extract(llm, json_parser, draft: MeetingDraft, message: str, default_tz: str, fused: bool) -> Tuple[MeetingDraft, Optional[str]]:
+    rules = rule_extract(message)
+    if FAST_PATH and (merged := rules_draft(draft, rules, default_tz)) is not None:
+        EXTRACTION_STATS["rules"] += 1
+        return merged, None
+
+    EXTRACTION_STATS["llm"] += 1
+    draft_m = HumanMessage(content=f"draft: {draft_json(draft)}")
+    m = HumanMessage(content=message)
+    msgs = [SystemMessage(content=FUSED_SYSTEM if fused else EXTRACTION_SYSTEM)] + [draft_m, m]
+    if fused:
+        content = (await invoke_llm(llm, msgs, node="fused")).content
+    elif BATCHER is not None:
+        content = await BATCHER.extract(llm, msgs)
+    else:
+        content = (await invoke_llm(llm, msgs, node="extract")).content
+
+    # Expect JSON
+    try:
+        data = json_parser.parse(content) or {}
+    except Exception:
+        data = {}
+    reply = data.pop("reply", None) if isinstance(data, dict) else None
+
+    if FAST_PATH:
+        # The rules only fill what the LLM left out, the start time as a whole. A subject
+        # the LLM answered null for was left out on purpose ("how about 3pm" names none).
+        rules.pop("time_unparsed", None)
+        if data.get("start_time_text") or data.get("start_time_iso"):
+            rules.pop("start_time_text", None)
+            rules.pop("start_time_iso", None)
+        if "subject" in data:
+            rules.pop("subject", None)
+        data = {**rules, **{k: v for k, v in data.items() if v is not None}}
+    return merge_extraction(draft, data, default_tz), reply if isinstance(reply, str) and reply.strip() else None
+
+
+def extraction_stats() -> Dict[str, Any]:
+    total = sum(EXTRACTION_STATS.values())
+    return {
+        "rules": EXTRACTION_STATS["rules"],
+        "llm": EXTRACTION_STATS["llm"],
+        "rules_fraction": EXTRACTION_STATS["rules"] / total if total else 0.0,
+        "batches": dict(BATCHER.stats) if BATCHER is not None else None,
+    }
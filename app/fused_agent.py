@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.memory import MemorySaver
+
+from .schemas import AgentState
+from .booking import booked_message
+from .extraction import extract_draft_and_reply
+from .naive_agent import check_availability_node, missing_fields
+from .tracing import traced_node
+
+# One LLM call per turn at most: extraction and the question for what is missing come
+# from the same structured reply, and the availability check answers with its own
+# (deterministic) message instead of having the LLM rephrase it.
+
+
+@traced_node("fused")
+async def fused_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
+
+    """
+    Fold the latest message into the draft and, if it is still incomplete, ask for what is missing
+    """
+
+    if state.status == "booked":
+        return {"messages": [booked_message(state.booked_event)]}
+    ctx = runtime.context
+    draft, reply = await extract_draft_and_reply(ctx.llm, ctx.json_parser, state.draft, state.messages[-1], ctx.default_tz)
+    miss = missing_fields(draft)
+    if not miss:
+        return {"draft": draft}
+    # The LLM's own question, unless its reply had none
+    return {"draft": draft, "messages": [reply or f"Could you tell me the {', '.join(miss)}?"], "status": "ask_human"}
+
+
+async def fused_decide_next_node(state: AgentState) -> str:
+    if state.status == "booked" or missing_fields(state.draft):
+        return "end"
+    return "check_availability"
+
+
+def create_fused_graph(checkpointer=None):
+
+    g = StateGraph(AgentState)
+    g.add_node("fused", fused_node)
+    g.add_node("check_availability", check_availability_node)
+
+    g.set_entry_point("fused")
+
+    g.add_conditional_edges("fused", fused_decide_next_node, {
+        "end": END,
+        "check_availability": "check_availability",
+    })
+
+    g.add_edge("check_availability", END)
+
+    if checkpointer is None:
+        checkpointer = MemorySaver()
+
+    # Every turn runs from the entry point on the checkpointed state, no interrupt needed
+    workflow = g.compile(checkpointer=checkpointer)
+
+    return workflow
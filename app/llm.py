@@ -1,12 +1,222 @@
+import asyncio
+import functools
 import os
+import hashlib
+import json
+import time
+from collections import Counter, OrderedDict, defaultdict
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
 
-async def invoke_llm(llm, messages):
-    print("LLM request =>")
-    for m in messages:
-        print(m)
+from . import metrics, tracing
+from .llm_gateway import GATEWAY
 
-    resp = await llm.ainvoke(messages)
-    print("LLM response =>")
-    print(resp.content)
-    return resp
 
+class ResponseCache:
+    """
+    Content addressed cache of LLM replies: the key is a hash of the model name,
+    temperature and the exact message list. An in-memory LRU sits in front of an
+    optional directory of one-file-per-key entries shared by every worker.
+    """
+
+    def __init__(self, max_entries: int = 1024, directory: str | None = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self.hits = defaultdict(int)
+        self.disk_hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(llm, messages) -> str:
+        from langchain_core.messages import BaseMessage
+
+        payload = {
+            "model": getattr(llm, "model_name", None) or getattr(llm, "model", None),
+            "temperature": getattr(llm, "temperature", None),
+            "messages": [
+                [m.type, m.content] if isinstance(m, BaseMessage) else ["human", m]
+                for m in messages
+            ],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str, node: str) -> str | None:
+        content = self._entries.get(key)
+        if content is not None:
+            self._entries.move_to_end(key)
+            self.hits[node] += 1
+            return content
+        if self.directory:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                content = None
+            if content is not None:
+                self._remember(key, content)
+                self.disk_hits[node] += 1
+                return content
+        self.misses[node] += 1
+        return None
+
+    def put(self, key: str, content: str) -> None:
+        self._remember(key, content)
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp, path)
+
+    def _remember(self, key: str, content: str) -> None:
+        self._entries[key] = content
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        nodes = set(self.hits) | set(self.disk_hits) | set(self.misses)
+        return {
+            "entries": len(self._entries),
+            "hits": sum(self.hits.values()),
+            "disk_hits": sum(self.disk_hits.values()),
+            "misses": sum(self.misses.values()),
+            "nodes": {
+                n: {"hits": self.hits[n], "disk_hits": self.disk_hits[n], "misses": self.misses[n]}
+                for n in sorted(nodes)
+            },
+        }
+
+
+# Nodes whose prompts are deterministic enough to answer from the cache, LLM_CACHE_NODES="" turns caching off
+CACHED_NODES = {
+    n.strip()
+    for n in os.getenv("LLM_CACHE_NODES", "extract,ask_missing,summarize_request,planner,fused").split(",")
+    if n.strip()
+}
+
+RESPONSE_CACHE = ResponseCache(
+    max_entries=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+    directory=os.getenv("LLM_CACHE_DIR") or None,
+)
+
+
+# Nodes whose reply goes to the user as is, POST /chat/stream streams their tokens
+STREAMED_NODES = {"ask_missing", "ask_alternative", "summarize", "summarize_request"}
+
+# Set for the duration of a streamed turn, called with (node, text) for every reply token
+TOKEN_SINK: ContextVar[Optional[Callable[[str, str], None]]] = ContextVar("token_sink", default=None)
+
+
+# LLM_COALESCE=1: concurrent calls with the same prompt (as cache keyed) share one upstream call
+COALESCE = os.getenv("LLM_COALESCE", "1") == "1"
+IN_FLIGHT: Dict[str, asyncio.Future] = {}
+COALESCED: Counter = Counter()
+
+
+def coalesce_stats() -> dict:
+    return {"in_flight": len(IN_FLIGHT), "coalesced": sum(COALESCED.values()), "nodes": dict(COALESCED)}
+
+
+def _landed(flight: str, task: asyncio.Future) -> None:
+    if IN_FLIGHT.get(flight) is task:
+        del IN_FLIGHT[flight]
+    # Retrieved here in case every caller was cancelled before it failed
+    if not task.cancelled():
+        task.exception()
+
+
+async def _upstream(llm, messages, node: str | None, sink):
+    from langchain_core.messages import AIMessage
+
+    if sink is None:
+        return await GATEWAY.run(node, lambda: llm.ainvoke(messages))
+
+    chunks = []
+
+    async def stream():
+        usage = None
+        async for chunk in llm.astream(messages):
+            if chunk.content:
+                sink(node, chunk.content)
+                chunks.append(chunk.content)
+            if chunk.usage_metadata:
+                usage = chunk.usage_metadata
+        return AIMessage(content="".join(chunks), usage_metadata=usage)
+
+    # Not retried once the user has seen tokens of the reply
+    return await GATEWAY.run(node, stream, retryable=lambda: not chunks)
+
+
+async def invoke_llm(llm, messages, node: str | None = None, lookup: bool = True):
+    # Imported here so that importing the app does not load langchain_core
+    from langchain_core.messages import AIMessage
+
+    traced = tracing.enabled()
+    if traced:
+        tracing.event("llm_request", node=node, messages=[tracing.truncate(getattr(m, "content", m)) for m in messages])
+    t0 = time.perf_counter()
+
+    sink = TOKEN_SINK.get() if node in STREAMED_NODES else None
+
+    key = None
+    if node in CACHED_NODES:
+        key = RESPONSE_CACHE.key(llm, messages)
+    # lookup=False: the caller has just missed the cache for this prompt, the reply is still stored
+    if key is not None and lookup:
+        content = RESPONSE_CACHE.get(key, node)
+        metrics.LLM_CACHE.inc(node=node, result="miss" if content is None else "hit")
+        if content is not None:
+            metrics.LLM_SECONDS.observe(time.perf_counter() - t0, node=node, cached="true")
+            if traced:
+                tracing.event("llm_response", node=node, cached=True, content=tracing.truncate(content))
+            if sink is not None:
+                sink(node, content)
+            return AIMessage(content=content)
+
+    if COALESCE:
+        flight = key or RESPONSE_CACHE.key(llm, messages)
+        task = IN_FLIGHT.get(flight)
+        if task is not None:
+            # The same prompt is already on its way upstream, share its reply
+            COALESCED[node] += 1
+            metrics.LLM_COALESCED.inc(node=node)
+            resp = await asyncio.shield(task)
+            metrics.LLM_SECONDS.observe(time.perf_counter() - t0, node=node, cached="coalesced")
+            if sink is not None:
+                sink(node, resp.content)
+            return resp
+        # A task of its own, so that the callers sharing it are not cancelled with the first one
+        task = IN_FLIGHT[flight] = asyncio.ensure_future(_upstream(llm, messages, node, sink))
+        task.add_done_callback(functools.partial(_landed, flight))
+        resp = await asyncio.shield(task)
+    else:
+        resp = await _upstream(llm, messages, node, sink)
+
+    metrics.LLM_SECONDS.observe(time.perf_counter() - t0, node=node, cached="false")
+    usage = getattr(resp, "usage_metadata", None)
+    if usage:
+        metrics.LLM_TOKENS.observe(usage.get("input_tokens", 0), node=node, kind="prompt")
+        metrics.LLM_TOKENS.observe(usage.get("output_tokens", 0), node=node, kind="completion")
+    if traced:
+        tracing.event(
+            "llm_response",
+            node=node,
+            cached=False,
+            duration_ms=round(1000 * (time.perf_counter() - t0), 2),
+            content=tracing.truncate(resp.content),
+        )
+
+    if key is not None:
+        RESPONSE_CACHE.put(key, resp.content)
+    return resp
@@ -0,0 +1,218 @@
+from __future__ import annotations
+import asyncio
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from . import metrics
+
+T = TypeVar("T")
+
+# Provider calls in flight at once across all sessions (0: no limit) and per node, so one
+# busy node (say extraction during a burst of new sessions) cannot take every slot
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_NODE_CONCURRENCY = int(os.getenv("LLM_NODE_CONCURRENCY", "24"))
+# Provider calls started per second, with bursts of up to LLM_BURST (0: no limit)
+LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "0"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+# Retries of a rate limited (429), overloaded (5xx) or dropped call, backing off
+# exponentially from LLM_BACKOFF_SECONDS up to LLM_BACKOFF_MAX_SECONDS with full jitter
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+# Keep-alive connection pool shared by every model the app creates
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, at most `burst` saved up. take() waits for a token.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    async def take(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """
+    Seconds to wait before calling again if `exc` is worth a retry, None if it is not.
+    0 means back off as usual, a Retry-After header from the provider is honored.
+    """
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        # openai and httpx connection / timeout errors carry no status
+        if type(exc).__name__ not in ("APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "RemoteProtocolError"):
+            return None
+        return 0.0
+    if status not in RETRY_STATUS:
+        return None
+    response = getattr(exc, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(header)) if header else 0.0
+    except ValueError:
+        return 0.0
+
+
+class LLMGateway:
+    """
+    Every provider call of invoke_llm goes through run(): it waits for a global and a
+    per-node concurrency slot and a rate limit token, and retries rate limited or failed
+    calls with jittered exponential backoff. Cache hits never get here.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        node_concurrency: int = LLM_NODE_CONCURRENCY,
+        requests_per_second: float = LLM_REQUESTS_PER_SECOND,
+        burst: int = LLM_BURST,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff: float = LLM_BACKOFF_SECONDS,
+        backoff_max: float = LLM_BACKOFF_MAX_SECONDS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.node_concurrency = node_concurrency
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.stats_counter: Counter = Counter()
+        self.in_flight = 0
+        self.waiting = 0
+        self._loop = None
+
+    def _limits(self):
+        # Semaphores belong to the event loop they are first used on, a new loop gets new ones
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency > 0 else None
+            self._nodes: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self.node_concurrency))
+            self._bucket = TokenBucket(self.requests_per_second, self.burst) if self.requests_per_second > 0 else None
+        return self._global, self._nodes, self._bucket
+
+    async def _acquire(self, node: str):
+        glob, nodes, bucket = self._limits()
+        held = []
+        if self.node_concurrency > 0:
+            await nodes[node].acquire()
+            held.append(nodes[node])
+        try:
+            if glob is not None:
+                await glob.acquire()
+                held.append(glob)
+            if bucket is not None:
+                await bucket.take()
+        except BaseException:
+            for sem in held:
+                sem.release()
+            raise
+        return held
+
+    def _delay(self, attempt: int, hint: float) -> float:
+        # Full jitter: anywhere between 0 and the exponential ceiling, so callers
+        # throttled together do not come back together
+        ceiling = min(self.backoff_max, self.backoff * 2 ** attempt)
+        return max(hint, random.uniform(0, ceiling))
+
+    async def run(self, node: Optional[str], call: Callable[[], Awaitable[T]], retryable: Callable[[], bool] = lambda: True) -> T:
+        """
+        await call() within the limits, again after a backoff while it fails with an error
+        worth a retry and retryable() (False once a streamed reply has sent tokens).
+        """
+        node = node or "none"
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            self.waiting += 1
+            try:
+                held = await self._acquire(node)
+            finally:
+                self.waiting -= 1
+            wait = time.perf_counter() - t0
+            metrics.LLM_GATEWAY_WAIT_SECONDS.observe(wait, node=node)
+            self.stats_counter["wait_ms"] += round(1000 * wait)
+            self.in_flight += 1
+            try:
+                res = await call()
+                self.stats_counter["calls"] += 1
+                return res
+            except Exception as e:
+                hint = retry_after(e)
+                if hint is None or attempt >= self.max_retries or not retryable():
+                    self.stats_counter["failed"] += 1
+                    raise
+                reason = "rate_limited" if getattr(e, "status_code", None) == 429 else "error"
+                self.stats_counter[reason] += 1
+                self.stats_counter["retries"] += 1
+                metrics.LLM_RETRIES.inc(node=node, reason=reason)
+            finally:
+                self.in_flight -= 1
+                for sem in held:
+                    sem.release()
+            # Back off without holding a slot
+            await asyncio.sleep(self._delay(attempt, hint))
+            attempt += 1
+
+    def stats(self) -> dict:
+        return {
+            **self.stats_counter,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "node_concurrency": self.node_concurrency,
+            "requests_per_second": self.requests_per_second,
+        }
+
+
+GATEWAY = LLMGateway()
+
+_HTTP_CLIENTS = None
+
+
+def http_clients():
+    """
+    The (sync, async) httpx clients every model shares, one keep-alive pool per process
+    instead of one per ChatOpenAI instance.
+    """
+    global _HTTP_CLIENTS
+    if _HTTP_CLIENTS is None:
+        import httpx
+
+        limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+        timeout = httpx.Timeout(float(os.getenv("LLM_TIMEOUT_SECONDS", "60")), connect=5.0)
+        _HTTP_CLIENTS = (httpx.Client(limits=limits, timeout=timeout), httpx.AsyncClient(limits=limits, timeout=timeout))
+    return _HTTP_CLIENTS
+
+
+def chat_model(**kwargs):
+    """
+    A ChatOpenAI on the shared connection pool. The gateway does the retrying, the
+    client's own retries are off unless asked for.
+    """
+    from langchain_openai import ChatOpenAI
+
+    client, async_client = http_clients()
+    kwargs.setdefault("model", os.getenv("OPENAI_MODEL", "gpt-4o"))
+    kwargs.setdefault("temperature", 0.2)
+    kwargs.setdefault("max_retries", 0)
+    return ChatOpenAI(http_client=client, http_async_client=async_client, **kwargs)
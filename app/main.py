@@ -1,170 +1,402 @@
 from __future__ import annotations
+import asyncio
+import json
+import logging
 import os
-from fastapi import FastAPI
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Dict, List
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 
-from .schemas import ChatRequest, ChatResponse, AgentState, RuntimeContext, MeetingDraft
+from .schemas import ChatRequest, ChatResponse, BatchChatItem, AgentState, RuntimeContext, MeetingDraft
 from .calendar_mock import MockCalendar
-from .naive_agent import create_human_in_loop_graph, create_revivable_graph
-from .multi_agent import build_multi_agent
-from langchain_core.output_parsers import JsonOutputParser
+from .registry import GraphRegistry
+from .session_store import make_session_store
+from .session_locks import SessionBusy, make_session_locks
+from . import metrics, tracing
+from .llm import RESPONSE_CACHE, TOKEN_SINK, coalesce_stats
+from .llm_gateway import GATEWAY, chat_model
+from .utils import date_cache_stats, warm_up_dates
+from pydantic_core import to_json
+
+# LangGraph, langchain_openai and dateparser take seconds to import. They are loaded by
+# the warm-up started in the lifespan (or by the first turn), not when this module is.
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
 
-from langchain_openai import ChatOpenAI
+load_dotenv()
 
-from langgraph.checkpoint.memory import MemorySaver
-import langchain
+logger = logging.getLogger(__name__)
+
+# Compiled once per process, shared by every session
+GRAPHS = GraphRegistry()
+
+# Background warm-up state, reported by GET /readyz
+WARM_UP = {"ready": False, "seconds": None, "error": None}
+WARM_UP_TASKS: set = set()
+
+# Seconds between compactions of the checkpointer (CHECKPOINT_KEEP_LAST, CHECKPOINT_RETENTION_SECONDS), 0 turns them off
+CHECKPOINT_COMPACT_INTERVAL = float(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "3600"))
+
+
+async def compact_checkpoints(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await GRAPHS.acompact()
+        except Exception:
+            logger.exception("checkpoint compaction failed")
 
-load_dotenv()
 
-app = FastAPI(title="Meeting Agent")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The app serves (GET /healthz answers) while the warm-up runs in a worker thread
+    task = asyncio.create_task(asyncio.to_thread(warm_up))
+    WARM_UP_TASKS.add(task)
+    task.add_done_callback(WARM_UP_TASKS.discard)
+    compaction = asyncio.create_task(compact_checkpoints(CHECKPOINT_COMPACT_INTERVAL)) if CHECKPOINT_COMPACT_INTERVAL > 0 else None
+    yield
+    if compaction is not None:
+        compaction.cancel()
 
-langchain.verbose = False
 
-llm = ChatOpenAI(
-    model=os.getenv("OPENAI_MODEL", "gpt-4o"),
-    temperature=0.2,
-)
+app = FastAPI(title="Meeting Agent", lifespan=lifespan)
+
+# Created on first use by make_llm, benchmarks put their fake model here before that
+llm = None
+
+
+def make_llm():
+    import langchain
+
+    langchain.verbose = False
+    # Token usage of streamed replies too, for the metrics
+    return chat_model(stream_usage=True)
 
 
 class WorkflowState:
-    def __init__(self, state: AgentState, graph: StateGraph, memory: MemorySaver, config: dict, context: RuntimeContext):
-        self.state = state
+    """
+    Per session bookkeeping. The graph and context are shared process-wide,
+    only the thread config and (for ITERATE mode) the last state are per session.
+    """
+    def __init__(self, graph: CompiledStateGraph, config: dict, context: RuntimeContext):
         self.graph = graph
-        self.memory = memory
         self.config = config
         self.state_dict = None
         self.context = context
 
-# In-memory session store (demo)
-WORKFLOWS: dict[str, WorkflowState] = {}
+def evict_session(session_id: str, workflow_state: WorkflowState) -> None:
+    # The session's checkpoints are what actually holds memory, drop them with it.
+    # Persistent checkpoints are left alone, another worker may be serving the session.
+    if not GRAPHS.persistent:
+        GRAPHS.purge_session(session_id)
+
+
+def session_bytes(session_id: str, workflow_state: WorkflowState) -> int:
+    nbytes = GRAPHS.session_bytes(session_id)
+    if workflow_state.state_dict is not None:
+        nbytes += len(to_json(workflow_state.state_dict))
+    return nbytes
+
+# Turns of one session run one at a time, bounded by SESSION_LOCK_TIMEOUT / SESSION_MAX_QUEUE
+SESSION_LOCKS = make_session_locks()
+
+# In-memory session store, bounded by SESSION_MAX_ENTRIES / SESSION_MAX_BYTES / SESSION_TTL_SECONDS.
+# A session with a turn running or queued is not evicted, its checkpoint threads are still in use.
+WORKFLOWS = make_session_store(on_evict=evict_session, pinned=SESSION_LOCKS.held)
+
+CONTEXT: RuntimeContext | None = None
+# The warm-up thread and the first turn may both get here, only one context (and calendar) must exist
+_CONTEXT_LOCK = threading.Lock()
+
+
+def runtime_context() -> RuntimeContext:
+    """
+    Runtime context shared by every session, built on first use from the module level llm.
+    """
+    global CONTEXT, llm
+    if CONTEXT is None:
+        with _CONTEXT_LOCK:
+            if CONTEXT is None:
+                from langchain_core.output_parsers import JsonOutputParser
+
+                if llm is None:
+                    llm = make_llm()
+                CONTEXT = RuntimeContext(
+                    json_parser = JsonOutputParser(pydantic_object=MeetingDraft),
+                    llm = llm,
+                    default_tz = os.getenv("DEFAULT_TIMEZONE", "America/Los_Angeles"),
+                    calendar = MockCalendar(["jeff", "mike"]),
+                    input_workflow = GRAPHS.get("input"),
+                    booking_workflow = GRAPHS.get("booking")
+                )
+    return CONTEXT
+
+async def graph_and_context(name: str) -> tuple[CompiledStateGraph, RuntimeContext]:
+    """
+    The compiled workflow `name` and the runtime context. Until the warm-up is done its
+    thread may be building either under a lock; a turn waits for that in a worker thread
+    so the event loop (and GET /healthz) keeps going.
+    """
+    if WARM_UP["ready"]:
+        return GRAPHS.get(name), runtime_context()
+    return await asyncio.to_thread(lambda: (GRAPHS.get(name), runtime_context()))
+
+async def restore_session(session_id: str, graph_name: str) -> WorkflowState | None:
+    """
+    A session unknown to this process may still have checkpoints, written by another
+    worker or before a restart. Pick it up from there if so.
+    """
+    graph, context = await graph_and_context(graph_name)
+    config = {"configurable": {"thread_id": session_id}}
+    if not (await graph.aget_state(config)).values:
+        return None
+    workflow_state = WorkflowState(graph, config, context)
+    WORKFLOWS.put(session_id, workflow_state)
+    return workflow_state
 
 ITERATE = 1
 HUMAN_IN_LOOP = 2
 MULTI_AGENT = 3
+FUSED = 4
+
+MODE_NAMES = {ITERATE: "iterate", HUMAN_IN_LOOP: "human_in_loop", MULTI_AGENT: "multi_agent", FUSED: "fused"}
+
+# ITERATE_MEMO=0 reruns every node of the ITERATE graph each turn, even when its inputs did not change
+ITERATE_MEMO = os.getenv("ITERATE_MEMO", "1") != "0"
+
+# RESPONSE_INCLUDE_MESSAGES=0 leaves `messages` out of ChatResponse.state, the reply already carries the latest one
+RESPONSE_INCLUDE_MESSAGES = os.getenv("RESPONSE_INCLUDE_MESSAGES", "1") != "0"
+
+
+def response_state(state: dict) -> dict:
+    if RESPONSE_INCLUDE_MESSAGES:
+        return state
+    return {k: v for k, v in state.items() if k != "messages"}
+
+# Turns of a POST /chat/batch that may run at the same time
+BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "16"))
+
+# Seconds from request to first reply token of the latest POST /chat/stream turns
+STREAM_TTFT: deque = deque(maxlen=1000)
+STREAM_STATS = {"turns": 0, "without_tokens": 0}
+# Streamed turns keep running when the client goes away, so the session is not left half updated
+STREAM_TURNS: set = set()
+
+
+def stream_stats() -> dict:
+    ttft = sorted(STREAM_TTFT)
+
+    def pct(p: float) -> float:
+        return round(1000 * ttft[min(int(p * len(ttft)), len(ttft) - 1)], 1) if ttft else 0.0
+
+    return {**STREAM_STATS, "ttft_ms_p50": pct(0.5), "ttft_ms_p95": pct(0.95)}
+
+def warm_up() -> None:
+    """
+    Import the heavy dependencies and build what the first turn would otherwise build:
+    the workflows, the LLM client and runtime context, dateparser's language data.
+    """
+    t0 = time.perf_counter()
+    try:
+        GRAPHS.build_all()
+        runtime_context()
+        warm_up_dates(os.getenv("DEFAULT_TIMEZONE", "America/Los_Angeles"))
+    except Exception as e:
+        logger.exception("warm-up failed")
+        WARM_UP["error"] = f"{type(e).__name__}: {e}"
+        return
+    WARM_UP["seconds"] = round(time.perf_counter() - t0, 3)
+    WARM_UP["ready"] = True
+
 
 @app.get("/healthz")
 def healthz():
+    # Liveness, answers as soon as the app is up
     return {"ok": True}
 
+@app.get("/readyz")
+def readyz():
+    # Readiness, 503 until the warm-up is done
+    if not WARM_UP["ready"]:
+        return JSONResponse(status_code=503, content={"ready": False, "error": WARM_UP["error"]})
+    return {"ready": True, "warm_up_seconds": WARM_UP["seconds"]}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+async def stats():
+    # The imports below may wait for the warm-up to finish loading the agents, off the event loop
+    return await asyncio.to_thread(collect_stats)
+
+def collect_stats() -> dict:
+    from .extraction import extraction_stats
+    from .multi_agent import planner_stats
+    from .speculation import speculation_stats
+    from .naive_agent import memo_stats
+
+    return {
+        "sessions": WORKFLOWS.stats(),
+        "llm_cache": RESPONSE_CACHE.stats(),
+        "llm_coalesce": coalesce_stats(),
+        "extraction": extraction_stats(),
+        "planner": planner_stats(),
+        "session_locks": SESSION_LOCKS.stats(),
+        "stream": stream_stats(),
+        "date_cache": date_cache_stats(),
+        "speculation": speculation_stats(),
+        "llm_gateway": GATEWAY.stats(),
+        "iterate_memo": memo_stats(),
+    }
+
 async def chat_human_in_loop_mode(req: ChatRequest):
 
     new_state = None
+    workflow_state = WORKFLOWS.get(req.session_id) or await restore_session(req.session_id, "human_in_loop")
 
-    if req.session_id not in WORKFLOWS:
-        print("HIL: Creating new session")
+    if workflow_state is None:
+        tracing.event("session", action="created")
         config = {"configurable": {"thread_id": req.session_id}}
-        graph = create_human_in_loop_graph()
-        context = RuntimeContext(
-            json_parser = JsonOutputParser(pydantic_object=MeetingDraft),
-            llm = llm,
-            default_tz = os.getenv("DEFAULT_TIMEZONE", "America/Los_Angeles"),
-            calendar = MockCalendar(["jeff", "mike"]),
-            input_workflow = None,
-            booking_workflow = None
-        )
+        graph, context = await graph_and_context("human_in_loop")
         state = AgentState()
-        workflow_state = WorkflowState(state, graph, None, config, context)
-        WORKFLOWS[req.session_id] = workflow_state
+        workflow_state = WorkflowState(graph, config, context)
+        WORKFLOWS.put(req.session_id, workflow_state)
         state.messages = [req.message]
         new_state = await graph.ainvoke(state, config=config, context=context)
     else:
-        print("HIL: Resumeing existing session")
-        workflow_state = WORKFLOWS[req.session_id]
+        tracing.event("session", action="resumed")
         graph = workflow_state.graph
         config = workflow_state.config
         context = workflow_state.context
-        graph.update_state(config, {"messages": [req.message]})
+        await graph.aupdate_state(config, {"messages": [req.message]})
         new_state = await graph.ainvoke(None, config=config, context=context) 
 
-    print("New state (", type(new_state), "): ", new_state)
+    if tracing.enabled():
+        tracing.event("state", state=tracing.truncate(new_state))
+
+    await GRAPHS.aflush()
+    WORKFLOWS.resize(req.session_id, session_bytes(req.session_id, workflow_state))
 
     return ChatResponse(
         session_id=req.session_id,
         reply=new_state['messages'][-1],
-        state=new_state,
+        state=response_state(new_state),
     )
 
 async def chat_iterate(req: ChatRequest):
 
     new_state = None
+    workflow_state = WORKFLOWS.get(req.session_id)
 
-    if req.session_id not in WORKFLOWS:
-        print("Iterate: Creating new session")
+    if workflow_state is None:
+        tracing.event("session", action="created")
         config = {"configurable": {"thread_id": req.session_id}}
-        graph = create_revivable_graph()
-        context = RuntimeContext(
-            json_parser = JsonOutputParser(pydantic_object=MeetingDraft),
-            llm = llm,
-            default_tz = os.getenv("DEFAULT_TIMEZONE", "America/Los_Angeles"),
-            calendar = MockCalendar(["jeff", "mike"]),
-            input_workflow = None,
-            booking_workflow = None
-        )
+        if ITERATE_MEMO:
+            config["configurable"]["node_memo"] = {}
+        graph, context = await graph_and_context("iterate")
         state = AgentState()
-        workflow_state = WorkflowState(state, graph, None, config, context)
-        WORKFLOWS[req.session_id] = workflow_state
+        workflow_state = WorkflowState(graph, config, context)
+        WORKFLOWS.put(req.session_id, workflow_state)
         state.messages = [req.message]
         new_state = await graph.ainvoke(state, config=config, context=context)
     else:
-        print("Iterate: Resumeing existing session")
-        workflow_state = WORKFLOWS[req.session_id]
+        tracing.event("session", action="resumed")
         graph = workflow_state.graph
-        state_dict = workflow_state.state_dict
-        state_dict['messages'] = [req.message]
+        # A fresh dict, the stored state stays as it was if this turn fails
+        state_dict = {**workflow_state.state_dict, "messages": [req.message]}
         context = workflow_state.context
         config = workflow_state.config
         new_state = await graph.ainvoke(state_dict, config=config, context=context)
 
-    print("New state (", type(new_state), "): ", new_state)
+    if tracing.enabled():
+        tracing.event("state", state=tracing.truncate(new_state))
+
+    workflow_state.state_dict = new_state
 
-    WORKFLOWS[req.session_id].state_dict = new_state
+    await GRAPHS.aflush()
+    WORKFLOWS.resize(req.session_id, session_bytes(req.session_id, workflow_state))
 
     return ChatResponse(
         session_id=req.session_id,
         reply=new_state['messages'][-1],
-        state=new_state,
+        state=response_state(new_state),
     )
 
 
 async def chat_multiagent(req: ChatRequest):
 
     new_state = None
+    workflow_state = WORKFLOWS.get(req.session_id) or await restore_session(req.session_id, "planner")
 
-    if req.session_id not in WORKFLOWS:
-        print("MA: Creating new session")
+    if workflow_state is None:
+        tracing.event("session", action="created")
         config = {"configurable": {"thread_id": req.session_id}}
-
-        input_workflow, booking_workflow, planner_workflow = build_multi_agent()
-
-        context = RuntimeContext(
-            json_parser = JsonOutputParser(pydantic_object=MeetingDraft),
-            llm = llm,
-            default_tz = os.getenv("DEFAULT_TIMEZONE", "America/Los_Angeles"),
-            calendar = MockCalendar(["jeff", "mike"]),
-            input_workflow = input_workflow,
-            booking_workflow = booking_workflow
-        )
+        planner_workflow, context = await graph_and_context("planner")
 
         state = AgentState()
-        workflow_state = WorkflowState(state, planner_workflow, None, config, context=context)
-        WORKFLOWS[req.session_id] = workflow_state
+        workflow_state = WorkflowState(planner_workflow, config, context=context)
+        WORKFLOWS.put(req.session_id, workflow_state)
         state.messages = [req.message]
         new_state = await planner_workflow.ainvoke(state, config=config, context=context)
     else:
-        print("MA: Resumeing existing session")
-        workflow_state = WORKFLOWS[req.session_id]
+        tracing.event("session", action="resumed")
         graph = workflow_state.graph
         context = workflow_state.context
         config = workflow_state.config
-        graph.update_state(config, {"messages": [req.message]})
+        await graph.aupdate_state(config, {"messages": [req.message]})
         new_state = await graph.ainvoke(None, config=config, context=context)
 
-    print("New state (", type(new_state), "): ", new_state)
+    if tracing.enabled():
+        tracing.event("state", state=tracing.truncate(new_state))
+
+    await GRAPHS.aflush()
+    WORKFLOWS.resize(req.session_id, session_bytes(req.session_id, workflow_state))
 
     return ChatResponse(
         session_id=req.session_id,
         reply=new_state['messages'][-1],
-        state=new_state,
+        state=response_state(new_state),
+    )
+
+
+async def chat_fused(req: ChatRequest):
+
+    new_state = None
+    workflow_state = WORKFLOWS.get(req.session_id) or await restore_session(req.session_id, "fused")
+
+    if workflow_state is None:
+        tracing.event("session", action="created")
+        config = {"configurable": {"thread_id": req.session_id}}
+        graph, context = await graph_and_context("fused")
+        state = AgentState()
+        workflow_state = WorkflowState(graph, config, context)
+        WORKFLOWS.put(req.session_id, workflow_state)
+        state.messages = [req.message]
+        new_state = await graph.ainvoke(state, config=config, context=context)
+    else:
+        tracing.event("session", action="resumed")
+        graph = workflow_state.graph
+        config = workflow_state.config
+        context = workflow_state.context
+        # The graph ran to its end last turn, this runs it again on the saved state
+        new_state = await graph.ainvoke({"messages": [req.message]}, config=config, context=context)
+
+    if tracing.enabled():
+        tracing.event("state", state=tracing.truncate(new_state))
+
+    await GRAPHS.aflush()
+    WORKFLOWS.resize(req.session_id, session_bytes(req.session_id, workflow_state))
+
+    return ChatResponse(
+        session_id=req.session_id,
+        reply=new_state['messages'][-1],
+        state=response_state(new_state),
     )
 
 
@@ -172,6 +404,15 @@ mode = MULTI_AGENT
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest):
+    try:
+        async with SESSION_LOCKS.hold(req.session_id):
+            with metrics.mode(MODE_NAMES[mode]), metrics.TURN_SECONDS.time(), tracing.turn(req.session_id, MODE_NAMES[mode]):
+                return await chat_turn(req)
+    except SessionBusy as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+async def chat_turn(req: ChatRequest):
 
     if mode == HUMAN_IN_LOOP:
         response = await chat_human_in_loop_mode(req)
@@ -179,6 +420,82 @@ async def chat(req: ChatRequest):
     elif mode == ITERATE:
         response = await chat_iterate(req)
         return response
+    elif mode == FUSED:
+        response = await chat_fused(req)
+        return response
     else:
         response = await chat_multiagent(req)
         return response
+
+
+@app.post("/chat/batch", response_model=List[BatchChatItem])
+async def chat_batch(reqs: List[ChatRequest]):
+    """
+    Run many turns at once. Turns of different sessions run concurrently, at most
+    BATCH_CONCURRENCY at a time; turns of one session run in the order given.
+    Results come back in request order, a failed turn is reported in its item.
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    results: List[BatchChatItem | None] = [None] * len(reqs)
+
+    by_session: Dict[str, List[int]] = {}
+    for i, req in enumerate(reqs):
+        by_session.setdefault(req.session_id, []).append(i)
+
+    async def run_session(indexes: List[int]):
+        for i in indexes:
+            req = reqs[i]
+            async with semaphore:
+                try:
+                    results[i] = BatchChatItem(session_id=req.session_id, response=await chat(req))
+                except Exception as e:
+                    results[i] = BatchChatItem(session_id=req.session_id, error=f"{type(e).__name__}: {e}")
+
+    await asyncio.gather(*(run_session(indexes) for indexes in by_session.values()))
+    return results
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    Same turn as POST /chat, answered as server-sent events: a `token` event per reply
+    token of the nodes that talk to the user, then one `done` event carrying the
+    ChatResponse, or an `error` event.
+    """
+    started = time.perf_counter()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def sink(node: str, text: str) -> None:
+        queue.put_nowait(("token", {"node": node, "text": text}))
+
+    async def run_turn():
+        # Runs in its own task, so the sink is only seen by this turn
+        TOKEN_SINK.set(sink)
+        try:
+            response = await chat(req)
+            # Serialized once, straight to the JSON the event carries
+            queue.put_nowait(("done", response.model_dump_json()))
+        except HTTPException as e:
+            queue.put_nowait(("error", {"status": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            queue.put_nowait(("error", {"status": 500, "detail": f"{type(e).__name__}: {e}"}))
+
+    task = asyncio.create_task(run_turn())
+    STREAM_TURNS.add(task)
+    task.add_done_callback(STREAM_TURNS.discard)
+
+    async def events():
+        first_token = True
+        while True:
+            event, data = await queue.get()
+            if event == "token" and first_token:
+                first_token = False
+                STREAM_TTFT.append(time.perf_counter() - started)
+            elif event != "token":
+                STREAM_STATS["turns"] += 1
+                STREAM_STATS["without_tokens"] += first_token
+            yield f"event: {event}\ndata: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+            if event != "token":
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream")
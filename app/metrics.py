@@ -0,0 +1,167 @@
+from __future__ import annotations
+import functools
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Sequence, Tuple
+
+# METRICS=0 turns recording off, /metrics then only shows what was recorded before
+ENABLED = os.getenv("METRICS", "1") != "0"
+
+# Mode of the turn being handled (iterate / human_in_loop / multi_agent), a label on every series
+MODE: ContextVar[str] = ContextVar("metrics_mode", default="none")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = ("mode",) + tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if not ENABLED:
+            return
+        key = (MODE.get(),) + tuple(labels.get(n, "") for n in self.labelnames[1:])
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+    def clear(self) -> None:
+        self._series.clear()
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = ("mode",) + tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not ENABLED:
+            return
+        key = (MODE.get(),) + tuple(labels.get(n, "") for n in self.labelnames[1:])
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def series(self, **labels: str):
+        """
+        (label values, observations, sum) of the series matching `labels`.
+        """
+        for key, (counts, total) in self._series.items():
+            if all(labels.get(n, key[i]) == key[i] for i, n in enumerate(self.labelnames)):
+                yield key, sum(counts), total
+
+    def count(self, **labels: str) -> int:
+        return sum(n for _, n, _ in self.series(**labels))
+
+    def total(self, **labels: str) -> float:
+        return sum(t for _, _, t in self.series(**labels))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else _number(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        self._series.clear()
+
+
+TURN_SECONDS = Histogram("scheduler_turn_duration_seconds", "Wall time of a chat turn.")
+NODE_SECONDS = Histogram("scheduler_node_duration_seconds", "Wall time of a graph node run, nested agents included.", ("node",))
+LLM_SECONDS = Histogram("scheduler_llm_duration_seconds", "Wall time of an invoke_llm call.", ("node", "cached"))
+LLM_TOKENS = Histogram("scheduler_llm_tokens", "Tokens of an LLM call.", ("node", "kind"), TOKEN_BUCKETS)
+LLM_CACHE = Counter("scheduler_llm_cache_total", "invoke_llm calls of cache enabled nodes by result.", ("node", "result"))
+LLM_COALESCED = Counter("scheduler_llm_coalesced_total", "invoke_llm calls that shared the upstream call of an identical call in flight.", ("node",))
+LLM_GATEWAY_WAIT_SECONDS = Histogram("scheduler_llm_gateway_wait_seconds", "Time an LLM call waited for a concurrency slot and rate limit token.", ("node",))
+LLM_RETRIES = Counter("scheduler_llm_retries_total", "LLM calls retried by the gateway, by reason (rate_limited / error).", ("node", "reason"))
+CALENDAR_SECONDS = Histogram("scheduler_calendar_query_duration_seconds", "Wall time of a calendar call.", ("op",))
+
+REGISTRY = (TURN_SECONDS, NODE_SECONDS, LLM_SECONDS, LLM_TOKENS, LLM_CACHE, LLM_COALESCED, LLM_GATEWAY_WAIT_SECONDS, LLM_RETRIES, CALENDAR_SECONDS)
+
+
+@contextmanager
+def mode(name: str):
+    token = MODE.set(name)
+    try:
+        yield
+    finally:
+        MODE.reset(token)
+
+
+def timed(histogram: Histogram, **labels: str):
+    """
+    Observe the wall time of every call of the decorated (sync) function.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - t0, **labels)
+        return wrapper
+    return decorate
+
+
+def render() -> str:
+    """
+    All series in the Prometheus text exposition format.
+    """
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def clear() -> None:
+    for metric in REGISTRY:
+        metric.clear()
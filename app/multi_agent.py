@@ -1,24 +1,28 @@
 from __future__ import annotations
 import os
-from typing import Dict, Any, List, Optional
+from collections import Counter
+from typing import List, Optional
 import datetime as dt
-import pytz
 
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.graph import StateGraph, END
 
-from .schemas import AgentState, MeetingDraft, SlotSuggestion, RuntimeContext
-from .prompts import EXTRACTION_SYSTEM, DIALOG_SYSTEM, ASK_MISSING_SYSTEM, ASK_SUGGESTIONS_SYSTEM, SUMMARIZE_SYSTEM, PLANNER_SYSTEM, SUMMARIZE_REQUEST
-from .utils import parse_natural_datetime, now_in_tz, to_iso, ensure_tz, parse_user_date
-from .calendar_mock import MockCalendar
-from langchain_core.output_parsers import JsonOutputParser
+from .schemas import AgentState, MeetingDraft, SlotSuggestion, draft_json, RuntimeContext
+from .prompts import ASK_MISSING_SYSTEM, PLANNER_SYSTEM, SUMMARIZE_REQUEST
+from .utils import ensure_tz
 from langgraph.checkpoint.memory import MemorySaver
 
 from langchain_core.runnables import RunnableConfig
 
 from .llm import invoke_llm
-
+from .extraction import extract_draft, predict_draft
+from .booking import alternatives_prompt, booked_message, busy_message, summary_prompt
+from .calendar_mock import SlotTaken
+from . import speculation
+from .tracing import traced_node
+from . import metrics, tracing
+
+@traced_node("human")
 async def human_node(state: AgentState) -> dict:
     new_messages = []
     new_messages.append(state.messages[-1])
@@ -36,78 +40,47 @@ def missing_fields(draft: MeetingDraft) -> List[str]:
         missing.append("start_time")
     return missing
 
+@traced_node("extract")
 async def extract_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
 
     """
-    Take the latest state, invoke LLM to extract necessary fields from the history of messages in the state
+    Take the latest state, extract necessary fields from the latest message, asking the LLM only when rules are not enough
     """
 
-    draft_m = HumanMessage(content=f"draft: {state.draft.model_dump_json()}")
-
-    m = HumanMessage(content=state.messages[-1])
-    
-    msgs = [SystemMessage(content=EXTRACTION_SYSTEM)] + [draft_m, m]
-
-    res = await invoke_llm(runtime.context.llm, msgs)
-
-    # Expect JSON
-    try:
-        data = runtime.context.json_parser.parse(res.content)
-        
-    except Exception:
-        data = {}
-    
-    draft = state.draft.model_copy(deep=True)
-    
-    # Merge extracted fields if present
-    host = data["host_full_name"]
-    attendee = data["attendee_full_name"]
-    subject = data["subject"]
-    start_time_text = data["start_time_text"]
-    duration = data["duration_minutes"]
-    tz = data.get("timezone") or draft.timezone or runtime.context.default_tz
-
-    if host and not draft.host_full_name:
-        draft.host_full_name = host
-    if attendee and not draft.attendee_full_name:
-        draft.attendee_full_name = attendee
-    if subject and not draft.subject:
-        draft.subject = subject
-    if isinstance(duration, int) and duration > 0:
-        draft.duration_minutes = duration
-    draft.timezone = tz
-
-    # Parse start time if provided
-    if start_time_text:
-        parsed = parse_user_date(start_time_text, None)
-        if parsed:
-            draft.start_time_iso = parsed.isoformat()
-
+    ctx = runtime.context
+    msg = state.messages[-1]
+    # Start the availability check and its reply now if the rules already complete the draft
+    spec = speculation.start(ctx, predict_draft(state.draft, msg, ctx.default_tz) if speculation.SPECULATIVE else None, state.override)
+    draft = await extract_draft(ctx.llm, ctx.json_parser, state.draft, msg, ctx.default_tz)
+    if spec is not None:
+        spec.confirm(draft)
     return {"draft": draft }
     
+@traced_node("ask_missing")
 async def ask_missing_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
     
     """
     Use LLM to format human a understandable question to get missing fields.
     """
 
-    m = state.draft.model_dump_json()    
+    m = draft_json(state.draft)    
     #msgs = [SystemMessage(content=ASK_MISSING_SYSTEM)] + format_messages(state, [ HumanMessage(content=f"draft: {json.dumps(state.draft)}")])
     msgs = [SystemMessage(content=ASK_MISSING_SYSTEM)] + [ HumanMessage(content=f"draft: {m}")]
     
-    res = await invoke_llm(runtime.context.llm, msgs)
+    res = await invoke_llm(runtime.context.llm, msgs, node="ask_missing")
     return {"messages": [res.content], "status": "ask_human" }
    
  
+@traced_node("summarize_request")
 async def summarize_request_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
 
     """
     Use LLM to format human to get alternative time slits
     """
 
-    s = state.draft.model_dump_json()
+    s = draft_json(state.draft)
     msgs = [SystemMessage(content=SUMMARIZE_REQUEST)] + [HumanMessage(content=s)]
-    res = await invoke_llm(runtime.context.llm, msgs)
+    res = await invoke_llm(runtime.context.llm, msgs, node="summarize_request")
     return {"messages": [res.content]}
 
 async def extract_decide_next_node(state: AgentState) -> str:
@@ -117,7 +90,7 @@ async def extract_decide_next_node(state: AgentState) -> str:
     return "summarize_request"
 
 
-def build_input_agent():
+def build_input_agent(checkpointer=None):
 
 
     input_graph = StateGraph(AgentState, context_schema=RuntimeContext)
@@ -138,12 +111,16 @@ def build_input_agent():
 
     input_graph.add_edge("summarize_request", END)
 
-    input_workflow = input_graph.compile(checkpointer=MemorySaver(), interrupt_before=["human"])
+    if checkpointer is None:
+        checkpointer = MemorySaver()
+
+    input_workflow = input_graph.compile(checkpointer=checkpointer, interrupt_before=["human"])
 
     return input_workflow
 
 #################
 
+@traced_node("check_availability")
 async def check_availability_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
     draft = state.draft
     tz = ensure_tz(draft.timezone or runtime.context.default_tz)
@@ -154,37 +131,28 @@ async def check_availability_node(state: AgentState, runtime: Runtime[RuntimeCon
     
     dur = draft.duration_minutes or 30
     
-    if state.override or runtime.context.calendar.is_available(draft.attendee_full_name):
+    event = None
+    busy = "attendee"
+    if state.override or runtime.context.calendar.is_available(draft.attendee_full_name, start, dur):
         # Confirm booking directly (you can require explicit "yes" if you want)
-        event = runtime.context.calendar.book(draft.host_full_name, draft.attendee_full_name, draft.subject, start, dur)
-        last_agent_message =  f"Booked: {event['subject']} with {event['attendee_full_name']} " + f"at {event['start_time_iso']} for {event['duration_minutes']} minutes by host {event['host_full_name']}."
-        
+        try:
+            event = runtime.context.calendar.book(draft.host_full_name, draft.attendee_full_name, draft.subject, start, dur)
+        except SlotTaken as e:
+            # Taken meanwhile, or the host is the one who is busy
+            busy = e.who
+
+    if event is not None:
+        last_agent_message = booked_message(event)
+
         #return {"status": "booked", "booked_event": event, "messages": [AIMessage(content=last_agent_message)] }
-    
+
         return {"status": "booked", "booked_event": event, "messages": [last_agent_message] }
-    
+
     # Busy → propose alternatives
-    suggestions = runtime.context.calendar.suggest_alternatives(draft.attendee_full_name, start, dur, count=3)
-    
-        
-    # Build human-friendly suggestions
-    nice = []
-    last_agent_message = None
-        
-    for s in suggestions:
-        dt_obj = s[0].astimezone(tz)
-        nice.append(dt_obj.strftime("%a, %b %d at %-I:%M %p"))
-    if nice:
-        last_agent_message = (
-            f"The attendee {draft.attendee_full_name} is busy then. Ask {draft.host_full_name}' to choose from these alternative time slots: "
-            + "; ".join(nice)
-            + " ?"
-        )
-    else:
-        last_agent_message = (
-            f"The attendee {draft.attendee_full_name} is busy then, and I couldn't find an open slot soon. "
-            "What other times should I try?"
-        )
+    suggestions = runtime.context.calendar.suggest_alternatives(
+        draft.attendee_full_name, start, dur, count=3, timezone=tz.zone, host=draft.host_full_name
+    )
+    last_agent_message = busy_message(draft, suggestions, tz, busy)
     
     d =  {"override" : True, 
           "suggestions": [SlotSuggestion(start_time_iso=s[0].isoformat(), duration_minutes=s[1]) for s in suggestions] }
@@ -194,18 +162,16 @@ async def check_availability_node(state: AgentState, runtime: Runtime[RuntimeCon
     
     return d
     
+@traced_node("ask_alternative")
 async def ask_alternative_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
     
     """
     Use LLM to format human to get alternative time slits
     """
 
-    m = state.draft.model_dump_json()
-    s = state.messages[-1]
-
-    msgs = [SystemMessage(content=ASK_SUGGESTIONS_SYSTEM)] + [HumanMessage(content=f"draft: {m}")] + [s]
-        
-    res = await invoke_llm(runtime.context.llm, msgs)
+    llm = runtime.context.llm
+    msgs = alternatives_prompt(state.draft, state.messages[-1])
+    res = await speculation.take(llm, msgs, "ask_alternative") or await invoke_llm(llm, msgs, node="ask_alternative")
     return {"messages": [res.content], "status": "ask_human" }
     
     
@@ -216,18 +182,19 @@ async def availability_decide_next_node(state: AgentState) -> str:
         return "ask_alternative"
 
     
+@traced_node("summarize")
 async def summarize_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
 
     """
     Use LLM to format human to get alternative time slits
     """
     
-    m = [state.messages[-1]]
-    msgs = [SystemMessage(content=SUMMARIZE_SYSTEM)] + [ HumanMessage(content=f"draft: {m}")]
-    res = await invoke_llm(runtime.context.llm, msgs)
+    llm = runtime.context.llm
+    msgs = summary_prompt(state.messages[-1])
+    res = await speculation.take(llm, msgs, "summarize") or await invoke_llm(llm, msgs, node="summarize")
     return {"messages": [res.content]}
 
-def build_booking_agent():
+def build_booking_agent(checkpointer=None):
 
     booking_graph = StateGraph(AgentState, context_schema=RuntimeContext)
 
@@ -248,7 +215,10 @@ def build_booking_agent():
 
     booking_graph.set_entry_point("check_availability")
 
-    booking_workflow = booking_graph.compile(checkpointer=MemorySaver(), interrupt_before=["human"])
+    if checkpointer is None:
+        checkpointer = MemorySaver()
+
+    booking_workflow = booking_graph.compile(checkpointer=checkpointer, interrupt_before=["human"])
 
     return booking_workflow
 
@@ -258,19 +228,24 @@ def build_booking_agent():
 async def input_agent(state: AgentState, config: dict, context: RuntimeContext)->dict:
 
     if state.status == "ask_human":
-        print("Input agent continuing flow...")
-        context.input_workflow.update_state(config, {"messages": state.messages})        
+        tracing.event("agent", agent="input_agent", action="resumed")
+        await context.input_workflow.aupdate_state(config, {"messages": state.messages})
         return await context.input_workflow.ainvoke(None, config=config, context=context)
 
     return await context.input_workflow.ainvoke(state, config=config, context=context)
 
 async def booking_agent(state: AgentState, config: dict, context: RuntimeContext)->dict:
     if state.status == "ask_human":
-        print("Booking agent continuing flow...")
-        context.booking_workflow.update_state(config, {"messages": state.messages})
+        tracing.event("agent", agent="booking_agent", action="resumed")
+        await context.booking_workflow.aupdate_state(config, {"messages": state.messages})
         return await context.booking_workflow.ainvoke(None, config=config, context=context)
     return await context.booking_workflow.ainvoke(state, config=config, context=context)
 
+def agent_thread_id(thread_id: str, agent_name: str) -> str:
+    # Sub agents share the planner's checkpointer, so each gets its own thread under the session
+    return f"{thread_id}:{agent_name}"
+
+@traced_node("done")
 async def done_node(state: AgentState)->dict:
     return state
 
@@ -283,6 +258,7 @@ async def planner_decide_next_node(state: AgentState) -> str:
     else:
         return "invoke_agent"
 
+@traced_node("invoke_agent")
 async def invoke_agent_node(state: AgentState, config: RunnableConfig, runtime: Runtime[RuntimeContext]) -> dict:
 
     ret = {}
@@ -291,12 +267,13 @@ async def invoke_agent_node(state: AgentState, config: RunnableConfig, runtime:
     m = state.messages[-1]
 
     thread_id = config['configurable']['thread_id']
-    new_config = {"configurable" : {"thread_id" : thread_id} }
+    new_config = {"configurable" : {"thread_id" : agent_thread_id(thread_id, state.agent_name)} }
 
 
     if state.agent_name == "input_agent":
-        ret =  await input_agent(state, config=new_config, context=runtime.context)
-        snapshot = runtime.context.input_workflow.get_state(new_config)
+        with metrics.NODE_SECONDS.time(node="agent:input_agent"):
+            ret =  await input_agent(state, config=new_config, context=runtime.context)
+        snapshot = await runtime.context.input_workflow.aget_state(new_config)
         next_value = snapshot.next
         if not next_value:
             m = "\ninput_agent completed with " + ret["messages"][-1] + ", decide next step."
@@ -306,8 +283,9 @@ async def invoke_agent_node(state: AgentState, config: RunnableConfig, runtime:
             m = ret["messages"][-1]
 
     if state.agent_name == "booking_agent":
-        ret =  await booking_agent(state, config=new_config, context=runtime.context)
-        snapshot = runtime.context.booking_workflow.get_state(new_config)
+        with metrics.NODE_SECONDS.time(node="agent:booking_agent"):
+            ret =  await booking_agent(state, config=new_config, context=runtime.context)
+        snapshot = await runtime.context.booking_workflow.aget_state(new_config)
         next_value = snapshot.next
     
         if not next_value:
@@ -320,6 +298,25 @@ async def invoke_agent_node(state: AgentState, config: RunnableConfig, runtime:
 
     return ret
 
+# "rules" routes input_agent -> booking_agent -> done from the state, "llm" asks PLANNER_SYSTEM every hop
+PLANNER_MODE = os.getenv("PLANNER_MODE", "rules").lower()
+
+# Planner decisions taken by "rules" / "llm", and meetings booked, to see how many LLM calls the rules save
+PLANNER_STATS: Counter = Counter()
+
+def rule_next_agent(state: AgentState) -> Optional[str]:
+    """
+    The agent to run next as far as it follows from the state alone, None when it does not.
+    """
+    if state.status == "booked":
+        return "done"
+    if state.status == "collecting_info":
+        return "input_agent"
+    if state.status == "checking_availability" and not missing_fields(state.draft):
+        return "booking_agent"
+    return None
+
+@traced_node("planner")
 async def planning_node(state: AgentState, config: RunnableConfig, runtime: Runtime[RuntimeContext]) -> dict:
 
 
@@ -328,14 +325,33 @@ async def planning_node(state: AgentState, config: RunnableConfig, runtime: Runt
     ### latest added
     if state.status == "ask_human":
         return {"messages": [m], "planner_status": "invoke_agent", "agent_name": state.agent_name}
-    
-    msgs = [SystemMessage(content=PLANNER_SYSTEM)] + [ HumanMessage(content=m)]
-    res = await invoke_llm(runtime.context.llm, msgs)
-    if res.content == "done":
+
+    agent_name = rule_next_agent(state) if PLANNER_MODE == "rules" else None
+    if agent_name is not None:
+        PLANNER_STATS["rules"] += 1
+    else:
+        PLANNER_STATS["llm"] += 1
+        msgs = [SystemMessage(content=PLANNER_SYSTEM)] + [ HumanMessage(content=m)]
+        res = await invoke_llm(runtime.context.llm, msgs, node="planner")
+        agent_name = res.content
+
+    if agent_name == "done":
         planner_status  = "done"
+        if state.status == "booked":
+            PLANNER_STATS["booked"] += 1
     else:
         planner_status  = "invoke_agent"
-    return {"messages": [m], "planner_status": planner_status, "agent_name": res.content}
+    return {"messages": [m], "planner_status": planner_status, "agent_name": agent_name}
+
+def planner_stats() -> dict:
+    booked = PLANNER_STATS["booked"]
+    return {
+        "mode": PLANNER_MODE,
+        "rules": PLANNER_STATS["rules"],
+        "llm": PLANNER_STATS["llm"],
+        "booked": booked,
+        "llm_calls_saved_per_booking": PLANNER_STATS["rules"] / booked if booked else 0.0,
+    }
 
 def invoke_agent_decide_next_node(state: AgentState) -> str:
 
@@ -347,7 +363,7 @@ def invoke_agent_decide_next_node(state: AgentState) -> str:
     return "planner"
 
 
-def build_planner_agent():
+def build_planner_agent(checkpointer=None):
 
     planner_graph = StateGraph(AgentState, context_schema=RuntimeContext)
     planner_graph.add_node("planner", planning_node)
@@ -368,15 +384,18 @@ def build_planner_agent():
 
     planner_graph.set_entry_point("planner")
 
-    planner_workflow = planner_graph.compile(checkpointer=MemorySaver(), interrupt_before=["human"])
+    if checkpointer is None:
+        checkpointer = MemorySaver()
+
+    planner_workflow = planner_graph.compile(checkpointer=checkpointer, interrupt_before=["human"])
 
     return planner_workflow
 
 
-def build_multi_agent():
+def build_multi_agent(checkpointer=None):
 
-    input_graph = build_input_agent()
-    booking_graph = build_booking_agent()
-    planner_graph = build_planner_agent()
+    input_graph = build_input_agent(checkpointer)
+    booking_graph = build_booking_agent(checkpointer)
+    planner_graph = build_planner_agent(checkpointer)
 
     return input_graph, booking_graph, planner_graph
@@ -1,21 +1,23 @@
 from __future__ import annotations
-import os
-from typing import Dict, Any, List, Optional
+from collections import Counter
+from typing import Callable, List
 import datetime as dt
-import pytz
 
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.graph import StateGraph, END
 
-from .schemas import AgentState, MeetingDraft, SlotSuggestion
-from .prompts import EXTRACTION_SYSTEM, DIALOG_SYSTEM, ASK_MISSING_SYSTEM, ASK_SUGGESTIONS_SYSTEM, SUMMARIZE_SYSTEM
-from .utils import parse_natural_datetime, now_in_tz, to_iso, ensure_tz, parse_user_date
-from .calendar_mock import MockCalendar
-from langchain_core.output_parsers import JsonOutputParser
+from .schemas import AgentState, MeetingDraft, SlotSuggestion, draft_json
+from .prompts import ASK_MISSING_SYSTEM
+from .utils import ensure_tz
 from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableConfig
 
 from .llm import invoke_llm
+from .extraction import extract_draft, predict_draft
+from .booking import alternatives_prompt, booked_message, busy_message, summary_prompt
+from .calendar_mock import SlotTaken
+from . import speculation
+from .tracing import traced_node
 
 def missing_fields(draft: MeetingDraft) -> List[str]:
     missing = []
@@ -29,65 +31,37 @@ def missing_fields(draft: MeetingDraft) -> List[str]:
         missing.append("start_time")
     return missing
 
+@traced_node("extract")
 async def extract_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
 
     """
-    Take the latest state, invoke LLM to extract necessary fields from the history of messages in the state
+    Take the latest state, extract necessary fields from the latest message, asking the LLM only when rules are not enough
     """
 
-    draft_m = HumanMessage(content=f"draft: {state.draft.model_dump_json()}")
-    m = HumanMessage(content=state.messages[-1])
-    msgs = [SystemMessage(content=EXTRACTION_SYSTEM)] + [draft_m, m]
-    res = await invoke_llm(runtime.context.llm, msgs)
-
-    # Expect JSON
-    try:
-        data = runtime.context.json_parser.parse(res.content)
-        
-    except Exception:
-        data = {}
-
-    draft = state.draft.model_copy(deep=True)
-
-    # Merge extracted fields if present
-    host = data["host_full_name"]
-    attendee = data["attendee_full_name"]
-    subject = data["subject"]
-    start_time_text = data["start_time_text"]
-    duration = data["duration_minutes"]
-    tz = data.get("timezone") or draft.timezone or runtime.context.default_tz
-
-    if host and not draft.host_full_name:
-        draft.host_full_name = host
-    if attendee and not draft.attendee_full_name:
-        draft.attendee_full_name = attendee
-    if subject and not draft.subject:
-        draft.subject = subject
-    if isinstance(duration, int) and duration > 0:
-        draft.duration_minutes = duration
-    draft.timezone = tz
-
-    # Parse start time if provided
-    if start_time_text:
-        parsed = parse_user_date(start_time_text, None)
-        if parsed:
-            draft.start_time_iso = parsed.isoformat()
-
+    ctx = runtime.context
+    msg = state.messages[-1]
+    # Start the availability check and its reply now if the rules already complete the draft
+    spec = speculation.start(ctx, predict_draft(state.draft, msg, ctx.default_tz) if speculation.SPECULATIVE else None, state.override)
+    draft = await extract_draft(ctx.llm, ctx.json_parser, state.draft, msg, ctx.default_tz)
+    if spec is not None:
+        spec.confirm(draft)
     return {"draft": draft }
 
+@traced_node("ask_missing")
 async def ask_missing_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
 
     """
     Use LLM to format human a understandable question to get missing fields.
     """
 
-    m = state.draft.model_dump_json()
+    m = draft_json(state.draft)
     msgs = [SystemMessage(content=ASK_MISSING_SYSTEM)] + [ HumanMessage(content=f"draft: {m}")]
     
-    res = await invoke_llm(runtime.context.llm, msgs)
+    res = await invoke_llm(runtime.context.llm, msgs, node="ask_missing")
     return {"messages": [res.content], "status": "ask_human" }
 
 
+@traced_node("check_availability")
 async def check_availability_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
     draft = state.draft
     tz = ensure_tz(draft.timezone or runtime.context.default_tz)
@@ -98,35 +72,26 @@ async def check_availability_node(state: AgentState, runtime: Runtime[RuntimeCon
 
     dur = draft.duration_minutes or 30
 
-    if state.override or runtime.context.calendar.is_available(draft.attendee_full_name):
+    event = None
+    busy = "attendee"
+    if state.override or runtime.context.calendar.is_available(draft.attendee_full_name, start, dur):
         # Confirm booking directly (you can require explicit "yes" if you want)
-        event = runtime.context.calendar.book(draft.host_full_name, draft.attendee_full_name, draft.subject, start, dur)
-        last_agent_message =  f"Booked: {event['subject']} with {event['attendee_full_name']} " + f"at {event['start_time_iso']} for {event['duration_minutes']} minutes by host {event['host_full_name']}."
-    
+        try:
+            event = runtime.context.calendar.book(draft.host_full_name, draft.attendee_full_name, draft.subject, start, dur)
+        except SlotTaken as e:
+            # Taken meanwhile, or the host is the one who is busy
+            busy = e.who
+
+    if event is not None:
+        last_agent_message = booked_message(event)
+
         return {"status": "booked", "booked_event": event, "messages": [last_agent_message] }
 
     # Busy → propose alternatives
-    suggestions = runtime.context.calendar.suggest_alternatives(draft.attendee_full_name, start, dur, count=3)
-
-    
-    # Build human-friendly suggestions
-    nice = []
-    last_agent_message = None
-    
-    for s in suggestions:
-        dt_obj = s[0].astimezone(tz)
-        nice.append(dt_obj.strftime("%a, %b %d at %-I:%M %p"))
-    if nice:
-        last_agent_message = (
-            f"The attendee {draft.attendee_full_name} is busy then. Ask {draft.host_full_name}' to choose from these alternative time slots: "
-            + "; ".join(nice)
-            + " ?"
-        )
-    else:
-        last_agent_message = (
-            f"The attendee {draft.attendee_full_name} is busy then, and I couldn't find an open slot soon. "
-            "What other times should I try?"
-        )
+    suggestions = runtime.context.calendar.suggest_alternatives(
+        draft.attendee_full_name, start, dur, count=3, timezone=tz.zone, host=draft.host_full_name
+    )
+    last_agent_message = busy_message(draft, suggestions, tz, busy)
 
     d =  {"override" : True, 
           "suggestions": [SlotSuggestion(start_time_iso=s[0].isoformat(), duration_minutes=s[1]) for s in suggestions] }
@@ -137,6 +102,7 @@ async def check_availability_node(state: AgentState, runtime: Runtime[RuntimeCon
     return d
 
 
+@traced_node("human")
 async def human_node(state: AgentState) -> dict:
     new_messages = []
     new_messages.append(state.messages[-1])
@@ -144,17 +110,16 @@ async def human_node(state: AgentState) -> dict:
     return {"messages": new_messages}
 
 
+@traced_node("ask_alternative")
 async def ask_alternative_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
 
     """
     Use LLM to format human to get alternative time slits
     """
 
-    m = state.draft.model_dump_json()
-    s = state.messages[-1]
-    msgs = [SystemMessage(content=ASK_SUGGESTIONS_SYSTEM)] + [HumanMessage(content=f"draft: {m}")] + [s]
-    
-    res = await invoke_llm(runtime.context.llm, msgs)
+    llm = runtime.context.llm
+    msgs = alternatives_prompt(state.draft, state.messages[-1])
+    res = await speculation.take(llm, msgs, "ask_alternative") or await invoke_llm(llm, msgs, node="ask_alternative")
     return {"messages": [res.content], "status": "ask_human" }
 
 
@@ -171,27 +136,62 @@ async def availability_decide_next_node(state: AgentState) -> str:
         return "ask_alternative"
 
 
+@traced_node("summarize")
 async def summarize_node(state: AgentState, runtime: Runtime[RuntimeContext]) -> dict:
 
     """
     Use LLM to format human to get alternative time slits
     """
 
-    m = [state.messages[-1]]
-    msgs = [SystemMessage(content=SUMMARIZE_SYSTEM)] + [ HumanMessage(content=f"draft: {m}")]
-    res = await invoke_llm(runtime.context.llm, msgs)
+    llm = runtime.context.llm
+    msgs = summary_prompt(state.messages[-1])
+    res = await speculation.take(llm, msgs, "summarize") or await invoke_llm(llm, msgs, node="summarize")
     return {"messages": [res.content]}
 
 
+# Runs and memo hits per node of the ITERATE graph
+NODE_RUNS: Counter = Counter()
+
+
+def memoized(name: str, node, inputs: Callable[[AgentState], tuple]):
+    """
+    The ITERATE graph reruns from its entry point every turn. A node wrapped here is only
+    run when `inputs` of the state differ from its previous run in the same session, its
+    previous output is returned otherwise. The memo (one entry per node) is the
+    `node_memo` dict of the session's config, without one the node always runs.
+    """
+    async def run(state: AgentState, config: RunnableConfig, runtime: Runtime[RuntimeContext]) -> dict:
+        memo = config["configurable"].get("node_memo")
+        if memo is None:
+            NODE_RUNS[name, "run"] += 1
+            return await node(state, runtime)
+        key = inputs(state)
+        hit = memo.get(name)
+        if hit is not None and hit[0] == key:
+            NODE_RUNS[name, "memo"] += 1
+            return hit[1]
+        NODE_RUNS[name, "run"] += 1
+        out = await node(state, runtime)
+        memo[name] = (key, out)
+        return out
+    return run
+
+
+def memo_stats() -> dict:
+    return {n: {"run": NODE_RUNS[n, "run"], "memo": NODE_RUNS[n, "memo"]} for n in sorted({k[0] for k in NODE_RUNS})}
+
+
 def create_revivable_graph():
 
+    # The draft fields each node reads, plus the latest message where it is part of the prompt;
+    # check_availability books, its memo makes a repeated turn return the same booking
     g = StateGraph(AgentState)
-    g.add_node("extract", extract_node)
-    g.add_node("ask_missing", ask_missing_node)
-    g.add_node("check_availability", check_availability_node)
-    g.add_node("ask_alternative", ask_alternative_node)
+    g.add_node("extract", memoized("extract", extract_node, lambda s: (draft_json(s.draft), s.messages[-1])))
+    g.add_node("ask_missing", memoized("ask_missing", ask_missing_node, lambda s: (draft_json(s.draft),)))
+    g.add_node("check_availability", memoized("check_availability", check_availability_node, lambda s: (draft_json(s.draft), s.override)))
+    g.add_node("ask_alternative", memoized("ask_alternative", ask_alternative_node, lambda s: (draft_json(s.draft), s.messages[-1])))
 
-    g.add_node("summarize", summarize_node)
+    g.add_node("summarize", memoized("summarize", summarize_node, lambda s: (s.messages[-1],)))
 
     g.set_entry_point("extract")
 
@@ -215,7 +215,7 @@ def create_revivable_graph():
 
     return workflow
 
-def create_human_in_loop_graph():
+def create_human_in_loop_graph(checkpointer=None):
 
     g = StateGraph(AgentState)
     g.add_node("extract", extract_node)
@@ -243,6 +243,9 @@ def create_human_in_loop_graph():
 
     g.add_edge("summarize", END)
 
-    workflow = g.compile(checkpointer=MemorySaver(), interrupt_before=["human"])
+    if checkpointer is None:
+        checkpointer = MemorySaver()
+
+    workflow = g.compile(checkpointer=checkpointer, interrupt_before=["human"])
 
     return workflow
@@ -46,6 +46,48 @@ Rules:
 - Parse out the date and time from the user message and return in the start_time_text so that it could be passed to python dateparser to convert into datetime object.
 """
 
+EXTRACTION_BATCH_SYSTEM = """You extract meeting details from several user messages at once.
+
+You are given a JSON array of items, each with the current 'draft' and the user's 'message'.
+Return ONLY a JSON array with one object per item, in the same order, each with these keys:
+- host_full_name (string or null)
+- attendee_full_name (string or null)
+- subject (string or null)
+- start_time_text (string or null)  // natural language time phrase you found
+- duration_minutes (number or null)
+- timezone (string or null)
+
+Rules:
+- Extract each item from its own message only, never from another item.
+- If the user is proposing an alternative time, capture it in start_time_text.
+- If you are unsure, return null for that field.
+- Do not include any other keys.
+- Only output valid JSON, do not include preamble, or markdown etc.,
+- Parse out the date and time from the user message and return in the start_time_text so that it could be passed to python dateparser to convert into datetime object.
+"""
+
+FUSED_SYSTEM = """You are a scheduling assistant. You will be given a JSON 'draft' of a meeting and the user's
+latest message. Extract the meeting details from the message and write your reply in one go.
+
+Return ONLY a JSON object with these keys:
+- host_full_name (string or null)
+- attendee_full_name (string or null)
+- subject (string or null)
+- start_time_text (string or null)  // natural language time phrase you found
+- duration_minutes (number or null)
+- timezone (string or null)
+- reply (string or null)
+
+Rules:
+- If the user is proposing an alternative time, capture it in start_time_text.
+- If you are unsure, return null for that field.
+- Parse out the date and time from the user message and return in the start_time_text so that it could be passed to python dateparser to convert into datetime object.
+- If host_full_name, attendee_full_name, subject or the start time is still unknown after this message (in the draft and
+  in what you extracted), reply is ONE concise question to obtain the minimum missing info. Otherwise reply is null.
+- Do not include any other keys.
+- Only output valid JSON, do not include preamble, or markdown etc.,
+"""
+
 DIALOG_SYSTEM = """You are a helpful scheduling assistant.
 
 You must:
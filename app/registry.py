@@ -0,0 +1,95 @@
+from __future__ import annotations
+import asyncio
+import importlib
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
+
+AGENT_NAMES = ("input_agent", "booking_agent")
+
+
+def _factory(module: str, name: str) -> Callable:
+    # The agents (and LangGraph with them) are imported when a workflow is first built,
+    # not when the registry is
+    return getattr(importlib.import_module(f".{module}", __package__), name)
+
+
+class GraphRegistry:
+    """
+    Process-wide cache of compiled workflows.
+
+    Every workflow is compiled once and all of them share a single checkpointer,
+    so sessions are told apart only by the thread_id in their config.
+    Both are created on first use; build_all may run in a worker thread at startup
+    while the first requests come in.
+    """
+
+    def __init__(self, checkpointer=None):
+        self._checkpointer = checkpointer
+        self._builders: Dict[str, Callable[[], CompiledStateGraph]] = {
+            "iterate": lambda: _factory("naive_agent", "create_revivable_graph")(),
+            "human_in_loop": lambda: _factory("naive_agent", "create_human_in_loop_graph")(self.checkpointer),
+            "input": lambda: _factory("multi_agent", "build_input_agent")(self.checkpointer),
+            "booking": lambda: _factory("multi_agent", "build_booking_agent")(self.checkpointer),
+            "planner": lambda: _factory("multi_agent", "build_planner_agent")(self.checkpointer),
+            "fused": lambda: _factory("fused_agent", "create_fused_graph")(self.checkpointer),
+        }
+        self._graphs: Dict[str, CompiledStateGraph] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def checkpointer(self):
+        if self._checkpointer is None:
+            with self._lock:
+                if self._checkpointer is None:
+                    self._checkpointer = _factory("checkpointers", "make_checkpointer")()
+        return self._checkpointer
+
+    def get(self, name: str) -> CompiledStateGraph:
+        graph = self._graphs.get(name)
+        if graph is None:
+            with self._lock:
+                graph = self._graphs.get(name)
+                if graph is None:
+                    graph = self._builders[name]()
+                    self._graphs[name] = graph
+        return graph
+
+    def build_all(self) -> None:
+        for name in self._builders:
+            self.get(name)
+
+    @property
+    def persistent(self) -> bool:
+        # Persistent checkpoints outlive this process, other workers may still resume them
+        return getattr(self.checkpointer, "persistent", False)
+
+    async def aflush(self) -> None:
+        aflush = getattr(self.checkpointer, "aflush", None)
+        if aflush is not None:
+            await aflush()
+
+    async def acompact(self) -> None:
+        # Compaction of a persistent checkpointer is disk bound, it runs in a worker thread
+        compact = getattr(self.checkpointer, "compact", None)
+        if compact is not None:
+            await asyncio.to_thread(compact)
+
+    def session_threads(self, session_id: str) -> List[str]:
+        agent_thread_id = _factory("multi_agent", "agent_thread_id")
+        return [session_id] + [agent_thread_id(session_id, name) for name in AGENT_NAMES]
+
+    def session_bytes(self, session_id: str) -> int:
+        """
+        Bytes the checkpointer holds for a session, 0 if the checkpointer cannot tell.
+        """
+        resident_bytes = getattr(self.checkpointer, "resident_bytes", None)
+        if resident_bytes is None:
+            return 0
+        return sum(resident_bytes(thread_id) for thread_id in self.session_threads(session_id))
+
+    def purge_session(self, session_id: str) -> None:
+        for thread_id in self.session_threads(session_id):
+            self.checkpointer.delete_thread(thread_id)
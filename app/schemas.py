@@ -1,10 +1,13 @@
 from __future__ import annotations
 from pydantic import BaseModel, Field
-from typing import Optional, List, Literal, Dict, Any
-import langgraph.runtime
+from typing import TYPE_CHECKING, Optional, List, Literal, Dict, Any
 from dataclasses import dataclass
 
-from langgraph.graph.state import CompiledStateGraph
+if TYPE_CHECKING:
+    from langchain_core.output_parsers import JsonOutputParser
+    from langchain_openai import ChatOpenAI
+    from langgraph.graph.state import CompiledStateGraph
+    from .calendar_mock import MockCalendar
 
 class ChatRequest(BaseModel):
     session_id: str = Field(..., description="Client-provided stable session id")
@@ -17,6 +20,12 @@ class ChatResponse(BaseModel):
     state: Dict[str, Any]
 
 
+class BatchChatItem(BaseModel):
+    session_id: str
+    response: Optional[ChatResponse] = None
+    error: Optional[str] = None
+
+
 
 class MeetingDraft(BaseModel):
     host_full_name: Optional[str] = None
@@ -27,6 +36,22 @@ class MeetingDraft(BaseModel):
     timezone: Optional[str] = None
 
 
+# JSON of the drafts seen lately, keyed by their field values. Most nodes of a turn do
+# not change the draft, its JSON is built once instead of in every node prompting with it.
+_DRAFT_JSON: Dict[tuple, str] = {}
+_DRAFT_JSON_SIZE = 1024
+
+
+def draft_json(draft: MeetingDraft) -> str:
+    key = tuple(draft.__dict__.values())
+    text = _DRAFT_JSON.get(key)
+    if text is None:
+        if len(_DRAFT_JSON) >= _DRAFT_JSON_SIZE:
+            _DRAFT_JSON.clear()
+        text = _DRAFT_JSON[key] = draft.model_dump_json()
+    return text
+
+
 class SlotSuggestion(BaseModel):
     start_time_iso: str
     duration_minutes: int
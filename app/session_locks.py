@@ -0,0 +1,105 @@
+from __future__ import annotations
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class SessionBusy(Exception):
+    """
+    A turn could not get its session's lock: too many turns already queued or the
+    wait timed out.
+    """
+
+
+class _SessionLock:
+    __slots__ = ("lock", "depth")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Turns holding or waiting for the lock
+        self.depth = 0
+
+
+class SessionLocks:
+    """
+    One asyncio lock per session so turns of a session run one at a time, in arrival
+    order, while other sessions proceed. A turn waits at most `timeout` seconds and
+    is turned away at once when `max_queue` turns of its session are already waiting.
+    Locks are dropped as soon as nobody holds or waits for them.
+    """
+
+    def __init__(self, timeout: float = 30.0, max_queue: int = 16):
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self._locks: Dict[str, _SessionLock] = {}
+        self.queued = 0
+        self.max_depth = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def depth(self, session_id: str) -> int:
+        entry = self._locks.get(session_id)
+        return entry.depth if entry is not None else 0
+
+    def held(self, session_id: str) -> bool:
+        """
+        Whether a turn of the session is running or waiting.
+        """
+        return session_id in self._locks
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = _SessionLock()
+        if self.max_queue and entry.depth > self.max_queue:
+            self.rejected += 1
+            raise SessionBusy(f"{entry.depth} turns already queued for session {session_id}")
+
+        entry.depth += 1
+        self.max_depth = max(self.max_depth, entry.depth)
+        try:
+            if entry.lock.locked():
+                self.waits += 1
+                self.queued += 1
+                t0 = time.perf_counter()
+                try:
+                    await asyncio.wait_for(entry.lock.acquire(), self.timeout or None)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    raise SessionBusy(f"timed out after {self.timeout}s waiting for session {session_id}")
+                finally:
+                    self.queued -= 1
+                    self.wait_seconds += time.perf_counter() - t0
+            else:
+                await entry.lock.acquire()
+            try:
+                yield
+            finally:
+                entry.lock.release()
+        finally:
+            entry.depth -= 1
+            if entry.depth == 0:
+                self._locks.pop(session_id, None)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "sessions": len(self._locks),
+            "queued": self.queued,
+            "max_depth": self.max_depth,
+            "waits": self.waits,
+            "mean_wait_ms": round(1000 * self.wait_seconds / self.waits, 1) if self.waits else 0.0,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+        }
+
+
+def make_session_locks() -> SessionLocks:
+    return SessionLocks(
+        timeout=float(os.getenv("SESSION_LOCK_TIMEOUT", "30")),
+        max_queue=int(os.getenv("SESSION_MAX_QUEUE", "16")),
+    )
@@ -0,0 +1,188 @@
+from __future__ import annotations
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class SessionStore(ABC):
+    """
+    Interface of the per-session store used by the chat endpoints. Implementations
+    decide how long a session is kept; `on_evict(session_id, value)` is called for
+    every session they drop so the caller can release what the session holds elsewhere
+    (checkpointer threads, ...). A store missing any method fails when it is created.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def put(self, session_id: str, value: Any, nbytes: int = 0) -> None:
+        ...
+
+    @abstractmethod
+    def resize(self, session_id: str, nbytes: int) -> None:
+        ...
+
+    @abstractmethod
+    def pop(self, session_id: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        ...
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "last_access")
+
+    def __init__(self, value: Any, nbytes: int, last_access: float):
+        self.value = value
+        self.nbytes = nbytes
+        self.last_access = last_access
+
+
+class LRUSessionStore(SessionStore):
+    """
+    In-process store bounded by number of sessions, by (estimated) resident bytes and
+    by idle time. Least recently used sessions are evicted first; a limit of 0 means
+    unbounded. Sessions for which `pinned(session_id)` is true (a turn is using them)
+    are not evicted until it turns false, the store may stay over budget meanwhile.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 0,
+        max_bytes: int = 0,
+        ttl_seconds: float = 0,
+        on_evict: Optional[Callable[[str, Any], None]] = None,
+        pinned: Optional[Callable[[str], bool]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self.pinned = pinned
+        self.clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
+
+    def get(self, session_id: str) -> Optional[Any]:
+        now = self.clock()
+        self._expire(now)
+        entry = self._entries.get(session_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry.last_access = now
+        self._entries.move_to_end(session_id)
+        return entry.value
+
+    def put(self, session_id: str, value: Any, nbytes: int = 0) -> None:
+        now = self.clock()
+        old = self._entries.pop(session_id, None)
+        if old is not None:
+            self.resident_bytes -= old.nbytes
+        self._entries[session_id] = _Entry(value, nbytes, now)
+        self.resident_bytes += nbytes
+        self._expire(now)
+        self._enforce_budget(keep=session_id)
+
+    def resize(self, session_id: str, nbytes: int) -> None:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return
+        self.resident_bytes += nbytes - entry.nbytes
+        entry.nbytes = nbytes
+        self._enforce_budget(keep=session_id)
+
+    def pop(self, session_id: str) -> Optional[Any]:
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return None
+        self.resident_bytes -= entry.nbytes
+        return entry.value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.resident_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "resident_bytes": self.resident_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def _evictable(self, session_id: str) -> bool:
+        return self.pinned is None or not self.pinned(session_id)
+
+    def _evict(self, session_id: str) -> None:
+        value = self.pop(session_id)
+        if self.on_evict is not None:
+            self.on_evict(session_id, value)
+
+    def _expire(self, now: float) -> None:
+        if not self.ttl_seconds:
+            return
+        # Entries are in access order, so the idle ones are all at the front
+        expired = []
+        for session_id, entry in self._entries.items():
+            if now - entry.last_access < self.ttl_seconds:
+                break
+            if self._evictable(session_id):
+                expired.append(session_id)
+        for session_id in expired:
+            self.expirations += 1
+            self._evict(session_id)
+
+    def _over_budget(self) -> bool:
+        if self.max_entries and len(self._entries) > self.max_entries:
+            return True
+        return bool(self.max_bytes) and self.resident_bytes > self.max_bytes
+
+    def _enforce_budget(self, keep: str) -> None:
+        while self._over_budget():
+            session_id = next((s for s in self._entries if s != keep and self._evictable(s)), None)
+            if session_id is None:
+                # Only the session being served and sessions with turns in flight are left, keep them anyway
+                break
+            self.evictions += 1
+            self._evict(session_id)
+
+
+def make_session_store(
+    on_evict: Optional[Callable[[str, Any], None]] = None,
+    pinned: Optional[Callable[[str], bool]] = None,
+) -> SessionStore:
+    return LRUSessionStore(
+        max_entries=int(os.getenv("SESSION_MAX_ENTRIES", "10000")),
+        max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", "3600")),
+        on_evict=on_evict,
+        pinned=pinned,
+    )
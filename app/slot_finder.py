@@ -0,0 +1,167 @@
+from __future__ import annotations
+import datetime as dt
+import heapq
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Tuple
+
+from .utils import ensure_tz
+
+if TYPE_CHECKING:
+    from .calendar_mock import BusyIndex
+
+
+@dataclass(frozen=True)
+class WorkingHours:
+    start_hour: int = 9
+    end_hour: int = 17
+    weekdays: Tuple[int, ...] = (0, 1, 2, 3, 4)  # Monday == 0
+    timezone: str = "America/Los_Angeles"
+
+
+def _ones(n: int) -> int:
+    return (1 << n) - 1 if n > 0 else 0
+
+
+def _every(step: int, phase: int, n: int) -> int:
+    """
+    Bits phase, phase+step, phase+2*step, ... below n.
+    """
+    k = -(-(n - phase) // step) if n > phase else 0
+    return (_ones(step * k) // _ones(step)) << phase if k else 0
+
+
+def _runs(free: int, n: int) -> int:
+    """
+    Bit i of the result is set when bits i .. i+n-1 of `free` are all set.
+    Takes O(log n) shifts by doubling the run length checked so far.
+    """
+    have = 1
+    while have < n:
+        k = min(have, n - have)
+        free &= free >> k
+        have += k
+    return free
+
+
+DAY = 24 * 60 * 60
+
+
+@lru_cache(maxsize=256)
+def _working_mask(hours: WorkingHours, origin: float, slots: int, slot_minutes: int) -> int:
+    tz = ensure_tz(hours.timezone)
+    slot = slot_minutes * 60
+    end = origin + slots * slot
+
+    def at(day: dt.date, hour: int) -> float:
+        day, hour = day + dt.timedelta(days=hour // 24), hour % 24
+        return tz.localize(dt.datetime.combine(day, dt.time(hour))).timestamp()
+
+    mask = 0
+    day = dt.datetime.fromtimestamp(origin, tz).date() - dt.timedelta(days=1)
+    while at(day, 0) < end:
+        if day.weekday() in hours.weekdays:
+            a = max(math.ceil((at(day, hours.start_hour) - origin) / slot), 0)
+            b = min(math.floor((at(day, hours.end_hour) - origin) / slot), slots)
+            mask |= _ones(b - a) << a
+        day += dt.timedelta(days=1)
+    return mask
+
+
+class SlotFinder:
+    """
+    Common free windows of many attendees.
+
+    The horizon is cut into `slot_minutes` slots and every attendee becomes a bitmap
+    (a Python int, bit 0 == earliest slot) of the slots they are free in. The bitmaps
+    are AND-reduced together with the working hours mask, so the cost grows with the
+    number of busy intervals rather than with the number of slots probed.
+    """
+
+    def __init__(self, busy: "BusyIndex", slot_minutes: int = 15):
+        self.busy = busy
+        self.slot_minutes = slot_minutes
+
+    def _slot(self, ts: float, origin: float, up: bool) -> int:
+        n = (ts - origin) / (self.slot_minutes * 60)
+        return math.ceil(n) if up else math.floor(n)
+
+    def busy_mask(self, attendee: str, origin: float, slots: int) -> int:
+        """
+        Bitmap of the slots in which the attendee has any busy time.
+        """
+        mask = 0
+        end = origin + slots * self.slot_minutes * 60
+        for s, e in self.busy.spans(attendee, origin, end):
+            a = max(self._slot(s, origin, up=False), 0)
+            b = min(self._slot(e, origin, up=True), slots)
+            mask |= _ones(b - a) << a
+        return mask
+
+    def working_mask(self, hours: WorkingHours, origin: float, slots: int) -> int:
+        """
+        Bitmap of the slots inside working hours. Masks are cached per UTC day and
+        shifted into place, so queries starting the same day share the localizing.
+        """
+        slot = self.slot_minutes * 60
+        anchor = origin // DAY * DAY
+        shift = int((origin - anchor) // slot)
+        mask = _working_mask(hours, anchor, shift + slots, self.slot_minutes)
+        return (mask >> shift) & _ones(slots)
+
+    def find(
+        self,
+        attendees: Iterable[str],
+        start: dt.datetime,
+        duration_minutes: int,
+        count: int = 3,
+        horizon_days: int = 30,
+        working_hours: Optional[WorkingHours] = WorkingHours(),
+        step_minutes: int = 30,
+        rank: Optional[Callable[[dt.datetime], float]] = None,
+    ) -> List[Tuple[dt.datetime, int]]:
+        """
+        Up to `count` (start, duration_minutes) slots at or after `start` in which every
+        attendee is free. Starts are aligned to `step_minutes` on the clock; by default
+        the earliest slots are returned, `rank` picks the lowest scoring ones instead.
+        """
+        slot = self.slot_minutes * 60
+        origin = start.timestamp() // slot * slot
+        slots = horizon_days * 24 * 60 // self.slot_minutes
+
+        free = _ones(slots)
+        # Candidates may not start before `start` or off the step grid
+        free_start = free & ~_ones(self._slot(start.timestamp(), origin, up=True))
+        step = max(step_minutes // self.slot_minutes, 1)
+        grid = _every(step, int(-origin // slot) % step, slots)
+        if working_hours is not None:
+            free &= self.working_mask(working_hours, origin, slots)
+        for attendee in attendees:
+            free &= ~self.busy_mask(attendee, origin, slots)
+            if not free:
+                return []
+
+        need = max(-(-duration_minutes // self.slot_minutes), 1)
+        candidates = _runs(free, need) & free_start & grid
+
+        tz = start.tzinfo
+        normalize = getattr(tz, "normalize", lambda d: d)
+
+        def starts():
+            m = candidates
+            while m:
+                low = m & -m
+                m ^= low
+                ts = origin + (low.bit_length() - 1) * slot
+                yield normalize(dt.datetime.fromtimestamp(ts, dt.timezone.utc).astimezone(tz))
+
+        if rank is None:
+            chosen = []
+            for s in starts():
+                chosen.append(s)
+                if len(chosen) >= count:
+                    break
+        else:
+            chosen = heapq.nsmallest(count, starts(), key=rank)
+        return [(s, duration_minutes) for s in chosen]
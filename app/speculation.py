@@ -0,0 +1,139 @@
+from __future__ import annotations
+import asyncio
+import datetime as dt
+import os
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from .booking import alternatives_prompt, booked_message, busy_message, summary_prompt
+from .llm import RESPONSE_CACHE, TOKEN_SINK, invoke_llm
+from .schemas import MeetingDraft, RuntimeContext
+from .utils import ensure_tz
+
+# SPECULATIVE_BOOKING=1: when the rules may answer for the latest message on their own
+# (extraction.rules_draft), the availability check and the reply LLM call that follows it
+# start while the rest of the turn (LLM extraction, summarize_request, planner hops) is still running
+SPECULATIVE = os.getenv("SPECULATIVE_BOOKING", "0") == "1"
+# Speculative replies nobody asked for within this many seconds are dropped
+SPECULATION_TTL_SECONDS = float(os.getenv("SPECULATION_TTL_SECONDS", "60"))
+
+# started / used / discarded (extraction changed the inputs) / expired (never asked for)
+SPECULATION_STATS: Counter = Counter()
+
+
+class Speculation:
+    __slots__ = ("key", "draft", "task", "created")
+
+    def __init__(self, key: str, draft: MeetingDraft, task: asyncio.Task):
+        self.key = key
+        self.draft = draft
+        self.task = task
+        self.created = time.monotonic()
+
+    def confirm(self, draft: MeetingDraft) -> None:
+        """
+        Drop the speculation if the extracted draft is not the one it was started for.
+        """
+        if draft.model_dump() != self.draft.model_dump():
+            if _PENDING.get(self.key) is self:
+                del _PENDING[self.key]
+            self.task.cancel()
+            SPECULATION_STATS["discarded"] += 1
+
+
+# Running speculative replies by the key of their prompt, like the response cache
+_PENDING: Dict[str, Speculation] = {}
+
+
+def predicted_reply(context: RuntimeContext, draft: MeetingDraft, override: bool) -> Tuple[str, List]:
+    """
+    The node that will answer after check_availability for this draft and the prompt it
+    will send, without booking anything: the same checks as the node, read only.
+    """
+    calendar = context.calendar
+    tz = ensure_tz(draft.timezone or context.default_tz)
+    start = dt.datetime.fromisoformat(draft.start_time_iso)
+    if start.tzinfo is None:
+        start = tz.localize(start)
+    dur = draft.duration_minutes or 30
+
+    busy = "attendee"
+    if override or calendar.is_available(draft.attendee_full_name, start, dur):
+        # What book() checks before it stores the event
+        busy = calendar.conflict(draft.host_full_name, draft.attendee_full_name, start, dur)
+        if busy is None:
+            event = {
+                "host_full_name": draft.host_full_name,
+                "attendee_full_name": draft.attendee_full_name,
+                "subject": draft.subject,
+                "start_time_iso": start.isoformat(),
+                "duration_minutes": dur,
+            }
+            return "summarize", summary_prompt(booked_message(event))
+    suggestions = calendar.suggest_alternatives(
+        draft.attendee_full_name, start, dur, count=3, timezone=tz.zone, host=draft.host_full_name
+    )
+    return "ask_alternative", alternatives_prompt(draft, busy_message(draft, suggestions, tz, busy))
+
+
+async def _reply(llm, msgs: List, node: str):
+    # Tokens of a reply that may be thrown away are not streamed, take() hands it over whole
+    TOKEN_SINK.set(None)
+    return await invoke_llm(llm, msgs, node=node)
+
+
+def _expire() -> None:
+    now = time.monotonic()
+    for key, spec in list(_PENDING.items()):
+        if now - spec.created > SPECULATION_TTL_SECONDS:
+            del _PENDING[key]
+            spec.task.cancel()
+            SPECULATION_STATS["expired"] += 1
+
+
+def start(context: RuntimeContext, draft: Optional[MeetingDraft], override: bool) -> Optional[Speculation]:
+    """
+    Start the reply to `draft`, the draft the rules predict for this turn, in the
+    background. None when speculation is off or nothing is predicted.
+    """
+    if not SPECULATIVE or draft is None:
+        return None
+    _expire()
+    node, msgs = predicted_reply(context, draft, override)
+    key = RESPONSE_CACHE.key(context.llm, msgs)
+    spec = _PENDING.get(key)
+    if spec is None:
+        task = asyncio.create_task(_reply(context.llm, msgs, node))
+        # An expired reply's error is not reported, the node that would have used it asks again
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        spec = _PENDING[key] = Speculation(key, draft, task)
+        SPECULATION_STATS["started"] += 1
+    return spec
+
+
+async def take(llm, msgs: List, node: str):
+    """
+    The speculative reply to exactly this prompt, if one was started; None otherwise.
+    """
+    if not _PENDING:
+        return None
+    spec = _PENDING.pop(RESPONSE_CACHE.key(llm, msgs), None)
+    if spec is None:
+        return None
+    if spec.task.cancelled():
+        return None
+    try:
+        res = await spec.task
+    except Exception:
+        # Failed speculatively, the node asks again
+        return None
+    SPECULATION_STATS["used"] += 1
+    sink = TOKEN_SINK.get()
+    if sink is not None:
+        sink(node, res.content)
+    return res
+
+
+def speculation_stats() -> Dict[str, int]:
+    return {**SPECULATION_STATS, "pending": len(_PENDING)}
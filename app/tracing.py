@@ -0,0 +1,172 @@
+from __future__ import annotations
+import atexit
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from . import metrics
+
+# "off": nothing is logged, "sampled": TRACE_SAMPLE_RATE of the turns, "full": every turn
+TRACE_MODE = os.getenv("TRACE_MODE", "sampled").lower()
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+# Longest payload (message, state, reply) written to a trace event, in characters
+TRACE_MAX_CHARS = int(os.getenv("TRACE_MAX_CHARS", "500"))
+
+logger = logging.getLogger("meeting_scheduler.trace")
+logger.propagate = False
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _Trace:
+    __slots__ = ("trace_id", "session_id", "mode")
+
+    def __init__(self, session_id: str, mode: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.session_id = session_id
+        self.mode = mode
+
+
+# The trace of the turn being handled, None when the turn is not traced
+_TRACE: ContextVar[Optional[_Trace]] = ContextVar("trace", default=None)
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The event dict is built fresh per call, formatting is left to the listener thread
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure(mode: Optional[str] = None, sample_rate: Optional[float] = None, stream=None) -> None:
+    """
+    (Re)configure tracing. Events go through a queue to a background thread that
+    writes them as JSON lines to `stream` (stderr by default), the event loop never
+    waits on the output.
+    """
+    global TRACE_MODE, TRACE_SAMPLE_RATE, _listener
+    if mode is not None:
+        TRACE_MODE = mode.lower()
+    if sample_rate is not None:
+        TRACE_SAMPLE_RATE = sample_rate
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    logger.handlers.clear()
+    if TRACE_MODE == "off":
+        return
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    target = logging.StreamHandler(stream or sys.stderr)
+    target.setFormatter(_JsonFormatter())
+    _listener = logging.handlers.QueueListener(records, target)
+    _listener.start()
+    logger.addHandler(_DeferredQueueHandler(records))
+    logger.setLevel(logging.INFO)
+
+
+def shutdown() -> None:
+    """
+    Write out what is still queued.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
+
+
+def truncate(value: Any, limit: Optional[int] = None) -> str:
+    text = value if isinstance(value, str) else str(value)
+    limit = TRACE_MAX_CHARS if limit is None else limit
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+def enabled() -> bool:
+    """
+    True when the current turn is traced; check it before building a costly payload.
+    """
+    return _TRACE.get() is not None
+
+
+@contextmanager
+def turn(session_id: str, mode: str):
+    """
+    Trace one chat turn, if tracing is on and the turn is sampled.
+    """
+    if TRACE_MODE == "off" or (TRACE_MODE == "sampled" and random.random() >= TRACE_SAMPLE_RATE):
+        yield
+        return
+    if _listener is None:
+        configure()
+    token = _TRACE.set(_Trace(session_id, mode))
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        event("turn", duration_ms=round(1000 * (time.perf_counter() - t0), 2))
+        _TRACE.reset(token)
+
+
+def event(name: str, **fields: Any) -> None:
+    trace = _TRACE.get()
+    if trace is None:
+        return
+    logger.info({
+        "ts": time.time(),
+        "trace_id": trace.trace_id,
+        "session_id": trace.session_id,
+        "mode": trace.mode,
+        "event": name,
+        **fields,
+    })
+
+
+def traced_node(name: str):
+    """
+    Profile every run of the decorated (async) graph node: its wall time goes to the
+    node latency histogram and, when the turn is traced, a span is logged.
+    functools.wraps keeps the signature, LangGraph still sees `config` / `runtime`.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            traced = _TRACE.get() is not None
+            if not traced and not metrics.ENABLED:
+                return await fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            error = None
+            try:
+                return await fn(*args, **kwargs)
+            except BaseException as e:
+                error = type(e).__name__
+                raise
+            finally:
+                elapsed = time.perf_counter() - t0
+                metrics.NODE_SECONDS.observe(elapsed, node=name)
+                if traced:
+                    fields = {"node": name, "duration_ms": round(1000 * elapsed, 2)}
+                    if error is not None:
+                        fields["error"] = error
+                    event("node", **fields)
+        return wrapper
+    return decorate
@@ -1,9 +1,18 @@
 from __future__ import annotations
 import datetime as dt
+import os
+import time
+from functools import lru_cache
 import pytz
-import dateparser
 import re
 
+# Relative phrases ("tomorrow at 3pm") are resolved against now rounded down to this many
+# seconds, so the same phrase within one bucket is parsed once and then served from the cache
+DATE_BASE_BUCKET_SECONDS = int(os.getenv("DATE_BASE_BUCKET_SECONDS", "60"))
+# Parsed (phrase, timezone, relative base) entries kept
+DATE_CACHE_SIZE = int(os.getenv("DATE_CACHE_SIZE", "4096"))
+
+@lru_cache(maxsize=256)
 def ensure_tz(tz_name: str) -> pytz.timezone:
     try:
         return pytz.timezone(tz_name)
@@ -16,12 +25,7 @@ def parse_natural_datetime(text: str, tz_name: str) -> dt.datetime | None:
     Returns timezone-aware datetime, or None.
     """
     tz = ensure_tz(tz_name)
-    settings = {
-        "RETURN_AS_TIMEZONE_AWARE": True,
-        "TIMEZONE": tz_name,
-        "PREFER_DATES_FROM": "future",
-    }
-    parsed = dateparser.parse(text, settings=settings)
+    parsed = parse_nl_datetime(text, tz.zone)
     if parsed is None:
         return None
     if parsed.tzinfo is None:
@@ -36,24 +40,97 @@ def now_in_tz(tz_name: str) -> dt.datetime:
     return dt.datetime.now(tz)
 
 
+# "01/27/2026 6 pm", "1/27/2026 at 6:30pm": month first like dateparser's default, a time of day required
+_US_DATETIME_RE = re.compile(
+    r"(\d{1,2})/(\d{1,2})/(\d{4})\s+(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm)",
+    re.IGNORECASE,
+)
+# "2026-01-27T18:00", "2026-01-27 18:00:00-08:00", "2026-01-27T18:00:00Z"
+_ISO_DATETIME_RE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2})(?::(\d{2}))?\s*(Z|[+-]\d{2}:?\d{2})?",
+    re.IGNORECASE,
+)
+
+
+def _parse_absolute(text: str, tz) -> dt.datetime | None:
+    """
+    The common absolute formats without dateparser, same result as dateparser gives.
+    None when the text is anything else (or not a valid date), dateparser then decides.
+    """
+    try:
+        if m := _US_DATETIME_RE.fullmatch(text):
+            month, day, year, hour = int(m.group(1)), int(m.group(2)), int(m.group(3)), int(m.group(4))
+            if not 1 <= hour <= 12:
+                return None
+            hour = hour % 12 + (12 if m.group(6).lower() == "pm" else 0)
+            return tz.localize(dt.datetime(year, month, day, hour, int(m.group(5) or 0)))
+        if m := _ISO_DATETIME_RE.fullmatch(text):
+            naive = dt.datetime(*(int(g or 0) for g in m.groups()[:6]))
+            offset = m.group(7)
+            if offset is None:
+                return tz.localize(naive)
+            if offset.upper() == "Z":
+                return pytz.utc.localize(naive).astimezone(tz)
+            minutes = int(offset[1:3]) * 60 + int(offset[-2:])
+            sign = -1 if offset[0] == "-" else 1
+            return naive.replace(tzinfo=dt.timezone(sign * dt.timedelta(minutes=minutes))).astimezone(tz)
+    except ValueError:
+        return None
+    return None
+
+
+@lru_cache(maxsize=64)
+def _settings(tz_name: str, base: dt.datetime):
+    # Built once per timezone and relative base instead of from a dict on every call.
+    # dateparser takes a few hundred ms to import, it is loaded on first use or by warm_up_dates
+    from dateparser.conf import settings as dateparser_settings
+    return dateparser_settings.replace(
+        RETURN_AS_TIMEZONE_AWARE=True,
+        TIMEZONE=tz_name,
+        PREFER_DATES_FROM="future",         # prefer future for ambiguous dates
+        RELATIVE_BASE=base,                 # critical for "next Tuesday", "tomorrow", etc.
+    )
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_cached(text: str, tz_name: str, base: dt.datetime) -> dt.datetime | None:
+    import dateparser
+    return dateparser.parse(text, settings=_settings(tz_name, base))
+
+
+def _base_bucket(tz) -> dt.datetime:
+    now = time.time()
+    if DATE_BASE_BUCKET_SECONDS > 0:
+        now -= now % DATE_BASE_BUCKET_SECONDS
+    return dt.datetime.fromtimestamp(now, tz)
+
+
 def parse_nl_datetime(text: str, tz_name="America/Los_Angeles", base=None):
     """
     text: natural language like "next Tuesday at 3pm"
     tz_name: user's timezone
-    base: reference datetime; if None uses now()
+    base: reference datetime; if None uses now(), rounded down to DATE_BASE_BUCKET_SECONDS
+    """
+    tz = ensure_tz(tz_name)
+    text = " ".join(text.split())
+    parsed = _parse_absolute(text, tz)
+    if parsed is not None:
+        return parsed
+    return _parse_cached(text.lower(), tz.zone, base or _base_bucket(tz))
+
+
+def warm_up_dates(tz_name="America/Los_Angeles") -> None:
     """
-    tz = pytz.timezone(tz_name)
-    base = base or dt.datetime.now(tz)
-
-    settings = {
-        "RETURN_AS_TIMEZONE_AWARE": True,
-        "TIMEZONE": tz_name,
-        "PREFER_DATES_FROM": "future",         # prefer future for ambiguous dates
-        "RELATIVE_BASE": base,                 # critical for "next Tuesday", "tomorrow", etc.
-    }
-
-    parsed = dateparser.parse(text, settings=settings)
-    return parsed
+    dateparser loads its language data on the first parse, which takes seconds. Pay for
+    it at startup instead of in the first turn.
+    """
+    for phrase in ("tomorrow at 3pm", "next tuesday 10am", "in 2 hours"):
+        parse_nl_datetime(phrase, tz_name)
+
+
+def date_cache_stats() -> dict:
+    info = _parse_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
 
 
 TIME_PHRASE_RE = re.compile(
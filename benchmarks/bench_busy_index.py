@@ -0,0 +1,73 @@
+"""
+Free/busy query throughput of BusyIndex against a linear scan over the same
+BusyBlocks, plus the cost of bulk loading them.
+
+    $ python -m benchmarks.bench_busy_index [attendees] [blocks_per_attendee] [queries]
+"""
+from __future__ import annotations
+import datetime as dt
+import random
+import sys
+import time
+
+import pytz
+
+from app.calendar_mock import BusyBlock, BusyIndex, MockCalendar
+
+
+def make_blocks(rng: random.Random, count: int):
+    t = dt.datetime(2026, 1, 1, tzinfo=pytz.utc)
+    blocks = []
+    for _ in range(count):
+        t += dt.timedelta(minutes=rng.choice((30, 60, 90, 120)))
+        end = t + dt.timedelta(minutes=rng.choice((15, 30, 45, 60)))
+        blocks.append(BusyBlock(t, end))
+        t = end
+    return blocks
+
+
+def linear_is_busy(blocks, start, end) -> bool:
+    for b in blocks:
+        if b.start < end and b.end > start:
+            return True
+    return False
+
+
+def main(attendees: int, per_attendee: int, queries: int):
+    rng = random.Random(7)
+    names = [f"Attendee {i}" for i in range(attendees)]
+    data = {n: make_blocks(rng, per_attendee) for n in names}
+    horizon = max(b[-1].end for b in data.values())
+    first = dt.datetime(2026, 1, 1, tzinfo=pytz.utc)
+
+    probes = []
+    for _ in range(queries):
+        start = first + (horizon - first) * rng.random()
+        probes.append((rng.choice(names), start, 30))
+
+    index = BusyIndex()
+    t0 = time.perf_counter()
+    for n, blocks in data.items():
+        index.load(n, blocks)
+    load = time.perf_counter() - t0
+    print(f"bulk load: {attendees} x {per_attendee} blocks in {load * 1000:.0f} ms ({len(index)} merged intervals)")
+
+    calendar = MockCalendar([], busy=index)
+    t0 = time.perf_counter()
+    indexed = [not calendar.is_available(n, s, d) for n, s, d in probes]
+    t_index = time.perf_counter() - t0
+
+    # The linear scan is slow, time a slice of the probes and scale
+    sample = probes[: max(1, min(queries, 200_000 // per_attendee))]
+    t0 = time.perf_counter()
+    scanned = [linear_is_busy(data[n], s, s + dt.timedelta(minutes=d)) for n, s, d in sample]
+    t_scan = (time.perf_counter() - t0) * len(probes) / len(sample)
+    assert scanned == indexed[: len(sample)], "index and linear scan disagree"
+
+    print(f"linear scan: {queries / t_scan:12,.0f} queries/s")
+    print(f"BusyIndex:   {queries / t_index:12,.0f} queries/s ({t_scan / t_index:.0f}x), {sum(indexed)} busy")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [50, 20_000, 100_000][len(args):]))
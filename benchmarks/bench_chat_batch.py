@@ -0,0 +1,66 @@
+"""
+Replays `copies` copies of benchmarks/data/chat_requests.jsonl (each copy under its own
+session ids) through POST /chat one turn at a time and through POST /chat/batch, with a
+fake model taking `latency` seconds per call.
+
+    $ python -m benchmarks.bench_chat_batch [copies] [latency]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import llm as llm_module
+from benchmarks.bench_rule_extraction import load_requests
+from benchmarks.fake_llm import FakeChatModel
+
+
+def requests(tag: str, copies: int):
+    base = load_requests()
+    return [
+        req.model_copy(update={"session_id": f"{tag}-{n}-{req.session_id}"})
+        for n in range(copies)
+        for req in base
+    ]
+
+
+def reset(latency: float):
+    main.mode = main.HUMAN_IN_LOOP
+    main.llm = FakeChatModel(latency=latency)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.CACHED_NODES.clear()
+
+
+async def main_async(copies: int, latency: float):
+    reset(latency)
+    reqs = requests("seq", copies)
+    t0 = time.perf_counter()
+    sequential = [await main.chat(req) for req in reqs]
+    t_seq = time.perf_counter() - t0
+
+    reset(latency)
+    reqs = requests("batch", copies)
+    t0 = time.perf_counter()
+    batched = await main.chat_batch(reqs)
+    t_batch = time.perf_counter() - t0
+
+    errors = [item.error for item in batched if item.error]
+    same = [r.reply for r in sequential] == [item.response.reply for item in batched if item.response]
+    print(f"sequential /chat: {len(reqs)} turns in {t_seq:6.2f} s, {len(reqs) / t_seq:7.1f} turns/s")
+    print(
+        f"/chat/batch:      {len(reqs)} turns in {t_batch:6.2f} s, {len(reqs) / t_batch:7.1f} turns/s "
+        f"(concurrency {main.BATCH_CONCURRENCY}, {len(errors)} errors, same replies: {same})"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.05,
+    ))
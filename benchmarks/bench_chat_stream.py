@@ -0,0 +1,73 @@
+"""
+Time until the user sees something: POST /chat (whole reply at the end of the turn) vs.
+POST /chat/stream (first reply token), replaying benchmarks/data/chat_requests.jsonl in
+MULTI_AGENT mode with a fake model taking `latency` seconds per call and `first_token`
+seconds to its first streamed token.
+
+    $ python -m benchmarks.bench_chat_stream [latency] [first_token]
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import llm as llm_module
+from benchmarks.bench_rule_extraction import load_requests
+from benchmarks.fake_llm import FakeChatModel
+
+
+def reset(latency: float, first_token: float):
+    main.mode = main.MULTI_AGENT
+    main.llm = FakeChatModel(latency=latency, first_token=first_token)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.CACHED_NODES.clear()
+    main.STREAM_TTFT.clear()
+
+
+async def stream_turn(req):
+    response = await main.chat_stream(req)
+    final = None
+    async for chunk in response.body_iterator:
+        if chunk.startswith("event: done"):
+            final = json.loads(chunk.split("data: ", 1)[1])
+    return final
+
+
+def ms(samples):
+    samples = sorted(samples)
+    return f"p50 {1000 * statistics.median(samples):6.0f} ms, p95 {1000 * samples[int(0.95 * (len(samples) - 1))]:6.0f} ms"
+
+
+async def main_async(latency: float, first_token: float):
+    reset(latency, first_token)
+    blocking = []
+    replies = []
+    for req in load_requests():
+        t0 = time.perf_counter()
+        replies.append((await main.chat(req.model_copy(update={"session_id": f"chat-{req.session_id}"}))).reply)
+        blocking.append(time.perf_counter() - t0)
+
+    reset(latency, first_token)
+    streamed = []
+    for req in load_requests():
+        final = await stream_turn(req.model_copy(update={"session_id": f"stream-{req.session_id}"}))
+        streamed.append(final["reply"])
+
+    print(f"/chat        time to reply:       {ms(blocking)}")
+    print(f"/chat/stream time to first token: {ms(main.STREAM_TTFT)} ({len(main.STREAM_TTFT)}/{len(streamed)} turns streamed)")
+    print(f"same final replies: {replies == streamed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 0.8,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.15,
+    ))
@@ -0,0 +1,57 @@
+"""
+Checkpoint bytes held for one session after 10, 50 and 200 turns, with every checkpoint
+kept (CHECKPOINT_KEEP_LAST=0, the previous behaviour of the in-memory checkpointer) vs.
+compacted to the newest 20. The conversation never completes its draft, so every turn
+runs extraction and asks for the missing fields again, as a long chat would.
+
+    $ python -m benchmarks.bench_checkpoint_history [turns ...]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import llm as llm_module
+from app.checkpointers import SizedMemorySaver
+from app.registry import GraphRegistry
+from app.schemas import ChatRequest
+from benchmarks.fake_llm import FakeChatModel
+
+MESSAGES = ["I need to set up a meeting", "it is about the roadmap", "not sure who else yet", "maybe next week"]
+MODES = (("human_in_loop", main.HUMAN_IN_LOOP), ("multi_agent", main.MULTI_AGENT))
+
+
+async def session_bytes(mode: int, keep_last: int, turns: int):
+    saver = SizedMemorySaver(keep_last=keep_last)
+    main.GRAPHS = GraphRegistry(saver)
+    main.mode = mode
+    main.llm = FakeChatModel()
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.CACHED_NODES.clear()
+
+    session_id = f"history-{keep_last}-{turns}"
+    for n in range(turns):
+        await main.chat(ChatRequest(session_id=session_id, message=MESSAGES[n % len(MESSAGES)]))
+    threads = main.GRAPHS.session_threads(session_id)
+    checkpoints = sum(len(ns) for t in threads for ns in saver.storage.get(t, {}).values())
+    return main.GRAPHS.session_bytes(session_id), checkpoints
+
+
+async def main_async(turn_counts):
+    for mode_name, mode in MODES:
+        for turns in turn_counts:
+            line = []
+            for keep_last in (0, 20):
+                nbytes, checkpoints = await session_bytes(mode, keep_last, turns)
+                label = "all" if keep_last == 0 else f"last {keep_last}"
+                line.append(f"keep {label:>7}: {nbytes / 1024:8.1f} KiB in {checkpoints:4d} checkpoints")
+            print(f"{mode_name:>13} {turns:4d} turns | " + " | ".join(line))
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async([int(a) for a in sys.argv[1:]] or [10, 50, 200]))
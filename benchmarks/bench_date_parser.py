@@ -0,0 +1,74 @@
+"""
+Natural language date parsing: the previous parse_nl_datetime (settings dict and
+timezone built per call, dateparser for everything) vs. the current one (fast path for
+absolute formats, settings and results cached per relative base bucket).
+
+Phrases are the time phrases of benchmarks/data/chat_requests.jsonl plus common absolute
+formats. Both versions parse against "now" so a relative base changes between calls as
+it does in the app. Reports the one-off first call, then mean per-call time.
+
+    $ python -m benchmarks.bench_date_parser [rounds]
+"""
+from __future__ import annotations
+import datetime as dt
+import sys
+import time
+
+import dateparser
+import pytz
+
+from app import utils
+from benchmarks.bench_rule_extraction import load_requests
+
+ABSOLUTE = ["01/27/2026 6 pm", "1/28/2026 at 9:30am", "2026-01-27T18:00:00-05:00", "2026-02-03 10:00"]
+
+
+def legacy_parse_nl_datetime(text: str, tz_name="America/Los_Angeles", base=None):
+    tz = pytz.timezone(tz_name)
+    base = base or dt.datetime.now(tz)
+    settings = {
+        "RETURN_AS_TIMEZONE_AWARE": True,
+        "TIMEZONE": tz_name,
+        "PREFER_DATES_FROM": "future",
+        "RELATIVE_BASE": base,
+    }
+    return dateparser.parse(text, settings=settings)
+
+
+def phrases():
+    found = [utils.extract_time_phrase(req.message) for req in load_requests()]
+    return [p for p in found if p] + ABSOLUTE
+
+
+def run(name: str, parse, texts, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            parse(text)
+    per_call = (time.perf_counter() - t0) / (rounds * len(texts))
+    print(f"{name:>22}: {1000 * per_call:8.3f} ms/call")
+    return per_call
+
+
+def main(rounds: int):
+    texts = phrases()
+
+    # Language data is loaded by whichever parses first, time that once on its own
+    t0 = time.perf_counter()
+    utils.warm_up_dates()
+    print(f"{'warm up':>22}: {time.perf_counter() - t0:8.3f} s (once per process)")
+
+    # Same results when both parse against the same base
+    base = pytz.timezone("America/Los_Angeles").localize(dt.datetime(2026, 1, 20, 9, 30))
+    mismatches = [t for t in texts if legacy_parse_nl_datetime(t, base=base) != utils.parse_nl_datetime(t, base=base)]
+    print(f"{len(texts)} phrases, {len(mismatches)} parsed differently{': ' + repr(mismatches) if mismatches else ''}")
+
+    before = run("previous", legacy_parse_nl_datetime, texts, rounds)
+    utils._parse_cached.cache_clear()
+    cold = run("current, cold cache", utils.parse_nl_datetime, texts, 1)
+    after = run("current", utils.parse_nl_datetime, texts, rounds)
+    print(f"speedup {before / after:.0f}x warm, {before / cold:.1f}x cold; cache {utils.date_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
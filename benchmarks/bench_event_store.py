@@ -0,0 +1,86 @@
+"""
+Many sessions booking the same few attendees at once, the way check_availability_node
+does it: check availability, yield to the event loop, book. Reports booking throughput
+and checks that no attendee or host ended up double booked.
+
+    $ python -m benchmarks.bench_event_store [sessions] [attendees]
+"""
+from __future__ import annotations
+import asyncio
+import datetime as dt
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytz
+
+from app.calendar_mock import MockCalendar, SlotTaken
+
+TZ = pytz.timezone("America/Los_Angeles")
+
+
+def requests(sessions: int, attendees: int):
+    rng = random.Random(5)
+    day = TZ.localize(dt.datetime(2026, 2, 2, 9, 0))
+    for i in range(sessions):
+        start = day + dt.timedelta(days=rng.randrange(20), minutes=15 * rng.randrange(32))
+        yield f"Host {i % 50}", f"Attendee {rng.randrange(attendees)}", f"sync {i}", start, rng.choice((30, 60))
+
+
+def overlaps(events) -> int:
+    spans = sorted(
+        (dt.datetime.fromisoformat(e["start_time_iso"]), e["duration_minutes"]) for e in events
+    )
+    return sum(
+        1 for (s1, d1), (s2, _) in zip(spans, spans[1:]) if s1 + dt.timedelta(minutes=d1) > s2
+    )
+
+
+def check(calendar: MockCalendar, names) -> int:
+    return sum(overlaps(calendar.events.for_attendee(n)) + overlaps(calendar.events.for_host(n)) for n in names)
+
+
+def book(calendar: MockCalendar, host, attendee, subject, start, dur):
+    try:
+        return calendar.book(host, attendee, subject, start, dur)
+    except SlotTaken:
+        return None
+
+
+async def book_async(calendar: MockCalendar, host, attendee, subject, start, dur):
+    if calendar.is_available(attendee, start, dur):
+        # Other sessions run here, as they do while a node awaits the LLM
+        await asyncio.sleep(0)
+        return book(calendar, host, attendee, subject, start, dur)
+    return None
+
+
+def report(label: str, calendar: MockCalendar, results, elapsed: float, sessions: int, names):
+    booked = sum(1 for r in results if r is not None)
+    ids = {e["id"] for e in calendar.events.events.values()}
+    print(
+        f"{label:>8}: {sessions / elapsed:10,.0f} bookings/s, {booked} booked, {sessions - booked} turned down, "
+        f"{len(ids)} unique ids, {check(calendar, names)} double bookings"
+    )
+
+
+async def main(sessions: int, attendees: int):
+    reqs = list(requests(sessions, attendees))
+    names = {r[0] for r in reqs} | {r[1] for r in reqs}
+
+    calendar = MockCalendar([])
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(book_async(calendar, *r) for r in reqs))
+    report("asyncio", calendar, results, time.perf_counter() - t0, sessions, names)
+
+    calendar = MockCalendar([])
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda r: book(calendar, *r), reqs))
+    report("threads", calendar, results, time.perf_counter() - t0, sessions, names)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    asyncio.run(main(*(args + [20_000, 20][len(args):])))
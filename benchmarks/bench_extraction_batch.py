@@ -0,0 +1,87 @@
+"""
+Throughput vs. turn latency of a burst of concurrent sessions whose first message needs
+LLM extraction, with extraction batching off and with several windows
+(EXTRACT_BATCH_WINDOW_MS / EXTRACT_BATCH_SIZE). The fake model takes `latency` seconds per
+call plus 2 ms per reply token, so a batched call takes longer than a single one. Run
+once with the default gateway limits and once with the provider limited to 20 calls/s.
+
+    $ python -m benchmarks.bench_extraction_batch [sessions] [latency]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import extraction
+from app import llm as llm_module
+from app.llm_gateway import LLMGateway
+from app.schemas import ChatRequest
+from benchmarks.fake_llm import FakeChatModel
+
+FIRST = ["Alex", "Priya", "Grace", "Tom", "Lena", "Omar", "Sam", "Nina"]
+LAST = ["Chen", "Raman", "Hopper", "Baker", "Fischer", "Haddad", "Okafor", "Patel"]
+TOPICS = ["Q1 planning", "hiring plan", "compiler demo", "onboarding", "design sync", "budget"]
+CONFIGS = ((0, 1), (5, 16), (10, 16), (20, 32))
+
+
+def message(n: int) -> str:
+    # A different day for every session, so that the replies do not depend on who books first
+    return (
+        f"Set up a 30 minute meeting with {FIRST[n % 8]} {LAST[n // 8 % 8]} about {TOPICS[n % 6]} "
+        f"{1 + n // 28 % 12:02d}/{1 + n % 28:02d}/2026 {1 + n % 11} pm hosted by Dana Lee"
+    )
+
+
+async def burst(sessions: int, latency: float, window_ms: float, size: int, gateway: LLMGateway, tag: str):
+    main.mode = main.HUMAN_IN_LOOP
+    main.llm = FakeChatModel(latency=latency, token_latency=0.002)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.RESPONSE_CACHE.clear()
+    llm_module.GATEWAY = gateway
+    # Every first message goes to the LLM
+    extraction.FAST_PATH = False
+    extraction.BATCHER = extraction.ExtractionBatcher(window_ms, size) if window_ms > 0 else None
+
+    async def turn(n: int):
+        t0 = time.perf_counter()
+        res = await main.chat(ChatRequest(session_id=f"{tag}-{n}", message=message(n)))
+        return time.perf_counter() - t0, res.reply
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(turn(n) for n in range(sessions)))
+    wall = time.perf_counter() - t0
+    latencies = sorted(r[0] for r in results)
+    return wall, latencies, [r[1] for r in results], main.llm.calls
+
+
+async def main_async(sessions: int, latency: float):
+    await burst(8, 0.0, 0, 1, LLMGateway(), "warm-up")
+    limits = (
+        ("default gateway", lambda: LLMGateway()),
+        ("20 calls/s", lambda: LLMGateway(requests_per_second=20, burst=20)),
+    )
+    for name, gateway in limits:
+        print(name)
+        baseline = None
+        for window_ms, size in CONFIGS:
+            tag = f"{name}-{window_ms}-{size}"
+            wall, latencies, replies, calls = await burst(sessions, latency, window_ms, size, gateway(), tag)
+            baseline = baseline or replies
+            label = "off" if window_ms == 0 else f"{window_ms:g} ms / {size}"
+            print(
+                f"  batching {label:>11}: {sessions / wall:6.1f} turns/s, {calls:4d} LLM calls, "
+                f"turn p50 {1000 * latencies[len(latencies) // 2]:6.0f} ms, p95 {1000 * latencies[int(0.95 * len(latencies))]:6.0f} ms, "
+                f"same replies: {replies == baseline}"
+            )
+
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    asyncio.run(main_async(sessions, latency))
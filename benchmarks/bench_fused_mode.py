@@ -0,0 +1,63 @@
+"""
+Replays benchmarks/data/chat_requests.jsonl in MULTI_AGENT (planner on LLM and on rules),
+HUMAN_IN_LOOP and FUSED mode against a fake LLM that takes `latency` seconds per call,
+and reports meetings booked, LLM calls and time per booked meeting.
+
+    $ python -m benchmarks.bench_fused_mode [latency]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import llm as llm_module, multi_agent
+from benchmarks.bench_rule_extraction import load_requests
+from benchmarks.fake_llm import FakeChatModel
+
+RUNS = (
+    ("multi_agent, planner llm", main.MULTI_AGENT, "llm"),
+    ("multi_agent", main.MULTI_AGENT, "rules"),
+    ("human_in_loop", main.HUMAN_IN_LOOP, "rules"),
+    ("fused", main.FUSED, "rules"),
+)
+
+
+async def replay(mode: int, planner_mode: str, latency: float, tag: str):
+    main.mode = mode
+    main.llm = FakeChatModel(latency=latency)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.CACHED_NODES.clear()
+    multi_agent.PLANNER_MODE = planner_mode
+
+    booked = set()
+    turns = []
+    for req in load_requests():
+        req = req.model_copy(update={"session_id": f"{tag}-{req.session_id}"})
+        t0 = time.perf_counter()
+        res = await main.chat(req)
+        turns.append(time.perf_counter() - t0)
+        if res.state.get("status") == "booked":
+            booked.add(req.session_id)
+    return len(booked), turns, main.llm.calls
+
+
+async def main_async(latency: float):
+    for name, mode, planner_mode in RUNS:
+        # Graphs, imports and date caches warm up first
+        await replay(mode, planner_mode, 0.0, f"warm-up-{name}")
+        n, turns, calls = await replay(mode, planner_mode, latency, name)
+        per = n or 1
+        print(
+            f"{name:>24}: booked {n}, LLM calls {calls:3d} ({calls / per:.1f}/booking), "
+            f"{sum(turns) / per:5.2f} s/booking, mean {1000 * sum(turns) / len(turns):6.1f} ms/turn"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(float(sys.argv[1]) if len(sys.argv) > 1 else 0.3))
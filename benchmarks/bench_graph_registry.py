@@ -0,0 +1,83 @@
+"""
+First-turn latency and per-session memory in MULTI_AGENT mode, compiling the
+workflows per session (old behaviour) versus reusing the process-wide registry.
+
+    $ python -m benchmarks.bench_graph_registry [sessions]
+"""
+from __future__ import annotations
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+from langchain_core.output_parsers import JsonOutputParser
+
+import app.main as main
+from app.calendar_mock import MockCalendar
+from app.multi_agent import build_multi_agent
+from app.schemas import AgentState, ChatRequest, MeetingDraft, RuntimeContext
+from benchmarks.fake_llm import FakeChatModel
+
+MESSAGE = "Set up a 30 minute meeting with Alex Chen about Q1 planning 01/27/2026 6 pm"
+
+
+async def per_session_compile(llm, session_id: str):
+    # What chat_multiagent used to do for every new session_id
+    input_workflow, booking_workflow, planner_workflow = build_multi_agent()
+    context = RuntimeContext(
+        json_parser=JsonOutputParser(pydantic_object=MeetingDraft),
+        llm=llm,
+        calendar=MockCalendar(["jeff", "mike"]),
+        input_workflow=input_workflow,
+        booking_workflow=booking_workflow,
+    )
+    config = {"configurable": {"thread_id": session_id}}
+    state = AgentState(messages=[MESSAGE])
+    await planner_workflow.ainvoke(state, config=config, context=context)
+    return planner_workflow, context
+
+
+async def registry(llm, session_id: str):
+    return await main.chat_multiagent(ChatRequest(session_id=session_id, message=MESSAGE))
+
+
+async def measure(name, fn, sessions: int):
+    llm = FakeChatModel()
+    main.llm = llm
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    main.GRAPHS.build_all()
+
+    keep = []
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    latencies = []
+    for i in range(sessions):
+        t0 = time.perf_counter()
+        keep.append(await fn(llm, f"{name}-{i}"))
+        latencies.append(time.perf_counter() - t0)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    print(
+        f"{name:>22}: first turn mean {1000 * sum(latencies) / sessions:7.2f} ms, "
+        f"p95 {1000 * latencies[int(0.95 * (sessions - 1))]:7.2f} ms, "
+        f"memory/session {(current - base) / sessions / 1024:8.1f} KiB"
+    )
+
+
+async def main_async(sessions: int):
+    await measure("compile per session", per_session_compile, sessions)
+    await measure("shared registry", registry, sessions)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,76 @@
+"""
+Cold import time of the app, from `python -X importtime -c "import app.main"` in fresh
+interpreters. Reports the best of `runs`, the slowest top level imports, and checks the
+result against benchmarks/data/import_budget.json: the import must stay under
+`budget_ms` and must not load any of the `deferred` packages (those are loaded by the
+warm-up). Exits with status 1 when the budget is exceeded, so it can gate a build.
+
+    $ python -m benchmarks.bench_import_time [runs]
+"""
+from __future__ import annotations
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BUDGET = os.path.join(os.path.dirname(__file__), "data", "import_budget.json")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_once(module: str, deferred: List[str]) -> Tuple[Dict[str, int], List[Tuple[int, str]], List[str]]:
+    """
+    (cumulative us per module, (cumulative us, name) of the top level imports, deferred packages loaded)
+    """
+    probe = f"import sys, {module}; print(sorted(m for m in {deferred!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True, text=True, check=True, cwd=ROOT,
+        env={**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark")},
+    )
+    cumulative: Dict[str, int] = {}
+    top: List[Tuple[int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        cumulative[name] = int(us)
+        if depth == 1:
+            top.append((int(us), name))
+    return cumulative, sorted(top, reverse=True), json.loads(result.stdout.strip().replace("'", '"'))
+
+
+def main(runs: int) -> int:
+    with open(BUDGET, encoding="utf-8") as f:
+        budget = json.load(f)
+    module = budget["module"]
+
+    best = None
+    for _ in range(runs):
+        cumulative, top, loaded = import_once(module, budget["deferred"])
+        if best is None or cumulative[module] < best[0][module]:
+            best = (cumulative, top, loaded)
+    cumulative, top, loaded = best
+
+    total_ms = cumulative[module] / 1000
+    print(f"import {module}: {total_ms:.0f} ms (best of {runs}), budget {budget['budget_ms']} ms")
+    print("slowest top level imports:")
+    for us, name in top[:10]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if total_ms > budget["budget_ms"]:
+        print(f"OVER BUDGET by {total_ms - budget['budget_ms']:.0f} ms")
+        failed = True
+    if loaded:
+        print(f"deferred packages imported at startup: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
@@ -0,0 +1,67 @@
+"""
+Node executions per turn in ITERATE mode with the node memo off (ITERATE_MEMO=0, every
+node from the entry point reruns each turn) vs. on. Replays benchmarks/data/chat_requests.jsonl
+with two more turns per conversation that change nothing: the client retrying its last
+message, then a "thanks!". The fake LLM takes `latency` seconds per call.
+
+    $ python -m benchmarks.bench_iterate_memo [latency]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import llm as llm_module, naive_agent
+from benchmarks.bench_rule_extraction import load_requests
+from benchmarks.fake_llm import FakeChatModel
+
+
+def conversation_turns():
+    reqs = load_requests()
+    turns = []
+    for i, req in enumerate(reqs):
+        turns.append(req)
+        if i + 1 == len(reqs) or reqs[i + 1].session_id != req.session_id:
+            turns.append(req)
+            turns.append(req.model_copy(update={"message": "thanks!"}))
+    return turns
+
+
+async def replay(memo: bool, latency: float, tag: str):
+    main.mode = main.ITERATE
+    main.ITERATE_MEMO = memo
+    main.llm = FakeChatModel(latency=latency)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.CACHED_NODES.clear()
+    naive_agent.NODE_RUNS.clear()
+
+    turns = []
+    for req in conversation_turns():
+        t0 = time.perf_counter()
+        await main.chat(req.model_copy(update={"session_id": f"{tag}-{req.session_id}"}))
+        turns.append(time.perf_counter() - t0)
+    return turns, naive_agent.memo_stats(), main.llm.calls
+
+
+async def main_async(latency: float):
+    await replay(False, 0.0, "warm-up")
+    for memo in (False, True):
+        tag = "on" if memo else "off"
+        turns, stats, calls = await replay(memo, latency, tag)
+        runs = sum(s["run"] for s in stats.values())
+        hits = sum(s["memo"] for s in stats.values())
+        per_node = ", ".join(f"{n} {s['run']}" for n, s in stats.items())
+        print(
+            f"memo {tag:>3}: {len(turns)} turns, {runs / len(turns):.2f} node runs/turn ({per_node}), "
+            f"{hits} memo hits, LLM calls {calls}, mean {1000 * sum(turns) / len(turns):6.1f} ms/turn"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(float(sys.argv[1]) if len(sys.argv) > 1 else 0.2))
@@ -0,0 +1,47 @@
+"""
+Cost of a repeated ASK_MISSING prompt through invoke_llm, with and without the
+response cache, against a fake model that takes `latency` seconds per call.
+
+    $ python -m benchmarks.bench_llm_cache [calls] [latency]
+"""
+from __future__ import annotations
+import asyncio
+import sys
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app import llm as llm_module
+from app.prompts import ASK_MISSING_SYSTEM
+from app.schemas import MeetingDraft
+from benchmarks.fake_llm import FakeChatModel
+
+
+async def run(node: str | None, calls: int, latency: float) -> float:
+    llm = FakeChatModel(latency=latency)
+    llm_module.RESPONSE_CACHE.clear()
+    # Sessions that are only missing the host all send this same prompt
+    draft = MeetingDraft(attendee_full_name="Alex Chen", subject="Q1 planning", start_time_iso="2026-01-27T18:00:00-08:00")
+    msgs = [SystemMessage(content=ASK_MISSING_SYSTEM), HumanMessage(content=f"draft: {draft.model_dump_json()}")]
+    # Warm up: the first cached call is a miss
+    await llm_module.invoke_llm(llm, msgs, node=node)
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        await llm_module.invoke_llm(llm, msgs, node=node)
+    elapsed = time.perf_counter() - t0
+    return elapsed / calls
+
+
+async def main_async(calls: int, latency: float):
+    uncached = await run(None, calls, latency)
+    cached = await run("ask_missing", calls, latency)
+    print(f"uncached: {1e6 * uncached:10.1f} us/call")
+    print(f"  cached: {1e6 * cached:10.1f} us/call")
+    print(llm_module.RESPONSE_CACHE.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.05,
+    ))
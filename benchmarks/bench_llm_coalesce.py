@@ -0,0 +1,72 @@
+"""
+Upstream LLM calls of a burst of new sessions arriving at once, with and without
+coalescing of identical in-flight calls (LLM_COALESCE). Every session opens with one of a
+few messages that leave only the host missing, so their ask_missing prompts are the
+same; the response cache cannot help because none of them has finished yet. The fake
+model takes `latency` seconds per call.
+
+    $ python -m benchmarks.bench_llm_coalesce [sessions] [latency]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import llm as llm_module
+from app.schemas import ChatRequest
+from benchmarks.fake_llm import FakeChatModel
+
+OPENINGS = [
+    "Set up a 30 minute meeting with Alex Chen about Q1 planning 01/27/2026 6 pm",
+    "Book 45 minutes with Priya Raman about hiring plan 02/03/2026 10 am",
+    "Set up a 15 minute meeting with Grace Hopper about compiler demo 04/01/2026 1 pm",
+    "Please arrange a 30 min meeting about onboarding with Tom Baker 02/05/2026 3:30 pm",
+]
+
+
+async def burst(coalesce: bool, sessions: int, latency: float, tag: str):
+    main.mode = main.HUMAN_IN_LOOP
+    main.llm = FakeChatModel(latency=latency)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.RESPONSE_CACHE.clear()
+    llm_module.COALESCE = coalesce
+    llm_module.COALESCED.clear()
+
+    async def turn(n: int):
+        req = ChatRequest(session_id=f"{tag}-{n}", message=OPENINGS[n % len(OPENINGS)])
+        t0 = time.perf_counter()
+        res = await main.chat(req)
+        return time.perf_counter() - t0, res.reply
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(turn(n) for n in range(sessions)))
+    wall = time.perf_counter() - t0
+    latencies = sorted(r[0] for r in results)
+    return wall, latencies, [r[1] for r in results], main.llm.calls, llm_module.coalesce_stats()["coalesced"]
+
+
+async def main_async(sessions: int, latency: float):
+    # Imports and caches warm up first
+    await burst(False, len(OPENINGS), 0.0, "warm-up")
+    replies = {}
+    for coalesce in (False, True):
+        tag = "on" if coalesce else "off"
+        wall, latencies, replies[coalesce], calls, coalesced = await burst(coalesce, sessions, latency, tag)
+        print(
+            f"coalescing {tag:>3}: {sessions} sessions, {calls:4d} upstream calls ({calls / wall:6.1f}/s), "
+            f"{coalesced:4d} coalesced, turn p50 {1000 * latencies[len(latencies) // 2]:6.0f} ms, "
+            f"p95 {1000 * latencies[int(0.95 * len(latencies))]:6.0f} ms"
+        )
+    print(f"same replies: {replies[False] == replies[True]}")
+
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    asyncio.run(main_async(sessions, latency))
@@ -0,0 +1,92 @@
+"""
+Throughput of a burst of LLM calls against the local stub server (benchmarks/stub_llm_server.py),
+which serves `capacity` calls at a time and answers the rest, plus a few random ones, with 429:
+
+    client per call  a new ChatOpenAI (and connection pool) per call, as agent.build_agent did,
+                     no limits, the client's own 2 retries
+    shared client    one ChatOpenAI, no limits, the client's own 2 retries (the previous main.llm)
+    gateway          the shared pool through the LLM gateway: at most `capacity` calls in flight,
+                     jittered backoff retries
+
+    $ python -m benchmarks.bench_llm_gateway [calls] [capacity]
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
+
+from app import llm as llm_module
+from app.llm_gateway import LLMGateway, chat_model
+from benchmarks.stub_llm_server import make_app, serve_in_thread
+
+NODES = ("extract", "ask_missing", "summarize", "planner")
+LATENCY = 0.1
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def burst(calls: int, model_for, gateway: LLMGateway):
+    llm_module.GATEWAY = gateway
+    llm_module.CACHED_NODES.clear()
+    latencies, failed = [], 0
+
+    async def one(n: int):
+        nonlocal failed
+        msgs = [SystemMessage(content="benchmark"), HumanMessage(content=f"call {n}")]
+        t0 = time.perf_counter()
+        try:
+            await llm_module.invoke_llm(model_for(), msgs, node=NODES[n % len(NODES)])
+            latencies.append(time.perf_counter() - t0)
+        except Exception:
+            failed += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(calls)))
+    return time.perf_counter() - t0, latencies, failed
+
+
+async def main_async(calls: int, capacity: int):
+    app = make_app(capacity=capacity, latency=LATENCY, rate_limit=0.05, retry_after=0.2)
+    base_url, server = serve_in_thread(app)
+    shared = ChatOpenAI(model="stub", base_url=base_url)
+    unlimited = LLMGateway(max_concurrency=0, node_concurrency=0, requests_per_second=0, max_retries=0)
+    runs = (
+        ("client per call", lambda: ChatOpenAI(model="stub", base_url=base_url), unlimited),
+        ("shared client", lambda: shared, unlimited),
+        ("gateway", (lambda m: lambda: m)(chat_model(model="stub", base_url=base_url)),
+         LLMGateway(max_concurrency=capacity, node_concurrency=capacity, backoff=0.05, backoff_max=1.0, max_retries=8)),
+    )
+    try:
+        for name, model_for, gateway in runs:
+            app.state.stats.clear()
+            wall, latencies, failed = await burst(calls, model_for, gateway)
+            stats = app.state.stats
+            p50 = percentile(latencies, 0.5) if latencies else 0
+            p95 = percentile(latencies, 0.95) if latencies else 0
+            print(
+                f"{name:>15}: {len(latencies):4d}/{calls} ok, {failed:4d} failed, {len(latencies) / wall:6.1f} calls/s, "
+                f"p50 {1000 * p50:6.0f} ms, p95 {1000 * p95:6.0f} ms, "
+                f"{stats['requests']:5d} requests, {stats['rate_limited']:5d} got 429"
+            )
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    # The openai client logs every retry
+    logging.getLogger("openai").setLevel(logging.ERROR)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    capacity = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    asyncio.run(main_async(calls, capacity))
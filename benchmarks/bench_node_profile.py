@@ -0,0 +1,50 @@
+"""
+Where a turn's time goes: replays benchmarks/data/chat_requests.jsonl in every mode with
+a fake model taking `latency` seconds per call and prints the per-mode node, LLM and
+calendar histograms behind GET /metrics as mean / total time.
+
+    $ python -m benchmarks.bench_node_profile [latency]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import llm as llm_module, metrics
+from benchmarks.bench_rule_extraction import load_requests
+from benchmarks.fake_llm import FakeChatModel
+
+
+def table(histogram: metrics.Histogram, mode: str, label: str):
+    rows = [(total, count, "/".join(key[1:])) for key, count, total in histogram.series(mode=mode)]
+    for total, count, name in sorted(rows, reverse=True):
+        print(f"  {label:<9}{name:<32}{count:5d} runs {1000 * total / count:9.2f} ms mean {1000 * total:10.1f} ms total")
+
+
+async def main_async(latency: float):
+    metrics.clear()
+    for mode in (main.ITERATE, main.HUMAN_IN_LOOP, main.MULTI_AGENT):
+        main.mode = mode
+        main.llm = FakeChatModel(latency=latency)
+        main.CONTEXT = None
+        main.WORKFLOWS.clear()
+        llm_module.CACHED_NODES.clear()
+        for req in load_requests():
+            await main.chat(req.model_copy(update={"session_id": f"{mode}-{req.session_id}"}))
+
+    for mode in (main.ITERATE, main.HUMAN_IN_LOOP, main.MULTI_AGENT):
+        name = main.MODE_NAMES[mode]
+        turns = metrics.TURN_SECONDS.count(mode=name)
+        total = metrics.TURN_SECONDS.total(mode=name)
+        print(f"{name}: {turns} turns, {1000 * total / turns:.1f} ms mean")
+        table(metrics.NODE_SECONDS, name, "node")
+        table(metrics.LLM_SECONDS, name, "llm")
+        table(metrics.CALENDAR_SECONDS, name, "calendar")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(float(sys.argv[1]) if len(sys.argv) > 1 else 0.05))
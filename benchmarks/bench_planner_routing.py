@@ -0,0 +1,54 @@
+"""
+Replays benchmarks/data/chat_requests.jsonl in MULTI_AGENT mode with the planner
+asking the LLM on every hop and with rule based routing, and reports LLM calls
+and turn latency per booked meeting.
+
+    $ python -m benchmarks.bench_planner_routing [latency]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import llm as llm_module, multi_agent
+from benchmarks.bench_rule_extraction import load_requests
+from benchmarks.fake_llm import FakeChatModel
+
+
+async def replay(planner_mode: str, latency: float):
+    main.mode = main.MULTI_AGENT
+    main.llm = FakeChatModel(latency=latency)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.CACHED_NODES.clear()
+    multi_agent.PLANNER_MODE = planner_mode
+    multi_agent.PLANNER_STATS.clear()
+
+    t0 = time.perf_counter()
+    for req in load_requests():
+        await main.chat(req.model_copy(update={"session_id": f"{planner_mode}-{req.session_id}"}))
+    elapsed = time.perf_counter() - t0
+
+    stats = multi_agent.planner_stats()
+    booked = stats["booked"] or 1
+    print(
+        f"planner {planner_mode:>5}: booked {stats['booked']}, LLM calls {main.llm.calls} "
+        f"({main.llm.calls / booked:.1f}/booking, planner LLM calls {stats['llm']}), "
+        f"{elapsed / booked:.2f} s/booking"
+    )
+    return main.llm.calls / booked
+
+
+async def main_async(latency: float):
+    llm_calls = await replay("llm", latency)
+    rule_calls = await replay("rules", latency)
+    print(f"LLM calls saved per booked meeting: {llm_calls - rule_calls:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(float(sys.argv[1]) if len(sys.argv) > 1 else 0.1))
@@ -0,0 +1,64 @@
+"""
+Replays benchmarks/data/chat_requests.jsonl in HUMAN_IN_LOOP mode with the rule based
+extraction fast path off and on. Reports the share of extraction turns that did not
+call the LLM and the mean turn latency with a fake model taking `latency` seconds per call.
+
+    $ python -m benchmarks.bench_rule_extraction [latency]
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import extraction, llm as llm_module
+from app.schemas import ChatRequest
+from benchmarks.fake_llm import FakeChatModel
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "chat_requests.jsonl")
+
+
+def load_requests():
+    with open(DATA, encoding="utf-8") as f:
+        return [ChatRequest(**json.loads(line)) for line in f if line.strip()]
+
+
+async def replay(fast_path: bool, latency: float):
+    main.mode = main.HUMAN_IN_LOOP
+    main.llm = FakeChatModel(latency=latency)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    # Measure the extraction itself, not the response cache
+    llm_module.CACHED_NODES.clear()
+    extraction.FAST_PATH = fast_path
+    extraction.EXTRACTION_STATS.clear()
+
+    tag = "on" if fast_path else "off"
+    turns = []
+    for req in load_requests():
+        req = req.model_copy(update={"session_id": f"{tag}-{req.session_id}"})
+        t0 = time.perf_counter()
+        await main.chat(req)
+        turns.append(time.perf_counter() - t0)
+    stats = extraction.extraction_stats()
+    print(
+        f"fast path {tag:>3}: {len(turns)} turns, mean {1000 * sum(turns) / len(turns):7.1f} ms/turn, "
+        f"LLM calls {main.llm.calls:3d}, extraction turns without LLM "
+        f"{stats['rules']}/{stats['rules'] + stats['llm']} ({100 * stats['rules_fraction']:.0f}%)"
+    )
+    return sum(turns)
+
+
+async def main_async(latency: float):
+    off = await replay(False, latency)
+    on = await replay(True, latency)
+    print(f"latency saved: {1000 * (off - on):.0f} ms over the replay")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(float(sys.argv[1]) if len(sys.argv) > 1 else 0.3))
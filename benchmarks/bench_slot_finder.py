@@ -0,0 +1,83 @@
+"""
+Common free slots of many attendees over a 30 day horizon: the bitmap SlotFinder
+against stepping a cursor through the horizon and asking every attendee's BusyIndex.
+
+    $ python -m benchmarks.bench_slot_finder [attendees] [horizon_days] [count]
+"""
+from __future__ import annotations
+import datetime as dt
+import random
+import sys
+import time
+
+import pytz
+
+from app.calendar_mock import BusyBlock, BusyIndex
+from app.slot_finder import SlotFinder, WorkingHours
+
+TZ = pytz.timezone("America/Los_Angeles")
+
+
+def fill(index: BusyIndex, rng: random.Random, attendees, start: dt.datetime, days: int):
+    # Up to two 30-60 minute meetings per attendee every other day or so
+    for name in attendees:
+        blocks = []
+        for d in range(days):
+            day = start + dt.timedelta(days=d)
+            for _ in range(rng.choice((0, 0, 1, 2))):
+                s = TZ.localize(dt.datetime.combine(day.date(), dt.time(rng.randint(8, 16), rng.choice((0, 15, 30, 45)))))
+                blocks.append(BusyBlock(s, s + dt.timedelta(minutes=rng.choice((30, 60)))))
+        index.load(name, blocks)
+
+
+def cursor_scan(index: BusyIndex, attendees, start, duration, count, days, hours: WorkingHours):
+    found = []
+    cursor = start
+    end = start + dt.timedelta(days=days)
+    while cursor < end and len(found) < count:
+        local = TZ.normalize(cursor.astimezone(TZ))
+        stop = local + dt.timedelta(minutes=duration)
+        if (
+            local.weekday() in hours.weekdays
+            and local.hour >= hours.start_hour
+            and (stop.hour, stop.minute) <= (hours.end_hour, 0)
+            and stop.date() == local.date()
+            and not any(index.is_busy(a, local, stop) for a in attendees)
+        ):
+            found.append((local, duration))
+        cursor += dt.timedelta(minutes=30)
+    return found
+
+
+def main(attendees: int, days: int, count: int):
+    rng = random.Random(11)
+    names = [f"Attendee {i}" for i in range(attendees)]
+    start = TZ.localize(dt.datetime(2026, 2, 2, 8, 0))
+    index = BusyIndex()
+    fill(index, rng, names, start, days)
+    hours = WorkingHours()
+    finder = SlotFinder(index)
+
+    for group in (2, 10, attendees):
+        who = names[:group]
+        runs = 50
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            slots = finder.find(who, start, 30, count=count, horizon_days=days, working_hours=hours)
+        t_bits = (time.perf_counter() - t0) / runs
+
+        t0 = time.perf_counter()
+        scanned = cursor_scan(index, who, start, 30, count, days, hours)
+        t_scan = time.perf_counter() - t0
+        assert [s[0] for s in slots] == [s[0] for s in scanned], "finder and scan disagree"
+
+        first = slots[0][0].strftime("%a %b %d %H:%M") if slots else "-"
+        print(
+            f"{group:3d} attendees, {days} days: SlotFinder {t_bits * 1000:7.2f} ms, "
+            f"cursor scan {t_scan * 1000:8.2f} ms, {len(slots)} slots, first {first}"
+        )
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [50, 30, 5][len(args):]))
@@ -0,0 +1,69 @@
+"""
+Mean turn latency with speculative booking off vs. on (SPECULATIVE_BOOKING), replaying
+the sample conversations with a fake LLM that sleeps `latency` seconds per call, with
+the extraction fast path on and off. The replies of both runs must be identical.
+
+    $ python -m benchmarks.bench_speculation [latency_seconds]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+# A relative date re-parsed when the base rolls over mid-replay costs seconds, keep one base
+os.environ.setdefault("DATE_BASE_BUCKET_SECONDS", "3600")
+
+import app.main as main
+from app import extraction, speculation
+from app import llm as llm_module
+from benchmarks.bench_rule_extraction import load_requests
+from benchmarks.fake_llm import FakeChatModel
+
+MODES = (("human_in_loop", main.HUMAN_IN_LOOP), ("multi_agent", main.MULTI_AGENT))
+
+
+async def replay(mode: int, fast_path: bool, speculative: bool, latency: float, tag: str = ""):
+    main.mode = mode
+    main.llm = FakeChatModel(latency=latency)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.CACHED_NODES.clear()
+    extraction.FAST_PATH = fast_path
+    speculation.SPECULATIVE = speculative
+    speculation.SPECULATION_STATS.clear()
+
+    tag = tag or f"{mode}-{fast_path:d}{speculative:d}"
+    turns, replies = [], []
+    for req in load_requests():
+        req = req.model_copy(update={"session_id": f"{tag}-{req.session_id}"})
+        t0 = time.perf_counter()
+        res = await main.chat(req)
+        turns.append(time.perf_counter() - t0)
+        replies.append(res.reply)
+    return turns, replies, main.llm.calls, speculation.speculation_stats()
+
+
+async def main_async(latency: float):
+    for mode_name, mode in MODES:
+        # Imports, graphs and caches warm up on the first replay, keep that out of the comparison
+        for fast_path in (True, False):
+            await replay(mode, fast_path, False, 0.0, tag=f"warm-up-{mode_name}-{fast_path:d}")
+        for fast_path in (True, False):
+            off, off_replies, off_calls, _ = await replay(mode, fast_path, False, latency)
+            on, on_replies, on_calls, stats = await replay(mode, fast_path, True, latency)
+            assert on_replies == off_replies, "speculation changed a reply"
+            saved = (sum(off) - sum(on)) / len(on)
+            print(
+                f"{mode_name:>13} fast path {'on' if fast_path else 'off':>3}: "
+                f"mean {1000 * sum(off) / len(off):6.1f} -> {1000 * sum(on) / len(on):6.1f} ms/turn "
+                f"(saved {1000 * saved:5.1f} ms/turn), LLM calls {off_calls} -> {on_calls}, "
+                f"speculations started {stats.get('started', 0)}, used {stats.get('used', 0)}, "
+                f"discarded {stats.get('discarded', 0)}, expired {stats.get('expired', 0)}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(float(sys.argv[1]) if len(sys.argv) > 1 else 0.2))
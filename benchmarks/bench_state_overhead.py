@@ -0,0 +1,132 @@
+"""
+Per-turn CPU time and allocations of the state handling: drafts deep copied by every
+extraction and re-serialized by every node that prompts with them (previous) vs. copied
+on write and serialized once per distinct draft (current).
+
+Replays benchmarks/data/chat_requests.jsonl in every mode against a fake model that
+answers at once, so the time left is the app's own. CPU is process time per turn;
+allocations are the bytes tracemalloc sees allocated at the peak of a turn. The state
+operations alone (one extraction merge and the prompts of a turn) are timed as well.
+
+    $ python -m benchmarks.bench_state_overhead [rounds]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import extraction, llm as llm_module, multi_agent, naive_agent, schemas, utils
+from app.schemas import MeetingDraft
+from benchmarks.bench_rule_extraction import load_requests
+from benchmarks.fake_llm import FakeChatModel
+
+MODES = (("iterate", main.ITERATE), ("human_in_loop", main.HUMAN_IN_LOOP), ("multi_agent", main.MULTI_AGENT))
+CURRENT = (extraction.merge_extraction, schemas.draft_json)
+
+
+def legacy_merge_extraction(draft: MeetingDraft, data, default_tz: str) -> MeetingDraft:
+    draft = draft.model_copy(deep=True)
+    tz = data.get("timezone") or draft.timezone or default_tz
+    if data.get("host_full_name") and not draft.host_full_name:
+        draft.host_full_name = data["host_full_name"]
+    if data.get("attendee_full_name") and not draft.attendee_full_name:
+        draft.attendee_full_name = data["attendee_full_name"]
+    if data.get("subject") and not draft.subject:
+        draft.subject = data["subject"]
+    duration = data.get("duration_minutes")
+    if isinstance(duration, int) and duration > 0:
+        draft.duration_minutes = duration
+    draft.timezone = tz
+    if data.get("start_time_iso"):
+        draft.start_time_iso = data["start_time_iso"]
+    elif data.get("start_time_text"):
+        parsed = utils.parse_user_date(data["start_time_text"], None)
+        if parsed:
+            draft.start_time_iso = parsed.isoformat()
+    return draft
+
+
+def legacy_draft_json(draft: MeetingDraft) -> str:
+    return draft.model_dump_json()
+
+
+def use(merge, to_json) -> None:
+    extraction.merge_extraction = merge
+    for module in (extraction, naive_agent, multi_agent):
+        module.draft_json = to_json
+
+
+async def replay(tag: str, mode: int, traced: bool):
+    main.mode = mode
+    main.llm = FakeChatModel()
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    # Every round replays the same turns, keep the LLM cache out of it
+    llm_module.CACHED_NODES.clear()
+
+    cpu, peak = [], []
+    for req in load_requests():
+        req = req.model_copy(update={"session_id": f"{tag}-{req.session_id}"})
+        if traced:
+            tracemalloc.reset_peak()
+            start, _ = tracemalloc.get_traced_memory()
+        t0 = time.process_time()
+        await main.chat(req)
+        cpu.append(time.process_time() - t0)
+        if traced:
+            peak.append(tracemalloc.get_traced_memory()[1] - start)
+    return cpu, peak
+
+
+async def measure(name: str, rounds: int):
+    for mode_name, mode in MODES:
+        best = None
+        for r in range(rounds):
+            cpu, _ = await replay(f"{name}-{mode_name}-{r}", mode, traced=False)
+            best = min(best or cpu, cpu, key=sum)
+        tracemalloc.start()
+        _, peak = await replay(f"{name}-{mode_name}-mem", mode, traced=True)
+        tracemalloc.stop()
+        print(
+            f"{name:>8} {mode_name:>13}: {1000 * sum(best) / len(best):6.3f} ms CPU/turn, "
+            f"{sum(peak) / len(peak) / 1024:7.1f} KiB allocated/turn (peak)"
+        )
+
+
+def state_ops(merge, to_json, n: int = 20000) -> float:
+    # One extraction merge, then the prompts of a turn serializing the draft three times
+    draft = MeetingDraft(host_full_name="Sam Lee", attendee_full_name="Jeff Chen", subject="Q3 planning",
+                         start_time_iso="2026-01-27T18:00:00-08:00", timezone="America/Los_Angeles")
+    data = {"subject": "Q3 planning", "duration_minutes": 30}
+
+    def turn():
+        merged = merge(draft, data, "America/Los_Angeles")
+        for _ in range(3):
+            to_json(merged)
+
+    return timeit.timeit(turn, number=n) / n
+
+
+async def main_async(rounds: int):
+    main.GRAPHS.build_all()
+    utils.warm_up_dates()
+    # Warm up pydantic, LangGraph and the date cache so neither variant pays for it
+    await replay("warmup", main.HUMAN_IN_LOOP, traced=False)
+
+    print(f"state ops per turn: previous {1e6 * state_ops(legacy_merge_extraction, legacy_draft_json):.1f} us, "
+          f"current {1e6 * state_ops(*CURRENT):.1f} us")
+    use(legacy_merge_extraction, legacy_draft_json)
+    await measure("previous", rounds)
+    use(*CURRENT)
+    await measure("current", rounds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(int(sys.argv[1]) if len(sys.argv) > 1 else 3))
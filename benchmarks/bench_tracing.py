@@ -0,0 +1,88 @@
+"""
+POST /chat throughput with tracing off, sampled and full. `copies` copies of
+benchmarks/data/chat_requests.jsonl run concurrently (one task per session) against
+a zero latency fake model, trace events are written to /dev/null. Reports the best
+of three rounds per mode.
+
+    $ python -m benchmarks.bench_tracing [copies] [sample_rate]
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import llm as llm_module, tracing
+from benchmarks.bench_chat_batch import requests
+from benchmarks.fake_llm import FakeChatModel
+
+
+async def run(mode: str, copies: int, sample_rate: float, sink) -> float:
+    main.mode = main.MULTI_AGENT
+    main.llm = FakeChatModel()
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.CACHED_NODES.clear()
+    tracing.configure(mode, sample_rate, stream=sink)
+
+    sessions = {}
+    # The same sessions every run (WORKFLOWS.clear() dropped them), only tracing differs
+    for req in requests("bench", copies):
+        sessions.setdefault(req.session_id, []).append(req)
+
+    async def conversation(turns):
+        for req in turns:
+            await main.chat(req)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(conversation(turns) for turns in sessions.values()))
+    elapsed = time.perf_counter() - t0
+    tracing.shutdown()
+    turns = sum(len(t) for t in sessions.values())
+    return turns / elapsed
+
+
+async def main_async(copies: int, sample_rate: float, rounds: int = 3):
+    modes = ("off", "sampled", "full")
+    best = dict.fromkeys(modes, 0.0)
+    with open(os.devnull, "w") as sink:
+        # dateparser builds its caches on first use, keep that out of the numbers
+        await run("off", copies, sample_rate, sink)
+        # Modes take turns, the best round of each is reported
+        for _ in range(rounds):
+            for mode in modes:
+                best[mode] = max(best[mode], await run(mode, copies, sample_rate, sink))
+    for mode in modes:
+        print(
+            f"tracing {mode:>7}: {best[mode]:7.1f} turns/s"
+            + (f" ({best[mode] / best['off']:.2f}x off)" if mode != "off" else "")
+        )
+    await node_overhead()
+
+
+async def node_overhead(calls: int = 200_000):
+    """
+    Cost of the span wrapper around a node that does nothing, outside a traced turn.
+    """
+    async def node(state):
+        return state
+
+    wrapped = tracing.traced_node("noop")(node)
+    timings = {}
+    for label, fn in (("bare", node), ("wrapped", wrapped)):
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            await fn(None)
+        timings[label] = (time.perf_counter() - t0) / calls
+    print(f"untraced node wrapper: {1e9 * (timings['wrapped'] - timings['bare']):.0f} ns per node run")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.1,
+    ))
@@ -0,0 +1,134 @@
+from __future__ import annotations
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.prompts import EXTRACTION_SYSTEM, EXTRACTION_BATCH_SYSTEM, FUSED_SYSTEM, PLANNER_SYSTEM, ASK_MISSING_SYSTEM
+
+WITH_RE = re.compile(r"\bwith\s+([A-Za-z]+(?:\s+[A-Z][a-z]+)?)", re.IGNORECASE)
+ABOUT_RE = re.compile(r"\babout\s+(.+?)(?=\s+\d{1,2}/\d{1,2}/\d{4}|\s+(?:on|at|next|tomorrow)\b|$)", re.IGNORECASE)
+HOST_RE = re.compile(r"\bhosted\s+by\s+([A-Za-z]+(?:\s+[A-Z][a-z]+)?)", re.IGNORECASE)
+DURATION_RE = re.compile(r"\b(\d+)\s*(?:minute|min)", re.IGNORECASE)
+DATE_RE = re.compile(r"\d{1,2}/\d{1,2}/\d{4}(?:\s+\d{1,2}(?::\d{2})?\s*(?:am|pm))?", re.IGNORECASE)
+PICK_RE = re.compile(r"((?:mon|tue|wed|thu|fri|sat|sun)\w*,?\s+\w+\s+\d{1,2}\s+at\s+\d{1,2}(?::\d{2})?\s*(?:am|pm))", re.IGNORECASE)
+
+
+def scripted_extraction(message: str) -> dict:
+    """
+    Stand-in for the model's answer to EXTRACTION_SYSTEM, good enough for the sample conversations.
+    """
+    data = {
+        "host_full_name": None,
+        "attendee_full_name": None,
+        "subject": None,
+        "start_time_text": None,
+        "duration_minutes": None,
+        "timezone": None,
+    }
+    if m := HOST_RE.search(message):
+        data["host_full_name"] = m.group(1)
+    if m := WITH_RE.search(message):
+        data["attendee_full_name"] = m.group(1).title()
+    if m := ABOUT_RE.search(message):
+        data["subject"] = m.group(1).strip()
+    if m := DURATION_RE.search(message):
+        data["duration_minutes"] = int(m.group(1))
+    if m := DATE_RE.search(message):
+        data["start_time_text"] = m.group(0)
+    elif m := PICK_RE.search(message):
+        data["start_time_text"] = m.group(1)
+    return data
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model that answers the scheduler's prompts without a network call.
+
+    The reply is chosen from the system prompt of the request, `latency` seconds are
+    spent (asleep) per call to stand in for the provider round-trip. When streamed the
+    first word arrives after `first_token` seconds and the rest of `latency` is spread
+    over the remaining words. `token_latency` seconds per reply token are added on top
+    when not streamed, so that long replies (batched extraction) take longer.
+    """
+
+    model_name: str = "fake-scheduler"
+    temperature: float = 0.0
+    latency: float = 0.0
+    token_latency: float = 0.0
+    first_token: Optional[float] = None
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-scheduler"
+
+    def respond(self, messages: List[BaseMessage]) -> str:
+        system = messages[0].content if messages else ""
+        last = messages[-1].content if messages else ""
+        if system == EXTRACTION_SYSTEM:
+            return json.dumps(scripted_extraction(last))
+        if system == EXTRACTION_BATCH_SYSTEM:
+            return json.dumps([scripted_extraction(item["message"]) for item in json.loads(last)])
+        if system == FUSED_SYSTEM:
+            data = scripted_extraction(last)
+            draft = json.loads(messages[1].content[len("draft: "):])
+            known = {**draft, **{k: v for k, v in data.items() if v}, "start_time_iso": draft.get("start_time_iso") or data["start_time_text"]}
+            missing = [k for k in ("host_full_name", "attendee_full_name", "subject", "start_time_iso") if not known.get(k)]
+            return json.dumps({**data, "reply": f"Could you tell me the {', '.join(missing)}?" if missing else None})
+        if system == PLANNER_SYSTEM:
+            if "booking_agent completed" in last:
+                return "done"
+            if "input_agent completed" in last:
+                return "booking_agent"
+            return "input_agent"
+        if system == ASK_MISSING_SYSTEM:
+            draft = json.loads(last[len("draft: "):]) if last.startswith("draft: ") else {}
+            missing = [k for k in ("host_full_name", "attendee_full_name", "subject", "start_time_iso") if not draft.get(k)]
+            return f"Could you tell me the {', '.join(missing) or 'details'}?"
+        return "OK: " + str(last)[:200]
+
+    @staticmethod
+    def usage(messages: List[BaseMessage], reply: str) -> dict:
+        # About 4 characters per token
+        prompt = sum(len(str(m.content)) for m in messages) // 4 + 1
+        completion = len(reply) // 4 + 1
+        return {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion}
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        self.calls += 1
+        reply = self.respond(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply, usage_metadata=self.usage(messages, reply)))])
+
+    def delay(self, messages: List[BaseMessage]) -> float:
+        if not self.token_latency:
+            return self.latency
+        return self.latency + self.token_latency * self.usage(messages, self.respond(messages))["output_tokens"]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if delay := self.delay(messages):
+            time.sleep(delay)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if delay := self.delay(messages):
+            await asyncio.sleep(delay)
+        return self._result(messages)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        reply = self.respond(messages)
+        words = re.findall(r"\S+\s*", reply) or [""]
+        first = self.latency if self.first_token is None else min(self.first_token, self.latency)
+        rest = (self.latency - first) / max(len(words) - 1, 1)
+        for i, word in enumerate(words):
+            delay = first if i == 0 else rest
+            if delay:
+                await asyncio.sleep(delay)
+            usage = self.usage(messages, reply) if i == len(words) - 1 else None
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word, usage_metadata=usage))
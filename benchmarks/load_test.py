@@ -0,0 +1,184 @@
+"""
+Offline load test: thousands of concurrent multi-turn conversations driven through the
+FastAPI app over an in-process ASGI client, against the deterministic fake chat model.
+
+Conversations are the scripts of benchmarks/data/chat_requests.jsonl, cycled and given
+their own session ids. Every conversation sends its turns one after another, all
+conversations run at once (at most --concurrency of them). Per mode it reports p50 / p95
+/ p99 turn latency, throughput, errors and RSS growth, and writes them as JSON together
+with the commit so runs can be compared.
+
+    $ python -m benchmarks.load_test --conversations 2000 --latency 0.05
+    $ python -m benchmarks.load_test --modes multi_agent --baseline benchmarks/results/load_test.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import datetime as dt
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+# Keep every session of the run resident, eviction is not what is measured here
+os.environ.setdefault("SESSION_MAX_ENTRIES", "0")
+os.environ.setdefault("SESSION_MAX_BYTES", "0")
+
+import httpx
+
+import app.main as main
+from app import llm as llm_module
+from benchmarks.bench_rule_extraction import load_requests
+from benchmarks.fake_llm import FakeChatModel
+
+MODES = OrderedDict([("iterate", main.ITERATE), ("human_in_loop", main.HUMAN_IN_LOOP), ("multi_agent", main.MULTI_AGENT)])
+RESULTS = os.path.join(os.path.dirname(__file__), "results", "load_test.json")
+
+
+def rss_bytes() -> int:
+    """
+    Current resident set size, peak RSS where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def scripts() -> List[List[str]]:
+    by_session: Dict[str, List[str]] = OrderedDict()
+    for req in load_requests():
+        by_session.setdefault(req.session_id, []).append(req.message)
+    return list(by_session.values())
+
+
+def percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+
+async def run_mode(name: str, conversations: int, concurrency: int, latency: float) -> dict:
+    main.mode = MODES[name]
+    main.llm = FakeChatModel(latency=latency)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    # Every conversation is a copy of a handful of scripts, the cache would answer most calls
+    llm_module.CACHED_NODES.clear()
+    main.GRAPHS.build_all()
+
+    convs = scripts()
+    semaphore = asyncio.Semaphore(concurrency or conversations)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def conversation(client: httpx.AsyncClient, n: int):
+        turns = convs[n % len(convs)]
+        async with semaphore:
+            for message in turns:
+                t0 = time.perf_counter()
+                try:
+                    r = await client.post("/chat", json={"session_id": f"{name}-{n}", "message": message})
+                    status = str(r.status_code)
+                except Exception as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - t0)
+                if status != "200":
+                    errors[status] = errors.get(status, 0) + 1
+
+    rss_before = rss_bytes()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(conversation(client, n) for n in range(conversations)))
+        elapsed = time.perf_counter() - t0
+    rss_after = rss_bytes()
+
+    return {
+        "conversations": conversations,
+        "turns": len(latencies),
+        "seconds": round(elapsed, 3),
+        "turns_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 1),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 1),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 1),
+        "errors": errors,
+        "llm_calls": main.llm.calls,
+        "rss_before_mb": round(rss_before / 2**20, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 2**20, 1),
+        "rss_growth_kb_per_conversation": round((rss_after - rss_before) / 1024 / conversations, 1),
+    }
+
+
+def report(name: str, result: dict, baseline: dict | None) -> None:
+    def delta(key: str) -> str:
+        if not baseline or key not in baseline:
+            return ""
+        before = baseline[key]
+        return f" ({100 * (result[key] - before) / before:+.0f}%)" if before else ""
+
+    print(
+        f"{name:>13}: {result['turns']} turns, {result['turns_per_second']:.1f} turns/s{delta('turns_per_second')}, "
+        f"p50 {result['p50_ms']:.0f}{delta('p50_ms')} / p95 {result['p95_ms']:.0f}{delta('p95_ms')} / "
+        f"p99 {result['p99_ms']:.0f}{delta('p99_ms')} ms, errors {sum(result['errors'].values())}, "
+        f"RSS +{result['rss_growth_mb']:.1f} MB ({result['rss_growth_kb_per_conversation']:.1f} KiB/conversation)"
+    )
+
+
+async def main_async(args) -> None:
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"baseline: commit {baseline.get('commit')} at {baseline.get('timestamp')}")
+
+    results = {}
+    for name in args.modes:
+        results[name] = await run_mode(name, args.conversations, args.concurrency, args.latency)
+        report(name, results[name], (baseline or {}).get("results", {}).get(name))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": commit(),
+                "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "params": {
+                    "conversations": args.conversations,
+                    "concurrency": args.concurrency,
+                    "latency": args.latency,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--conversations", type=int, default=1000, help="conversations per mode")
+    parser.add_argument("--concurrency", type=int, default=0, help="conversations in flight at once, 0 for all")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--output", default=RESULTS, help="JSON results file, empty to skip")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    asyncio.run(main_async(parser.parse_args()))
@@ -0,0 +1,109 @@
+"""
+Fires `turns` turns for each of `sessions` sessions all at once, interleaved, through
+POST /chat in HUMAN_IN_LOOP mode, with and without the per-session locks. Checks that
+no two turns of a session overlapped and that every session saw its turns in the order
+they were sent, and prints the lock queue metrics.
+
+    $ python -m benchmarks.stress_session_locks [sessions] [turns] [latency]
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TRACE_MODE", "off")
+
+import app.main as main
+from app import llm as llm_module
+from app.schemas import ChatRequest
+from app.session_locks import SessionLocks
+from benchmarks.fake_llm import FakeChatModel
+
+MESSAGES = [
+    "Book a meeting with Alex Chen",
+    "about Q1 planning",
+    "tomorrow at 3pm",
+    "hosted by Sam",
+]
+
+
+class NoLocks:
+    @contextlib.asynccontextmanager
+    async def hold(self, session_id: str):
+        yield
+
+    def stats(self):
+        return {}
+
+
+async def run(locks, sessions: int, turns: int, latency: float):
+    main.mode = main.HUMAN_IN_LOOP
+    main.llm = FakeChatModel(latency=latency)
+    main.CONTEXT = None
+    main.WORKFLOWS.clear()
+    llm_module.CACHED_NODES.clear()
+    main.SESSION_LOCKS = locks
+
+    active = defaultdict(int)
+    overlaps = 0
+    seen = defaultdict(list)
+    chat_turn = main.chat_turn
+
+    async def watched_turn(req: ChatRequest):
+        nonlocal overlaps
+        active[req.session_id] += 1
+        if active[req.session_id] > 1:
+            overlaps += 1
+        seen[req.session_id].append(req.message)
+        try:
+            return await chat_turn(req)
+        finally:
+            active[req.session_id] -= 1
+
+    # Every session's turns in order, sessions shuffled together
+    rng = random.Random(3)
+    queues = {f"s{s:03d}": [f"{MESSAGES[t % len(MESSAGES)]} ({t})" for t in range(turns)] for s in range(sessions)}
+    sent = {sid: list(msgs) for sid, msgs in queues.items()}
+    order = []
+    while queues:
+        sid = rng.choice(list(queues))
+        order.append(ChatRequest(session_id=sid, message=queues[sid].pop(0)))
+        if not queues[sid]:
+            del queues[sid]
+
+    main.chat_turn = watched_turn
+    try:
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(main.chat(req) for req in order), return_exceptions=True)
+        elapsed = time.perf_counter() - t0
+    finally:
+        main.chat_turn = chat_turn
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    out_of_order = sum(1 for sid in sent if seen[sid] != sent[sid])
+    label = "locks" if isinstance(locks, SessionLocks) else "no locks"
+    print(
+        f"{label:>8}: {len(order)} turns in {elapsed:5.2f} s, {overlaps} overlapping turns, "
+        f"{out_of_order} sessions out of order, {len(errors)} errors"
+    )
+    if isinstance(locks, SessionLocks):
+        print(f"          {locks.stats()}")
+
+
+async def main_async(sessions: int, turns: int, latency: float):
+    await run(NoLocks(), sessions, turns, latency)
+    await run(SessionLocks(timeout=60, max_queue=turns), sessions, turns, latency)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main_async(
+        int(args[0]) if len(args) > 0 else 100,
+        int(args[1]) if len(args) > 1 else 10,
+        float(args[2]) if len(args) > 2 else 0.005,
+    ))
@@ -0,0 +1,91 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint, for load tests of the LLM client
+path without a key or a bill. Each call takes `latency` seconds; calls beyond `capacity`
+in flight, and a random `rate_limit` fraction of the rest, are answered with 429 and a
+Retry-After header, like a provider at its rate limit.
+
+    $ python -m benchmarks.stub_llm_server [--port 8999] [--capacity 8] [--latency 0.2] [--rate-limit 0.05]
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8999/v1.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import random
+import socket
+import threading
+import time
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def make_app(capacity: int = 8, latency: float = 0.2, rate_limit: float = 0.05, retry_after: float = 0.5) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+    app.state.stats = Counter()
+    in_flight = 0
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        nonlocal in_flight
+        body = await request.json()
+        stats = app.state.stats
+        stats["requests"] += 1
+        if in_flight >= capacity or random.random() < rate_limit:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": str(retry_after)},
+            )
+        in_flight += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], in_flight)
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            in_flight -= 1
+        stats["completed"] += 1
+        last = body["messages"][-1]["content"] if body.get("messages") else ""
+        return {
+            "id": f"stub-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"OK: {last}"[:200]}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_thread(app: FastAPI, port: int = 0):
+    """
+    Run `app` on 127.0.0.1 in a daemon thread, returns (base_url, server); server.should_exit = True stops it.
+    """
+    import uvicorn
+
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/v1", server
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rate-limit", type=float, default=0.05)
+    args = parser.parse_args()
+    uvicorn.run(make_app(args.capacity, args.latency, args.rate_limit), host="127.0.0.1", port=args.port)
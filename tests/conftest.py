@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+# No OpenAI key is needed, the fake chat model answers every prompt
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("TRACE_MODE", "off")
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    A fresh FakeChatModel serving every turn of app.main, with no sessions, checkpoints
+    or cached replies left over.
+    """
+    import app.main as main
+    from app import llm as llm_module
+    from app.registry import GraphRegistry
+    from benchmarks.fake_llm import FakeChatModel
+
+    model = FakeChatModel()
+    monkeypatch.setattr(main, "llm", model)
+    monkeypatch.setattr(main, "CONTEXT", None)
+    monkeypatch.setattr(main, "GRAPHS", GraphRegistry())
+    main.WORKFLOWS.clear()
+    llm_module.RESPONSE_CACHE.clear()
+    yield model
+    main.WORKFLOWS.clear()
+    llm_module.RESPONSE_CACHE.clear()
@@ -0,0 +1,109 @@
+import datetime as dt
+import random
+
+import pytest
+
+from app.booking import busy_message
+from app.calendar_mock import BusyBlock, BusyIndex, MockCalendar, SlotTaken
+from app.schemas import MeetingDraft
+from app.utils import ensure_tz
+
+PACIFIC = ensure_tz("America/Los_Angeles")
+
+
+def test_alternatives_in_requesters_working_hours():
+    calendar = MockCalendar([])
+    # A draft's start as the agents parse it: fixed offset, no zone name
+    start = dt.datetime.fromisoformat("2026-01-27T18:00:00-08:00")
+    calendar.busy.add("Alex Chen", BusyBlock(start, start + dt.timedelta(minutes=30)))
+
+    suggestions = calendar.suggest_alternatives("Alex Chen", start, 30, count=3, timezone="America/Los_Angeles")
+
+    assert len(suggestions) == 3
+    for s, dur in suggestions:
+        local = s.astimezone(PACIFIC)
+        assert local.weekday() < 5
+        assert 9 <= local.hour and local + dt.timedelta(minutes=dur) <= local.replace(hour=17, minute=0)
+    assert suggestions[0][0].astimezone(PACIFIC).replace(tzinfo=None) == dt.datetime(2026, 1, 28, 9, 0)
+
+
+def test_always_busy_attendees():
+    calendar = MockCalendar(["jeff", "mike"])
+    assert calendar.is_always_busy("Jeff  Chen")
+    assert not calendar.is_available("mike Ross")
+    assert calendar.is_available("Alex Chen")
+
+
+def test_book_reports_which_side_is_busy():
+    calendar = MockCalendar([])
+    start = PACIFIC.localize(dt.datetime(2026, 2, 3, 10))
+    calendar.book("Dana Lee", "Priya Raman", "hiring plan", start, 60)
+
+    with pytest.raises(SlotTaken) as taken:
+        calendar.book("Dana Lee", "Omar Haddad", "design sync", start + dt.timedelta(minutes=30), 30)
+    assert taken.value.who == "host"
+    with pytest.raises(SlotTaken) as taken:
+        calendar.book("Kim Park", "Priya Raman", "launch review", start, 30)
+    assert taken.value.who == "attendee"
+    assert len(calendar.events) == 1
+
+    draft = MeetingDraft(host_full_name="Dana Lee", attendee_full_name="Omar Haddad")
+    suggestions = calendar.suggest_alternatives("Omar Haddad", start, 30, timezone="America/Los_Angeles", host="Dana Lee")
+    # Dana is busy until 11:00, so is every slot before that
+    assert suggestions[0][0] == start + dt.timedelta(hours=1)
+    assert busy_message(draft, suggestions, PACIFIC, "host").startswith("The host Dana Lee is busy then.")
+
+
+def random_blocks(rng, base, n):
+    blocks = []
+    for _ in range(n):
+        start = base + dt.timedelta(minutes=15 * rng.randrange(0, 4 * 24 * 10))
+        blocks.append(BusyBlock(start, start + dt.timedelta(minutes=15 * rng.randrange(1, 12))))
+    return blocks
+
+
+def overlaps(blocks, start, end):
+    return any(b.start < end and start < b.end for b in blocks)
+
+
+def test_busy_index_matches_linear_scan():
+    rng = random.Random(7)
+    base = PACIFIC.localize(dt.datetime(2026, 3, 2))
+    index = BusyIndex()
+    blocks = random_blocks(rng, base, 300)
+    index.load("bulk", blocks)
+    for block in blocks:
+        index.add("one by one", block)
+
+    for _ in range(2000):
+        start = base + dt.timedelta(minutes=5 * rng.randrange(0, 12 * 24 * 10))
+        end = start + dt.timedelta(minutes=5 * rng.randrange(1, 24))
+        expected = overlaps(blocks, start, end)
+        assert index.is_busy("bulk", start, end) == expected
+        assert index.is_busy("One  By One", start, end) == expected
+    # Merged intervals are disjoint and sorted
+    merged = index.blocks("bulk")
+    assert all(a.end < b.start for a, b in zip(merged, merged[1:]))
+
+
+def test_slot_finder_matches_linear_scan():
+    rng = random.Random(8)
+    base = PACIFIC.localize(dt.datetime(2026, 3, 2, 8, 10))
+    calendar = MockCalendar([])
+    people = ["Ann", "Bob", "Cy"]
+    blocks = {p: random_blocks(rng, base, 40) for p in people}
+    for p in people:
+        calendar.busy.load(p, blocks[p])
+
+    found = calendar.find_common_slots(people, base, 45, count=60, timezone="America/Los_Angeles")
+
+    expected = []
+    t = PACIFIC.normalize(base.replace(minute=30))
+    while len(expected) < 60:
+        end = t + dt.timedelta(minutes=45)
+        local = t.astimezone(PACIFIC)
+        in_hours = local.weekday() < 5 and local.hour >= 9 and end.astimezone(PACIFIC) <= local.replace(hour=17, minute=0)
+        if in_hours and not any(overlaps(blocks[p], t, end) for p in people):
+            expected.append((t, 45))
+        t = PACIFIC.normalize(t + dt.timedelta(minutes=30))
+    assert found == expected
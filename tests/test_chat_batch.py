@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+import app.main as main
+from app.schemas import ChatRequest
+
+OPEN = "Set up a 30 minute meeting with Alex Chen about Q1 planning 01/27/2026 6 pm"
+HOST = "meeting hosted by saibaba"
+OTHER = "Schedule a 1 hour meeting with mike Ross about launch review 03/02/2026 11 am"
+ONE_TURN = "Book 45 minutes with Priya Raman about hiring plan 02/03/2026 10 am hosted by Dana Lee"
+
+
+@pytest.fixture
+def batch(monkeypatch, fake_llm):
+    monkeypatch.setattr(main, "mode", main.MULTI_AGENT)
+    # Long enough for the sessions of a batch to overlap
+    fake_llm.latency = 0.01
+
+    def run(*turns):
+        return asyncio.run(main.chat_batch([ChatRequest(session_id=s, message=m) for s, m in turns]))
+
+    return run
+
+
+def test_results_come_back_in_request_order(batch):
+    items = batch(("a", OPEN), ("b", ONE_TURN), ("c", OTHER), ("a", HOST))
+    assert [item.session_id for item in items] == ["a", "b", "c", "a"]
+    assert all(item.error is None for item in items)
+    assert items[0].response.state["draft"].attendee_full_name == "Alex Chen"
+    assert items[1].response.state["draft"].attendee_full_name == "Priya Raman"
+    assert items[2].response.state["draft"].subject == "launch review"
+
+
+def test_turns_of_a_session_run_in_the_order_given(batch):
+    items = batch(("a", OPEN), ("b", ONE_TURN), ("a", HOST))
+    assert "host_full_name" in items[0].response.reply
+    # The second turn saw the draft of the first
+    draft = items[2].response.state["draft"]
+    assert (draft.host_full_name, draft.attendee_full_name, draft.subject) == ("saibaba", "Alex Chen", "Q1 planning")
+    assert "Booked" in items[2].response.reply
+
+    # The other way round the host comes first and the draft is only complete after the second turn
+    items = batch(("z", HOST), ("z", OPEN))
+    assert items[0].response.state["draft"].attendee_full_name is None
+    assert items[1].response.state["draft"].host_full_name == "saibaba"
+
+
+def test_failed_turn_is_reported_in_its_item(monkeypatch, batch):
+    chat_turn = main.chat_turn
+
+    async def failing(req):
+        if req.message == "boom":
+            raise RuntimeError("boom")
+        return await chat_turn(req)
+
+    monkeypatch.setattr(main, "chat_turn", failing)
+    items = batch(("a", OPEN), ("b", "boom"), ("c", ONE_TURN), ("a", HOST))
+
+    assert items[1].error == "RuntimeError: boom" and items[1].response is None
+    assert [item.error for item in items[:1] + items[2:]] == [None, None, None]
+    assert "Booked" in items[3].response.reply
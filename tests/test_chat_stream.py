@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+import pytest
+
+import app.main as main
+from app.schemas import ChatRequest
+from app.session_locks import SessionLocks
+
+OPEN = "Set up a 30 minute meeting with Alex Chen about Q1 planning 01/27/2026 6 pm"
+
+
+async def events(message):
+    response = await main.chat_stream(ChatRequest(session_id="s", message=message))
+    return [chunk async for chunk in response.body_iterator]
+
+
+def parse(chunks):
+    parsed = []
+    for chunk in chunks:
+        event, data = chunk.removesuffix("\n\n").split("\n")
+        parsed.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return parsed
+
+
+@pytest.fixture
+def stream(monkeypatch, fake_llm):
+    monkeypatch.setattr(main, "mode", main.MULTI_AGENT)
+    return lambda message=OPEN: parse(asyncio.run(events(message)))
+
+
+def test_reply_tokens_then_done(stream):
+    sent = stream()
+    tokens, (event, data) = sent[:-1], sent[-1]
+    assert len(tokens) > 1 and {e for e, _ in tokens} == {"token"}
+    assert {d["node"] for _, d in tokens} == {"ask_missing"}
+
+    assert event == "done" and data["session_id"] == "s"
+    # The tokens add up to the reply the done event carries
+    assert "".join(d["text"] for _, d in tokens) == data["reply"] == "Could you tell me the host_full_name?"
+
+
+def test_failed_turn_ends_with_an_error_event(monkeypatch, stream):
+    async def chat_turn(req):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(main, "chat_turn", chat_turn)
+    assert stream() == [("error", {"status": 500, "detail": "RuntimeError: boom"})]
+
+
+def test_busy_session_ends_with_a_429_error_event(monkeypatch, stream):
+    locks = SessionLocks(timeout=0.01)
+    monkeypatch.setattr(main, "SESSION_LOCKS", locks)
+
+    async def while_held():
+        # Another turn of the session holds the lock for longer than the timeout
+        async with locks.hold("s"):
+            return await events(OPEN)
+
+    (event, data), = parse(asyncio.run(while_held()))
+    assert event == "error" and data["status"] == 429
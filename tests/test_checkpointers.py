@@ -0,0 +1,119 @@
+import asyncio
+import operator
+import time
+from typing import Annotated, List, TypedDict
+
+from langgraph.graph import END, StateGraph
+
+from app import main
+from app.checkpointers import SizedMemorySaver, SqliteSaver
+from app.registry import GraphRegistry
+
+
+class State(TypedDict):
+    items: Annotated[List[int], operator.add]
+
+
+def make_graph(checkpointer):
+    g = StateGraph(State)
+    g.add_node("step", lambda state: {"items": [len(state["items"])]})
+    g.set_entry_point("step")
+    g.add_edge("step", END)
+    return g.compile(checkpointer=checkpointer)
+
+
+def run_turns(graph, thread_id: str, turns: int) -> None:
+    config = {"configurable": {"thread_id": thread_id}}
+    for _ in range(turns):
+        graph.invoke({"items": []}, config)
+
+
+def test_sqlite_compact_drops_idle_threads(tmp_path):
+    saver = SqliteSaver(str(tmp_path / "checkpoints.sqlite"), keep_last=0, retention_seconds=60)
+    graph = make_graph(saver)
+    run_turns(graph, "idle", 2)
+    run_turns(graph, "active", 2)
+    saver.flush()
+    with saver.pool.connection() as conn:
+        conn.execute("UPDATE checkpoints SET created_at = ? WHERE thread_id = 'idle'", (time.time() - 3600,))
+
+    saver.compact()
+
+    assert list(saver.list({"configurable": {"thread_id": "idle"}})) == []
+    assert graph.get_state({"configurable": {"thread_id": "active"}}).values["items"] == [0, 1]
+
+
+def test_compaction_scheduled_from_lifespan(tmp_path, monkeypatch):
+    saver = SqliteSaver(str(tmp_path / "checkpoints.sqlite"))
+    calls = []
+    monkeypatch.setattr(saver, "compact", lambda: calls.append(1))
+    monkeypatch.setattr(main, "GRAPHS", GraphRegistry(saver))
+
+    async def run():
+        task = asyncio.create_task(main.compact_checkpoints(0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(run())
+    assert calls
+
+
+def test_sqlite_list_newest_first_with_limit(tmp_path):
+    saver = SqliteSaver(str(tmp_path / "checkpoints.sqlite"), keep_last=0)
+    run_turns(make_graph(saver), "t", 3)
+    config = {"configurable": {"thread_id": "t"}}
+
+    everything = list(saver.list(config))
+    ids = [c.config["configurable"]["checkpoint_id"] for c in everything]
+    assert ids == sorted(ids, reverse=True)
+
+    assert [c.config for c in saver.list(config, limit=2)] == [c.config for c in everything[:2]]
+    assert saver.get_tuple(config).config == everything[0].config
+    before = everything[1].config
+    assert [c.config for c in saver.list(config, before=before, limit=1)] == [everything[2].config]
+    loops = [c for c in everything if c.metadata.get("source") == "loop"]
+    assert [c.config for c in saver.list(config, filter={"source": "loop"}, limit=1)] == [loops[0].config]
+
+
+def test_memory_saver_keeps_last_checkpoints():
+    saver = SizedMemorySaver(keep_last=3)
+    graph = make_graph(saver)
+    run_turns(graph, "t", 5)
+    run_turns(graph, "other", 1)
+
+    config = {"configurable": {"thread_id": "t"}}
+    checkpoints = list(saver.list(config))
+    assert len(checkpoints) == 3
+    assert graph.get_state(config).values["items"] == [0, 1, 2, 3, 4]
+    # Only the blobs and writes of the kept checkpoints are left
+    kept = {(channel, version) for c in checkpoints for channel, version in c.checkpoint["channel_versions"].items()}
+    assert {(k[2], k[3]) for k in saver.blobs if k[0] == "t"} <= kept
+    assert {k[2] for k in saver.writes if k[0] == "t"} <= {c.config["configurable"]["checkpoint_id"] for c in checkpoints}
+
+    # What is left is what the thread is accounted for
+    size = sum(len(saved[1]) + len(meta[1]) for ns in saver.storage["t"].values() for saved, meta, _ in ns.values())
+    size += sum(len(v[1]) for k, v in saver.blobs.items() if k[0] == "t")
+    size += sum(len(e[2][1]) for k, w in saver.writes.items() if k[0] == "t" for e in w.values())
+    assert saver.resident_bytes("t") == size
+
+    saver.delete_thread("t")
+    assert saver.resident_bytes("t") == 0
+    assert graph.get_state({"configurable": {"thread_id": "other"}}).values["items"] == [0]
+
+
+def test_sqlite_keeps_last_checkpoints(tmp_path):
+    saver = SqliteSaver(str(tmp_path / "checkpoints.sqlite"), keep_last=3)
+    graph = make_graph(saver)
+    run_turns(graph, "t", 5)
+    saver.flush()
+
+    config = {"configurable": {"thread_id": "t"}}
+    checkpoints = list(saver.list(config))
+    assert len(checkpoints) == 3
+    assert graph.get_state(config).values["items"] == [0, 1, 2, 3, 4]
+    kept = {(channel, version) for c in checkpoints for channel, version in c.checkpoint["channel_versions"].items()}
+    with saver.pool.connection() as conn:
+        blobs = set(conn.execute("SELECT channel, version FROM blobs WHERE thread_id = 't'").fetchall())
+        writes = {r[0] for r in conn.execute("SELECT checkpoint_id FROM writes WHERE thread_id = 't'")}
+    assert blobs <= kept
+    assert writes <= {c.config["configurable"]["checkpoint_id"] for c in checkpoints}
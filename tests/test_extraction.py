@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import pytest
+
+from app.extraction import extract_draft, rule_extract
+from app.schemas import MeetingDraft
+
+
+def test_complete_request():
+    data = rule_extract("Book 45 minutes with Priya Raman about hiring plan 02/03/2026 10 am hosted by Dana Lee")
+    assert data["attendee_full_name"] == "Priya Raman"
+    assert data["host_full_name"] == "Dana Lee"
+    assert data["subject"] == "hiring plan"
+    assert data["duration_minutes"] == 45
+    assert data["start_time_iso"].startswith("2026-02-03T10:00")
+    assert "time_unparsed" not in data
+
+
+@pytest.mark.parametrize("message", [
+    "help me with booking a meeting about the roadmap tomorrow 3pm hosted by Sam",
+    "set up a call with my manager Bob tomorrow 3pm",
+    "with the team about planning",
+])
+def test_no_name_from_lowercase_or_stop_words(message):
+    assert "attendee_full_name" not in rule_extract(message)
+
+
+def test_duration_not_taken_from_start_offset():
+    data = rule_extract("Meet with Alex in 2 hours about the demo")
+    assert data["attendee_full_name"] == "Alex"
+    assert "duration_minutes" not in data
+    assert "start_time_iso" in data
+
+
+def test_date_without_time_of_day_is_not_trusted():
+    data = rule_extract("Meeting with Ann Lee about budget on Monday hosted by Sam Ray")
+    assert "start_time_iso" not in data
+    assert data["time_unparsed"]
+
+
+def test_time_outside_the_date_phrase_is_not_trusted():
+    data = rule_extract("Sometime this week with Ann Lee about budget at 10am")
+    assert "start_time_iso" not in data
+    assert data["time_unparsed"]
+
+
+class StubLLM:
+    model_name = "stub"
+
+    def __init__(self, reply: dict):
+        self.reply = json.dumps(reply)
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        from langchain_core.messages import AIMessage
+
+        self.calls += 1
+        return AIMessage(content=self.reply)
+
+
+def extract(llm, message, draft=None):
+    from langchain_core.output_parsers import JsonOutputParser
+
+    return asyncio.run(extract_draft(llm, JsonOutputParser(), draft or MeetingDraft(), message, "America/Los_Angeles"))
+
+
+BOOKED = MeetingDraft(
+    host_full_name="Dana Lee",
+    attendee_full_name="Priya Raman",
+    subject="hiring plan",
+    start_time_iso="2026-02-03T10:00:00-08:00",
+    duration_minutes=45,
+    timezone="America/Los_Angeles",
+)
+
+
+def test_rules_only_fill_what_the_llm_left_out():
+    llm = StubLLM({"attendee_full_name": "Bob Stone", "start_time_text": "01/30/2026 4 pm"})
+    # No host, so the rules alone do not complete the draft and the LLM is asked
+    draft = extract(llm, "Lunch with Bob about budget 01/30/2026 at 1 pm, no wait, make that 4 pm")
+    assert llm.calls == 1
+    assert draft.attendee_full_name == "Bob Stone"
+    assert draft.subject == "budget"
+    assert draft.host_full_name is None
+    assert draft.start_time_iso.startswith("2026-01-30T16:00")
+
+
+def test_subject_the_llm_left_null_stays_empty():
+    llm = StubLLM({"attendee_full_name": "Bob Stone", "subject": None, "start_time_text": "tomorrow 2:30pm"})
+    draft = extract(llm, "I forgot about it, can we meet with Bob at 2:30pm tomorrow")
+    assert draft.subject is None
+
+
+@pytest.mark.parametrize("message", ["How about tomorrow at 2:30pm?", "What about Friday at 10am", "It is about tomorrow at 3pm"])
+def test_time_proposals_are_not_subjects(message):
+    assert "subject" not in rule_extract(message)
+
+
+def test_subject_starting_like_a_date_word():
+    assert rule_extract("Sync about monthly review with Ann Lee")["subject"] == "monthly review"
+
+
+@pytest.mark.parametrize("message, text", [
+    ("10:30 works", "Feb 3 2026 10:30am"),
+    ("can we do 15:00", "Feb 3 2026 3pm"),
+    ("noon is better", "Feb 3 2026 12pm"),
+    ("at 3 then", "Feb 3 2026 3pm"),
+    ("the second one works", "Feb 4 2026 9am"),
+])
+def test_follow_up_on_a_complete_draft_asks_the_llm(message, text):
+    llm = StubLLM({"start_time_text": text})
+    draft = extract(llm, message, BOOKED)
+    assert llm.calls == 1
+    assert draft.start_time_iso != BOOKED.start_time_iso
+
+
+def test_alternative_picked_in_full_skips_the_llm():
+    llm = StubLLM({})
+    draft = extract(llm, "Make it 02/04/2026 9 am", BOOKED)
+    assert llm.calls == 0
+    assert draft.start_time_iso.startswith("2026-02-04T09:00")
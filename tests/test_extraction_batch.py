@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app import extraction
+from app import llm as llm_module
+from app.extraction import ExtractionBatcher
+from app.llm import ResponseCache
+from app.prompts import EXTRACTION_BATCH_SYSTEM, EXTRACTION_SYSTEM
+
+
+class EchoLLM:
+    """
+    Answers each extraction prompt with the message as the subject, a batched prompt
+    with one such object per item, or with `batch_reply` when it is set.
+    """
+
+    model_name = "echo"
+
+    def __init__(self, batch_reply=None):
+        self.batch_reply = batch_reply
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages)
+        if messages[0].content == EXTRACTION_BATCH_SYSTEM:
+            if self.batch_reply is not None:
+                return AIMessage(content=self.batch_reply)
+            return AIMessage(content=json.dumps([{"subject": item["message"]} for item in json.loads(messages[1].content)]))
+        return AIMessage(content=json.dumps({"subject": messages[-1].content}))
+
+    def systems(self):
+        return [p[0].content for p in self.prompts]
+
+
+def prompt(message):
+    return [SystemMessage(content=EXTRACTION_SYSTEM), HumanMessage(content='draft: {"subject": null}'), HumanMessage(content=message)]
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(llm_module, "RESPONSE_CACHE", cache)
+    monkeypatch.setattr(extraction, "RESPONSE_CACHE", cache)
+    monkeypatch.setattr(llm_module, "IN_FLIGHT", {})
+    return cache
+
+
+def subjects(replies):
+    return [json.loads(r)["subject"] for r in replies]
+
+
+async def extract_all(batcher, llm, messages):
+    return await asyncio.gather(*(batcher.extract(llm, prompt(m)) for m in messages))
+
+
+def test_concurrent_items_share_one_batched_call(cache):
+    llm = EchoLLM()
+    batcher = ExtractionBatcher(window_ms=5, max_size=8)
+    replies = asyncio.run(extract_all(batcher, llm, ["alpha", "beta", "gamma"]))
+
+    assert subjects(replies) == ["alpha", "beta", "gamma"]
+    assert llm.systems() == [EXTRACTION_BATCH_SYSTEM]
+    payload = json.loads(llm.prompts[0][1].content)
+    assert payload == [{"draft": {"subject": None}, "message": m} for m in ["alpha", "beta", "gamma"]]
+    assert dict(batcher.stats) == {"batches": 1, "items": 3, "batched_items": 3}
+    # Each answer is stored under its single-item prompt
+    assert cache.get(cache.key(llm, prompt("beta")), "extract") == json.dumps({"subject": "beta"})
+
+
+def test_full_batch_is_sent_without_waiting_for_the_window():
+    llm = EchoLLM()
+    batcher = ExtractionBatcher(window_ms=60_000, max_size=2)
+    replies = asyncio.run(asyncio.wait_for(extract_all(batcher, llm, ["alpha", "beta"]), 5))
+    assert subjects(replies) == ["alpha", "beta"]
+    assert llm.systems() == [EXTRACTION_BATCH_SYSTEM]
+
+
+def test_same_prompt_is_asked_once_per_batch():
+    llm = EchoLLM()
+    batcher = ExtractionBatcher(window_ms=5, max_size=8)
+    replies = asyncio.run(extract_all(batcher, llm, ["alpha", "beta", "alpha"]))
+    assert subjects(replies) == ["alpha", "beta", "alpha"]
+    assert len(json.loads(llm.prompts[0][1].content)) == 2
+    assert batcher.stats["items"] == 3 and batcher.stats["batched_items"] == 2
+
+
+@pytest.mark.parametrize("batch_reply", ["not json", json.dumps([{"subject": "alpha"}]), json.dumps(["alpha", "beta"])])
+def test_mismatched_reply_falls_back_to_one_call_per_item(cache, batch_reply):
+    llm = EchoLLM(batch_reply=batch_reply)
+    batcher = ExtractionBatcher(window_ms=5, max_size=8)
+    replies = asyncio.run(extract_all(batcher, llm, ["alpha", "beta"]))
+
+    assert subjects(replies) == ["alpha", "beta"]
+    assert llm.systems() == [EXTRACTION_BATCH_SYSTEM, EXTRACTION_SYSTEM, EXTRACTION_SYSTEM]
+    assert batcher.stats["fallbacks"] == 1 and batcher.stats["batched_items"] == 0
+    # One miss per item, the fallback does not look the prompt up again
+    assert cache.stats()["nodes"]["extract"]["misses"] == 2
+
+
+def test_lone_item_uses_the_single_item_prompt(cache):
+    llm = EchoLLM()
+    batcher = ExtractionBatcher(window_ms=5, max_size=8)
+    replies = asyncio.run(extract_all(batcher, llm, ["alpha"]))
+
+    assert subjects(replies) == ["alpha"]
+    assert llm.systems() == [EXTRACTION_SYSTEM]
+    assert cache.stats()["nodes"]["extract"] == {"hits": 0, "disk_hits": 0, "misses": 1}
+
+    # Answered from the cache the next time, without a batch
+    assert subjects(asyncio.run(extract_all(batcher, llm, ["alpha"]))) == ["alpha"]
+    assert len(llm.prompts) == 1 and batcher.stats["batches"] == 1
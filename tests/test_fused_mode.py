@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+import app.main as main
+from app.schemas import ChatRequest
+
+
+@pytest.fixture
+def turn(monkeypatch, fake_llm):
+    """
+    Runs a FUSED mode turn, returns its response and the number of LLM calls it made.
+    """
+    monkeypatch.setattr(main, "mode", main.FUSED)
+
+    def run(message, session_id="s"):
+        calls = fake_llm.calls
+        response = asyncio.run(main.chat(ChatRequest(session_id=session_id, message=message)))
+        return response, fake_llm.calls - calls
+
+    return run
+
+
+def test_complete_first_turn_books_without_an_llm_call(turn):
+    response, calls = turn("Book 45 minutes with Priya Raman about hiring plan 02/03/2026 10 am hosted by Dana Lee")
+    assert calls == 0
+    assert response.state["status"] == "booked"
+    assert response.reply == "Booked: hiring plan with Priya Raman at 2026-02-03T10:00:00-08:00 for 45 minutes by host Dana Lee."
+
+
+def test_missing_fields_are_asked_for_in_the_same_call(turn):
+    response, calls = turn("Set up a 30 minute meeting with Alex Chen about Q1 planning 01/27/2026 6 pm")
+    assert calls == 1
+    assert response.state["status"] == "ask_human"
+    assert response.reply == "Could you tell me the host_full_name?"
+
+    # The rules complete the draft, so no call at all
+    response, calls = turn("hosted by Sam Lee")
+    assert calls == 0
+    assert response.state["status"] == "booked"
+    assert response.state["draft"].host_full_name == "Sam Lee"
+
+
+def test_busy_attendee_gets_alternatives_and_picks_one(turn):
+    response, calls = turn("Book 30 minutes with Jeff Chen about Q1 planning 01/27/2026 6 pm hosted by Dana Lee")
+    assert calls == 0
+    assert "Jeff Chen is busy then" in response.reply
+    suggestions = response.state["suggestions"]
+    assert len(suggestions) == 3 and response.state["status"] != "booked"
+    first = suggestions[0].start_time_iso
+    assert first.startswith("2026-01-28T09:00")
+
+    # An alternative the rules can read is booked without a call either
+    response, calls = turn("Make it 01/28/2026 9 am")
+    assert calls == 0
+    assert response.state["status"] == "booked"
+    assert response.state["draft"].start_time_iso == first
+
+    # The meeting is booked, later turns just repeat that
+    response, calls = turn("thanks!")
+    assert calls == 0
+    assert response.reply.startswith("Booked: Q1 planning with Jeff Chen at 2026-01-28T09:00:00-08:00")
+
+
+def test_alternative_in_free_text_takes_one_call(turn):
+    turn("Book 30 minutes with Jeff Chen about Q1 planning 01/27/2026 6 pm hosted by Dana Lee")
+    response, calls = turn("Wednesday, January 28 at 9:00 AM works the best!")
+    assert calls == 1
+    assert response.state["status"] == "booked"
@@ -0,0 +1,63 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+import app.main as main
+from app import naive_agent
+from app.schemas import ChatRequest
+
+OPEN = "Set up a 30 minute meeting with Alex Chen about Q1 planning 01/27/2026 6 pm"
+BOOK = "Book 45 minutes with Priya Raman about hiring plan 02/03/2026 10 am hosted by Dana Lee"
+
+
+@pytest.fixture
+def turn(monkeypatch, fake_llm):
+    """
+    Runs an ITERATE mode turn, node runs and memo hits are counted from zero per test.
+    """
+    monkeypatch.setattr(main, "mode", main.ITERATE)
+    monkeypatch.setattr(naive_agent, "NODE_RUNS", Counter())
+    return lambda message, session_id="s": asyncio.run(main.chat(ChatRequest(session_id=session_id, message=message)))
+
+
+def runs(node):
+    return naive_agent.memo_stats()[node]
+
+
+def test_retried_turn_is_answered_from_the_memo(turn):
+    first = turn(OPEN)
+    retry = turn(OPEN)
+    assert retry.reply == first.reply == "Could you tell me the host_full_name?"
+    # extract sees the draft of the first turn, which it leaves as it was
+    assert runs("extract") == {"run": 2, "memo": 0}
+    assert runs("ask_missing") == {"run": 1, "memo": 1}
+
+
+def test_retried_booking_is_not_booked_twice(turn):
+    first = turn(BOOK)
+    retry = turn(BOOK)
+    assert "Booked: hiring plan with Priya Raman" in first.reply
+    assert retry.state["booked_event"] == first.state["booked_event"]
+    assert runs("check_availability") == {"run": 1, "memo": 1}
+
+
+def test_changed_draft_runs_the_node_again(turn):
+    turn(OPEN)
+    response = turn("make it 60 minutes")
+    assert response.state["draft"].duration_minutes == 60
+    assert runs("ask_missing") == {"run": 2, "memo": 0}
+
+
+def test_iterate_memo_off_runs_every_node(monkeypatch, turn):
+    monkeypatch.setattr(main, "ITERATE_MEMO", False)
+    first = turn(OPEN)
+    retry = turn(OPEN)
+    assert retry.reply == first.reply
+    assert runs("ask_missing") == {"run": 2, "memo": 0}
+
+    # Without the memo the retried booking finds the slot taken by the first one
+    first = turn(BOOK, "b")
+    retry = turn(BOOK, "b")
+    assert "Booked" in first.reply and "Priya Raman is busy then" in retry.reply
+    assert runs("check_availability") == {"run": 2, "memo": 0}
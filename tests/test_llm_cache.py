@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app.llm import ResponseCache
+
+
+def test_key_covers_model_temperature_and_messages():
+    msgs = [SystemMessage(content="extract"), HumanMessage(content="hi")]
+    llm = SimpleNamespace(model_name="m", temperature=0)
+    key = ResponseCache.key(llm, msgs)
+    assert key == ResponseCache.key(SimpleNamespace(model_name="m", temperature=0), list(msgs))
+    assert key != ResponseCache.key(SimpleNamespace(model_name="other", temperature=0), msgs)
+    assert key != ResponseCache.key(SimpleNamespace(model_name="m", temperature=1), msgs)
+    assert key != ResponseCache.key(llm, msgs[:1] + [HumanMessage(content="hello")])
+    # A plain string is a human message
+    assert key == ResponseCache.key(llm, msgs[:1] + ["hi"])
+
+
+def test_least_recently_used_entry_is_dropped():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a", "extract") == "1"
+    cache.put("c", "3")
+    assert cache.get("b", "extract") is None
+    assert cache.get("a", "extract") == "1" and cache.get("c", "extract") == "3"
+    assert cache.stats()["nodes"]["extract"] == {"hits": 3, "disk_hits": 0, "misses": 1}
+
+
+def test_directory_shared_between_caches(tmp_path):
+    ResponseCache(directory=str(tmp_path)).put("k" * 64, "reply")
+    other = ResponseCache(directory=str(tmp_path))
+    assert other.get("k" * 64, "planner") == "reply"
+    assert other.get("k" * 64, "planner") == "reply"
+    assert other.stats()["disk_hits"] == 1 and other.stats()["hits"] == 1
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app import llm as llm_module
+from app.llm import invoke_llm
+
+PROMPT = [SystemMessage(content="suggest"), HumanMessage(content="draft: {}")]
+# Not in CACHED_NODES, so only coalescing can share a reply
+NODE = "ask_alternative"
+
+
+class GatedLLM:
+    """
+    Holds every call until `release` is set, then answers it or raises `error`.
+    """
+
+    model_name = "gated"
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return AIMessage(content="reply")
+
+
+@pytest.fixture(autouse=True)
+def coalescing(monkeypatch):
+    monkeypatch.setattr(llm_module, "COALESCE", True)
+    monkeypatch.setattr(llm_module, "IN_FLIGHT", {})
+    monkeypatch.setattr(llm_module, "COALESCED", llm_module.Counter())
+
+
+async def callers(llm, n):
+    tasks = [asyncio.create_task(invoke_llm(llm, list(PROMPT), node=NODE)) for _ in range(n)]
+    # Every caller reaches the upstream call or the in-flight one
+    for _ in range(5):
+        await asyncio.sleep(0)
+    return tasks
+
+
+def test_identical_prompts_share_one_upstream_call():
+    async def run():
+        llm = GatedLLM()
+        tasks = await callers(llm, 5)
+        llm.release.set()
+        return llm, await asyncio.gather(*tasks)
+
+    llm, replies = asyncio.run(run())
+    assert llm.calls == 1
+    assert [r.content for r in replies] == ["reply"] * 5
+    assert llm_module.coalesce_stats() == {"in_flight": 0, "coalesced": 4, "nodes": {NODE: 4}}
+
+
+def test_cancelling_the_first_caller_does_not_cancel_the_others():
+    async def run():
+        llm = GatedLLM()
+        leader, *followers = await callers(llm, 3)
+        leader.cancel()
+        await asyncio.sleep(0)
+        llm.release.set()
+        replies = await asyncio.gather(*followers)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return llm, replies
+
+    llm, replies = asyncio.run(run())
+    assert llm.calls == 1
+    assert [r.content for r in replies] == ["reply", "reply"]
+
+
+def test_upstream_error_reaches_every_caller():
+    async def run():
+        llm = GatedLLM(error=ValueError("bad request"))
+        tasks = await callers(llm, 4)
+        llm.release.set()
+        return llm, await asyncio.gather(*tasks, return_exceptions=True)
+
+    llm, results = asyncio.run(run())
+    assert llm.calls == 1
+    assert all(isinstance(r, ValueError) for r in results)
+    assert llm_module.IN_FLIGHT == {}
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import app.main as main
+from app.schemas import ChatRequest
+from app.session_locks import SessionBusy, SessionLocks
+
+
+async def turn(locks, session_id, name, log, seconds=0.01):
+    async with locks.hold(session_id):
+        log.append(f"{name} start")
+        await asyncio.sleep(seconds)
+        log.append(f"{name} end")
+
+
+async def in_arrival_order(*coros):
+    # Each turn reaches the lock before the next one is started
+    tasks = []
+    for coro in coros:
+        tasks.append(asyncio.ensure_future(coro))
+        await asyncio.sleep(0)
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_turns_of_a_session_run_one_at_a_time_in_arrival_order():
+    locks, log = SessionLocks(), []
+    asyncio.run(in_arrival_order(*(turn(locks, "s", n, log) for n in "abc")))
+    assert log == ["a start", "a end", "b start", "b end", "c start", "c end"]
+    assert locks.stats()["sessions"] == 0 and locks.stats()["waits"] == 2
+
+
+def test_other_sessions_are_not_held_up():
+    locks, log = SessionLocks(), []
+    asyncio.run(in_arrival_order(turn(locks, "s1", "a", log), turn(locks, "s2", "b", log)))
+    assert log[:2] == ["a start", "b start"]
+    assert locks.stats()["waits"] == 0
+
+
+def test_turn_waiting_too_long_is_turned_away():
+    locks, log = SessionLocks(timeout=0.01), []
+    results = asyncio.run(in_arrival_order(turn(locks, "s", "a", log, seconds=0.2), turn(locks, "s", "b", log)))
+    assert isinstance(results[1], SessionBusy)
+    assert log == ["a start", "a end"]
+    assert locks.stats()["timeouts"] == 1
+
+
+def test_turn_beyond_the_queue_is_turned_away_at_once():
+    locks, log = SessionLocks(max_queue=1), []
+    results = asyncio.run(in_arrival_order(*(turn(locks, "s", n, log) for n in "abc")))
+    assert isinstance(results[2], SessionBusy)
+    assert log == ["a start", "a end", "b start", "b end"]
+    assert locks.stats()["rejected"] == 1
+
+
+@pytest.fixture
+def slow_turns(monkeypatch):
+    """
+    POST /chat with turns that take 0.1s and record the order they ran in.
+    """
+    log = []
+
+    async def chat_turn(req):
+        log.append(req.message)
+        await asyncio.sleep(0.1)
+        return req.message
+
+    monkeypatch.setattr(main, "chat_turn", chat_turn)
+    return log
+
+
+def chat_all(*messages):
+    return asyncio.run(in_arrival_order(*(main.chat(ChatRequest(session_id="s", message=m)) for m in messages)))
+
+
+def test_chat_runs_turns_of_a_session_in_order(monkeypatch, slow_turns):
+    monkeypatch.setattr(main, "SESSION_LOCKS", SessionLocks())
+    assert chat_all("first", "second", "third") == ["first", "second", "third"]
+    assert slow_turns == ["first", "second", "third"]
+
+
+def test_chat_answers_429_on_session_lock_timeout(monkeypatch, slow_turns):
+    monkeypatch.setattr(main, "SESSION_LOCKS", SessionLocks(timeout=0.01))
+    first, second = chat_all("first", "second")
+    assert first == "first"
+    assert isinstance(second, HTTPException) and second.status_code == 429
+    assert slow_turns == ["first"]
+
+
+def test_chat_answers_429_beyond_session_max_queue(monkeypatch, slow_turns):
+    monkeypatch.setattr(main, "SESSION_LOCKS", SessionLocks(max_queue=1))
+    results = chat_all("first", "second", "third")
+    assert results[:2] == ["first", "second"]
+    assert isinstance(results[2], HTTPException) and results[2].status_code == 429
+    assert slow_turns == ["first", "second"]
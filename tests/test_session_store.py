@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from app.session_locks import SessionLocks
+from app.session_store import LRUSessionStore, SessionStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_store(**kwargs):
+    evicted = []
+    store = LRUSessionStore(on_evict=lambda session_id, value: evicted.append(session_id), **kwargs)
+    return store, evicted
+
+
+def test_least_recently_used_is_evicted_first():
+    store, evicted = make_store(max_entries=2)
+    store.put("a", 1)
+    store.put("b", 2)
+    assert store.get("a") == 1
+    store.put("c", 3)
+    assert evicted == ["b"]
+    assert "a" in store and "c" in store
+    assert store.stats()["evictions"] == 1
+
+
+def test_byte_budget():
+    store, evicted = make_store(max_bytes=100)
+    store.put("a", 1, nbytes=40)
+    store.put("b", 2, nbytes=40)
+    store.resize("b", 70)
+    assert evicted == ["a"]
+    assert store.resident_bytes == 70
+    # The session being served is kept even when it alone is over budget
+    store.resize("b", 150)
+    assert "b" in store and evicted == ["a"]
+
+
+def test_idle_sessions_expire():
+    clock = Clock()
+    store, evicted = make_store(ttl_seconds=10, clock=clock)
+    store.put("a", 1)
+    clock.now = 5
+    store.put("b", 2)
+    clock.now = 12
+    assert store.get("b") == 2
+    assert evicted == ["a"]
+    assert store.get("a") is None
+    assert store.stats()["expirations"] == 1
+
+
+def test_pinned_sessions_are_not_evicted():
+    clock = Clock()
+    pinned = {"a"}
+    store, evicted = make_store(max_entries=1, ttl_seconds=10, pinned=pinned.__contains__, clock=clock)
+    store.put("a", 1)
+    store.put("b", 2)
+    assert evicted == [] and "a" in store
+    clock.now = 20
+    store.get("b")
+    assert evicted == ["b"]
+    pinned.clear()
+    store.put("c", 3)
+    assert evicted == ["b", "a"]
+
+
+def test_session_held_while_a_turn_runs_or_waits():
+    locks = SessionLocks()
+
+    async def run():
+        async with locks.hold("s"):
+            assert locks.held("s")
+        assert not locks.held("s")
+
+    asyncio.run(run())
+
+
+def test_incomplete_store_fails_when_created():
+    class GetOnly(SessionStore):
+        def get(self, session_id):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
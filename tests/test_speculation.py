@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.output_parsers import JsonOutputParser
+
+from app import naive_agent, speculation
+from app.calendar_mock import MockCalendar
+from app.extraction import predict_draft
+from app.schemas import AgentState, MeetingDraft, RuntimeContext
+from benchmarks.fake_llm import FakeChatModel
+
+TZ = "America/Los_Angeles"
+
+BOOKED = MeetingDraft(
+    host_full_name="Dana Lee",
+    attendee_full_name="Priya Raman",
+    subject="hiring plan",
+    start_time_iso="2026-02-03T10:00:00-08:00",
+    duration_minutes=45,
+    timezone=TZ,
+)
+
+
+@pytest.fixture
+def context(monkeypatch):
+    monkeypatch.setattr(speculation, "SPECULATIVE", True)
+    monkeypatch.setattr(speculation, "SPECULATION_STATS", speculation.Counter())
+    monkeypatch.setattr(speculation, "_PENDING", {})
+    return RuntimeContext(llm=FakeChatModel(), json_parser=JsonOutputParser(), calendar=MockCalendar([]))
+
+
+@pytest.mark.parametrize("message", ["10:30 works", "noon is better", "the second one"])
+def test_follow_up_on_a_complete_draft_is_not_speculated(context, message):
+    state = AgentState(draft=BOOKED, messages=[message], override=True)
+    asyncio.run(naive_agent.extract_node(state, SimpleNamespace(context=context)))
+    assert speculation.SPECULATION_STATS["started"] == 0
+
+
+def test_speculation_for_another_time_is_discarded_and_never_used(context):
+    # The rules read 9 am, extraction (the LLM) settles on 10:30
+    predicted = predict_draft(BOOKED, "Make it 02/04/2026 9 am", TZ)
+    assert predicted is not None
+
+    async def turn():
+        spec = speculation.start(context, predicted, True)
+        node, msgs = speculation.predicted_reply(context, predicted, True)
+        spec.confirm(predicted.model_copy(update={"start_time_iso": "2026-02-04T10:30:00-08:00"}))
+        await asyncio.sleep(0)
+        assert spec.task.cancelled()
+        return await speculation.take(context.llm, msgs, node)
+
+    assert asyncio.run(turn()) is None
+    assert speculation.SPECULATION_STATS["discarded"] == 1
+    assert speculation.SPECULATION_STATS["used"] == 0
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import pytest
+
+import app.main as main
+from app.registry import GraphRegistry
+from app.schemas import ChatRequest
+
+
+class SlowRegistry(GraphRegistry):
+    """
+    Takes `delay` seconds to hand out a workflow, as while the warm-up compiles it.
+    """
+
+    delay = 0.2
+
+    def get(self, name):
+        time.sleep(self.delay)
+        return super().get(name)
+
+
+async def longest_stall(work):
+    """
+    Runs `work` and returns the longest the event loop went without running another task.
+    """
+    gaps = []
+
+    async def ticker():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0.01)
+    try:
+        await work
+    finally:
+        task.cancel()
+    return max(gaps)
+
+
+@pytest.fixture
+def cold(monkeypatch, fake_llm):
+    monkeypatch.setattr(main, "mode", main.FUSED)
+    monkeypatch.setattr(main, "GRAPHS", SlowRegistry())
+    monkeypatch.setitem(main.WARM_UP, "ready", False)
+
+
+def test_turn_before_warm_up_does_not_stall_the_event_loop(cold):
+    turn = main.chat(ChatRequest(session_id="s", message="hi"))
+    assert asyncio.run(longest_stall(turn)) < SlowRegistry.delay / 2
+